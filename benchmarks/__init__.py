@@ -0,0 +1,5 @@
+"""
+This package contains the benchmarks and concurrency checks, ran against the database configured for the bot.
+
+Each one is a module ran with python -m benchmarks.<name>, exiting with a non-zero status when a check fails.
+"""
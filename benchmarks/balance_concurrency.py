@@ -0,0 +1,89 @@
+"""
+This module checks that concurrent balance changes are never lost nor overdrawn, against the
+read-modify-write they replaced.
+
+Run it with: python -m benchmarks.balance_concurrency --operations 500
+"""
+import argparse
+import asyncio
+from benchmarks.harness import run, create_users, drop_users, timed, check
+from models import User
+from repositories import adjust_balance
+
+__all__ = ()
+
+
+async def legacy_credit(user_id: int) -> None:
+    """
+    Credit one point the way the commands did before adjust_balance, in two round trips.
+
+    Args:
+        user_id (int): The user ID.
+    """
+    user = await User.get(id=user_id)
+    await User.filter(id=user_id).update(balance=user.balance + 1)
+
+
+async def benchmark(operations: int, balance: int) -> None:
+    """
+    Run the concurrent credits and debits and check the final balances.
+
+    Args:
+        operations (int): The amount of concurrent operations of each run.
+        balance (int): The starting balance of the debit run.
+    """
+    legacy_id, atomic_id, debit_id = await create_users(3, 0)
+
+    try:
+        await User.filter(id=debit_id).update(balance=balance)
+
+        _, legacy_time = await timed(
+            asyncio.gather(*(legacy_credit(legacy_id) for _ in range(operations)))
+        )
+        legacy_balance = (await User.get(id=legacy_id)).balance
+        print(
+            f"read-modify-write: {operations} credits in {legacy_time:.3f}s, "
+            f"{operations - legacy_balance} lost updates"
+        )
+
+        _, atomic_time = await timed(
+            asyncio.gather(
+                *(adjust_balance(atomic_id, 1, reason="benchmark") for _ in range(operations))
+            )
+        )
+        atomic_balance = (await User.get(id=atomic_id)).balance
+        print(
+            f"adjust_balance: {operations} credits in {atomic_time:.3f}s "
+            f"({legacy_time / atomic_time:.1f}x faster)"
+        )
+        check(atomic_balance == operations, f"no lost credits ({atomic_balance}/{operations})")
+
+        results, _ = await timed(
+            asyncio.gather(
+                *(adjust_balance(debit_id, -1, reason="benchmark") for _ in range(operations))
+            )
+        )
+        debited = sum(result is not None for result in results)
+        final_balance = (await User.get(id=debit_id)).balance
+        check(
+            debited == min(balance, operations),
+            f"debits accepted only while funded ({debited} of {operations} from {balance})",
+        )
+        check(final_balance == balance - debited, f"no overdraw (final balance {final_balance})")
+    finally:
+        await drop_users([legacy_id, atomic_id, debit_id])
+
+
+def main() -> None:
+    """
+    Runs the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Check concurrent balance changes.")
+    parser.add_argument("--operations", type=int, default=500)
+    parser.add_argument("--balance", type=int, default=100)
+    arguments = parser.parse_args()
+    run(lambda: benchmark(arguments.operations, arguments.balance))
+
+
+if __name__ == "__main__":
+    main()
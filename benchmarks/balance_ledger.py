@@ -0,0 +1,222 @@
+"""
+This module compares the spins per second with the write-behind balance ledger on and off, and
+checks that the entries left unflushed by a crash are replayed exactly once.
+
+Run it with: python -m benchmarks.balance_ledger --users 50 --spins 100
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from multiprocessing import get_context
+from pathlib import Path
+from benchmarks.harness import run, create_users, drop_users, timed, check
+from config import LEDGER_FLUSH_INTERVAL, LEDGER_FLUSH_MAX_ENTRIES
+from config.db_setup import init
+from models import User
+from repositories import (
+    BalanceLedger,
+    after_commit,
+    adjust_balance,
+    balance_ledger,
+    settle_game_outcome,
+)
+from tortoise.transactions import in_transaction
+
+__all__ = ()
+
+RACING_USERS = 5  # The users racing purchases against spins, fewer than the pooled connections
+
+
+async def spin_all(ids: list[int], spins: int) -> float:
+    """
+    Spin concurrently for every user, each spin costing one point.
+
+    Args:
+        ids (list[int]): The user IDs.
+        spins (int): The amount of spins of each user.
+
+    Returns:
+        float: The spins per second.
+    """
+    results, elapsed = await timed(
+        asyncio.gather(
+            *(
+                settle_game_outcome(id, -1, reason="benchmark")
+                for _ in range(spins)
+                for id in ids
+            )
+        )
+    )
+    check(all(result is not None for result in results), "every funded spin was accepted")
+    return len(results) / elapsed
+
+
+async def purchase(user_id: int, price: int) -> bool:
+    """
+    Debit a purchase in a transaction that stays open a while, like one claiming codes.
+
+    Args:
+        user_id (int): The user ID.
+        price (int): The price.
+
+    Returns:
+        bool: Whether the purchase was paid.
+    """
+    async with after_commit(), in_transaction():
+        paid = await adjust_balance(user_id, -price, reason="benchmark") is not None
+        await asyncio.sleep(0.05)
+
+    return paid
+
+
+async def spin_until_crash(journal_path: str, ids: list[int], spins: int) -> None:
+    """
+    Spin through a ledger that never flushes, then die without stopping it.
+
+    Args:
+        journal_path (str): The path of the local journal.
+        ids (list[int]): The user IDs.
+        spins (int): The amount of spins of each user.
+    """
+    await init()
+    # A flush interval longer than the run keeps every entry in the journal only.
+    await balance_ledger.start(journal_path, 3600, len(ids) * spins + 1)
+
+    for id in ids:
+        for _ in range(spins):
+            await balance_ledger.apply(id, -1)
+
+    os._exit(1)
+
+
+def crash_in_process(journal_path: str, ids: list[int], spins: int) -> None:
+    """
+    Entry point of the crashing process.
+
+    Args:
+        journal_path (str): The path of the local journal.
+        ids (list[int]): The user IDs.
+        spins (int): The amount of spins of each user.
+    """
+    asyncio.run(spin_until_crash(journal_path, ids, spins))
+
+
+async def check_balances(ids: list[int], balance: int) -> None:
+    """
+    Check the balances stored in the database.
+
+    Args:
+        ids (list[int]): The user IDs.
+        balance (int): The expected balance of each user.
+    """
+    balances = await User.filter(id__in=ids).values_list("balance", flat=True)
+    check(
+        all(stored == balance for stored in balances),
+        f"every balance was written (expected {balance}, stored {sorted(set(balances))})",
+    )
+
+
+async def benchmark(users: int, spins: int) -> None:
+    """
+    Run the spins with the ledger off and on, then a simulated crash.
+
+    Args:
+        users (int): The amount of concurrent players.
+        spins (int): The amount of spins of each player.
+    """
+    ids = await create_users(users, 2 * spins)
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal_path = str(Path(directory) / "balance_journal.log")
+
+        try:
+            direct_rate = await spin_all(ids, spins)
+            print(f"ledger off: {direct_rate:.0f} spins/s")
+            await check_balances(ids, spins)
+
+            await balance_ledger.start(
+                journal_path, LEDGER_FLUSH_INTERVAL, LEDGER_FLUSH_MAX_ENTRIES
+            )
+            ledger_rate = await spin_all(ids, spins)
+
+            try:
+                await BalanceLedger().start(journal_path, 3600, LEDGER_FLUSH_MAX_ENTRIES)
+                refused = False
+            except RuntimeError:
+                refused = True
+
+            check(refused, "a second ledger is refused while one is running")
+            await balance_ledger.stop()
+            print(f"ledger on: {ledger_rate:.0f} spins/s ({ledger_rate / direct_rate:.1f}x)")
+            await check_balances(ids, 0)
+
+            # A purchase committing while the same user spins may not let both spend the balance,
+            # a few users so the purchases do not wait on the pool.
+            racers = ids[:RACING_USERS]
+            await User.filter(id__in=racers).update(balance=spins)
+
+            for id in racers:
+                balance_ledger.invalidate(id)
+
+            await balance_ledger.start(
+                journal_path, LEDGER_FLUSH_INTERVAL, LEDGER_FLUSH_MAX_ENTRIES
+            )
+            outcomes = await asyncio.gather(
+                *(purchase(id, spins // 2) for id in racers),
+                *(
+                    settle_game_outcome(id, -1, reason="benchmark")
+                    for _ in range(spins)
+                    for id in racers
+                ),
+            )
+            await balance_ledger.stop()
+            spent = (spins // 2) * sum(outcomes[: len(racers)]) + sum(
+                outcome is not None for outcome in outcomes[len(racers) :]
+            )
+            balances = await User.filter(id__in=racers).values_list("balance", flat=True)
+            check(
+                min(balances) >= 0 and sum(balances) == len(racers) * spins - spent,
+                f"racing purchases and spins never overdraw (lowest balance {min(balances)})",
+            )
+
+            await User.filter(id__in=ids).update(balance=spins)
+            crashed = get_context("spawn").Process(
+                target=crash_in_process, args=(journal_path, ids, spins)
+            )
+            crashed.start()
+            await asyncio.get_running_loop().run_in_executor(None, crashed.join)
+            check(crashed.exitcode == 1, f"the ledger process crashed (exit code {crashed.exitcode})")
+            await check_balances(ids, spins)
+
+            recovered = BalanceLedger()
+            await recovered.start(journal_path, LEDGER_FLUSH_INTERVAL, LEDGER_FLUSH_MAX_ENTRIES)
+            await recovered.stop()
+            check(
+                recovered.replayed == users * spins,
+                f"every unflushed entry was replayed ({recovered.replayed}/{users * spins})",
+            )
+            await check_balances(ids, 0)
+
+            restarted = BalanceLedger()
+            await restarted.start(journal_path, LEDGER_FLUSH_INTERVAL, LEDGER_FLUSH_MAX_ENTRIES)
+            await restarted.stop()
+            check(restarted.replayed == 0, "replayed entries are not replayed again")
+            await check_balances(ids, 0)
+        finally:
+            await drop_users(ids)
+
+
+def main() -> None:
+    """
+    Runs the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Measure the write-behind balance ledger.")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--spins", type=int, default=100)
+    arguments = parser.parse_args()
+    run(lambda: benchmark(arguments.users, arguments.spins))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+This module stress tests code claiming: buyers spread over several processes drain the stock
+of an item at once, and every code must be sold exactly once.
+
+Run it with: python -m benchmarks.code_claims --codes 5000 --buyers 200 --processes 2
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+from benchmarks.harness import run, check
+from config.db_setup import init
+from config.db_pool import warm_up_pool
+from models import Item, Codes
+from repositories import add_item_code, after_commit, catalog_index, claim_codes, load_catalog
+from tortoise.transactions import in_transaction
+from tortoise import Tortoise
+
+__all__ = ()
+
+BENCHMARK_ITEM_ID = 9_100_000_000_000_000_000  # Far above any Roblox asset ID
+
+
+class RolledBack(Exception):
+    """
+    Raised to roll back a purchase transaction.
+    """
+
+
+async def buy_until_sold_out(item_id: int, claimed: list[str]) -> None:
+    """
+    Buy one code after the other until the item is sold out.
+
+    Args:
+        item_id (int): The ID of the item.
+        claimed (list[str]): Where the bought codes are collected.
+    """
+    while codes := await claim_codes(item_id, 1):
+        claimed.extend(codes)
+
+
+async def drain(item_id: int, buyers: int) -> list[str]:
+    """
+    Run concurrent buyers in this process until the item is sold out.
+
+    Args:
+        item_id (int): The ID of the item.
+        buyers (int): The amount of concurrent buyers.
+
+    Returns:
+        list[str]: The codes bought by this process.
+    """
+    await init()
+    # Opened before the buyers start, like the bot does, or each of their first queries opens a pool.
+    await warm_up_pool()
+    claimed = []
+
+    try:
+        await asyncio.gather(*(buy_until_sold_out(item_id, claimed) for _ in range(buyers)))
+    finally:
+        await Tortoise.close_connections()
+
+    return claimed
+
+
+def drain_in_process(item_id: int, buyers: int) -> list[str]:
+    """
+    Entry point of a buyer process.
+
+    Args:
+        item_id (int): The ID of the item.
+        buyers (int): The amount of concurrent buyers.
+
+    Returns:
+        list[str]: The codes bought by this process.
+    """
+    return asyncio.run(drain(item_id, buyers))
+
+
+async def benchmark(codes: int, buyers: int, processes: int) -> None:
+    """
+    Stock an item, drain it from several processes and check the sales.
+
+    Args:
+        codes (int): The amount of codes stocked.
+        buyers (int): The amount of concurrent buyers per process.
+        processes (int): The amount of buyer processes.
+    """
+    await Item.filter(item_id=BENCHMARK_ITEM_ID).delete()
+    item = await Item.create(
+        item_id=BENCHMARK_ITEM_ID,
+        item_name="Benchmark item",
+        item_description="Created by benchmarks.code_claims",
+        item_price=1,
+        item_category="Other",
+        stock=codes,
+    )
+    stocked = [f"benchmark-{index}" for index in range(codes)]
+    await Codes.bulk_create([Codes(item=item, code=code) for code in stocked], batch_size=1000)
+
+    try:
+        started_at = perf_counter()
+        loop = asyncio.get_running_loop()
+
+        with ProcessPoolExecutor(processes, mp_context=get_context("spawn")) as executor:
+            sales = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, drain_in_process, BENCHMARK_ITEM_ID, buyers)
+                    for _ in range(processes)
+                )
+            )
+
+        duration = perf_counter() - started_at
+        sold = [code for process_sales in sales for code in process_sales]
+        print(
+            f"{len(sold)} codes sold by {processes}x{buyers} buyers in {duration:.2f}s "
+            f"({len(sold) / duration:.0f} claims per second), "
+            f"per process: {', '.join(str(len(process_sales)) for process_sales in sales)}"
+        )
+
+        remaining = await Codes.filter(item_id=BENCHMARK_ITEM_ID).count()
+        stock = (await Item.get(item_id=BENCHMARK_ITEM_ID)).stock
+        check(len(sold) == len(set(sold)), f"no code sold twice ({len(sold) - len(set(sold))} doubles)")
+        check(set(sold) == set(stocked), f"every code sold ({len(set(sold))}/{codes})")
+        check(remaining == 0 and stock == 0, f"item drained (codes left {remaining}, stock {stock})")
+        check(
+            await Item.exists(item_id=BENCHMARK_ITEM_ID),
+            "a sold-out item stays registered",
+        )
+
+        # A purchase rolled back, e.g. for insufficient funds, may not touch the catalog index.
+        await add_item_code(BENCHMARK_ITEM_ID, ["benchmark-rollback"])
+        await load_catalog()
+
+        try:
+            async with after_commit(), in_transaction():
+                await claim_codes(BENCHMARK_ITEM_ID, 1)
+                raise RolledBack
+        except RolledBack:
+            pass
+
+        remaining = await Codes.filter(item_id=BENCHMARK_ITEM_ID).count()
+        indexed_stock = catalog_index.get(BENCHMARK_ITEM_ID)["stock"]
+        check(
+            remaining == 1 and indexed_stock == 1,
+            f"a rolled back claim keeps the code and the indexed stock "
+            f"(codes {remaining}, indexed stock {indexed_stock})",
+        )
+    finally:
+        catalog_index.remove(BENCHMARK_ITEM_ID)
+        await Item.filter(item_id=BENCHMARK_ITEM_ID).delete()
+
+
+def main() -> None:
+    """
+    Runs the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Stress test concurrent code claims.")
+    parser.add_argument("--codes", type=int, default=5000)
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=2)
+    arguments = parser.parse_args()
+    run(lambda: benchmark(arguments.codes, arguments.buyers, arguments.processes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+This module times the CPU cost of settling a spin with the game engine's payout tables, against
+the Counter and list based settlement the bet commands used before.
+
+Run it with: python -m benchmarks.game_spins --spins 200000
+"""
+import argparse
+from collections import Counter
+from random import choice as random_choice, choices, randint
+from time import perf_counter
+from benchmarks.harness import run, check
+from config import MAX_SLOTS, MAX_SPINS
+from core.cogs.economy.games import (
+    COIN_SIDES,
+    GAMES,
+    ROULETTE_MULTIPLIERS,
+    ROULETTE_TOTAL_CHANCES,
+    SLOT_FRUITS,
+    SLOT_JACKPOTS,
+)
+
+__all__ = ()
+
+BET = 100
+
+
+def legacy_slots_winnings(fruits: list[str], bet: int) -> int:
+    """
+    Get the winnings of a slots spin the way slots_handler did before the engine.
+
+    Args:
+        fruits (list[str]): The fruits of the winning row.
+        bet (int): The bet amount.
+
+    Returns:
+        int: The amount paid back, the bet included.
+    """
+    fruits_freq = Counter(fruits)
+
+    if len(fruits_freq) == 1:
+        fruit = fruits_freq.most_common(1)[0][0]
+        return SLOT_JACKPOTS[fruit * 3] * bet
+
+    if len(fruits_freq) == 2:
+        fruit = fruits_freq.most_common(1)[0][0]
+        return int(SLOT_JACKPOTS[fruit * 2] * bet)
+
+    return 0
+
+
+def legacy_roulette_winnings(pocket: int, color_picked: str, bet: int) -> int:
+    """
+    Get the winnings of a roulette spin the way the roulette command did before the engine.
+
+    Args:
+        pocket (int): The pocket drawn.
+        color_picked (str): The color bet on.
+        bet (int): The bet amount.
+
+    Returns:
+        int: The amount paid back, the bet included.
+    """
+    rng_color = GAMES["roulette"].color(pocket)
+
+    if color_picked.lower() == rng_color.lower():
+        return bet * ROULETTE_MULTIPLIERS[rng_color] + bet
+
+    return 0
+
+
+def legacy_coinflip_winnings(side: str, side_picked: str, bet: int) -> int:
+    """
+    Get the winnings of a coinflip settled like the roulette command did before the engine,
+    which had no coinflip yet.
+
+    Args:
+        side (str): The side the coin landed on.
+        side_picked (str): The side bet on.
+        bet (int): The bet amount.
+
+    Returns:
+        int: The amount paid back, the bet included.
+    """
+    return bet * 2 if side_picked.lower() == side.lower() else 0
+
+
+LEGACY_SPINS = {
+    "slots": (None, lambda bet: legacy_slots_winnings(choices(SLOT_FRUITS, k=MAX_SLOTS), bet)),
+    "roulette": (
+        "Red",
+        lambda bet: legacy_roulette_winnings(randint(0, ROULETTE_TOTAL_CHANCES), "Red", bet),
+    ),
+    "coinflip": (
+        "Heads",
+        lambda bet: legacy_coinflip_winnings(random_choice(COIN_SIDES), "Heads", bet),
+    ),
+}
+
+
+def legacy_play_many(spin, bet: int, spins: int, balance: int) -> tuple[int, int]:
+    """
+    Play several spins one after the other, stopping once the balance can not cover the bet.
+
+    Args:
+        spin: The function settling a single spin.
+        bet (int): The bet of each spin.
+        spins (int): The amount of spins requested.
+        balance (int): The balance before the first spin.
+
+    Returns:
+        tuple[int, int]: The spins played and the net change.
+    """
+    net = 0
+
+    for played in range(spins):
+        if balance + net < bet:
+            return played, net
+
+        net += spin(bet) - bet
+
+    return spins, net
+
+
+def per_spin(settle, spins: int) -> float:
+    """
+    Time a settlement repeatedly.
+
+    Args:
+        settle: The settlement to time.
+        spins (int): The amount of times to run it.
+
+    Returns:
+        float: The microseconds per run.
+    """
+    start = perf_counter()
+
+    for _ in range(spins):
+        settle()
+
+    return (perf_counter() - start) / spins * 1_000_000
+
+
+def check_tables() -> None:
+    """
+    Check that the compiled payout tables pay every outcome what the old settlement paid.
+    """
+    for name, game in GAMES.items():
+        for choice in game.choices or (None,):
+            for index, outcome in enumerate(game.outcomes):
+                if name == "slots":
+                    expected = legacy_slots_winnings(list(outcome), BET)
+                elif name == "roulette":
+                    expected = legacy_roulette_winnings(outcome, choice, BET)
+                else:
+                    expected = legacy_coinflip_winnings(outcome, choice, BET)
+
+                if game.winnings(index, choice, BET) != expected:
+                    check(False, f"{name} pays {outcome} on {choice} like before")
+
+        check(True, f"{name} pays every outcome like before ({len(game.outcomes)} outcomes)")
+
+
+async def benchmark(spins: int) -> None:
+    """
+    Time single spins and batches of every game with both settlements.
+
+    Args:
+        spins (int): The amount of spins timed for each game and settlement.
+    """
+    check_tables()
+    batches = max(spins // MAX_SPINS, 1)
+    balance = BET * MAX_SPINS * 100  # Enough for every batch to play all of its spins
+
+    for name, game in GAMES.items():
+        choice, legacy = LEGACY_SPINS[name]
+        legacy_spin = per_spin(lambda: legacy(BET), spins)
+        engine_spin = per_spin(lambda: game.winnings(game.draw(), choice, BET), spins)
+        legacy_batch = per_spin(lambda: legacy_play_many(legacy, BET, MAX_SPINS, balance), batches)
+        engine_batch = per_spin(lambda: game.play_many(choice, BET, MAX_SPINS, balance), batches)
+        print(
+            f"{name}: {legacy_spin:.2f}us -> {engine_spin:.2f}us per spin "
+            f"({legacy_spin / engine_spin:.1f}x), "
+            f"{MAX_SPINS} spins {legacy_batch:.1f}us -> {engine_batch:.1f}us per batch "
+            f"({legacy_batch / engine_batch:.1f}x)"
+        )
+
+    batch = GAMES["slots"].play_many(None, BET, MAX_SPINS, BET - 1)
+    check(
+        batch.played == 0 and batch.net == 0,
+        f"a batch plays nothing the balance can not cover ({batch.played} played)",
+    )
+
+
+def main() -> None:
+    """
+    Runs the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Time the settlement of a spin.")
+    parser.add_argument("--spins", type=int, default=200_000)
+    arguments = parser.parse_args()
+    run(lambda: benchmark(arguments.spins), database=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+This module contains the helpers shared by the benchmarks.
+
+Benchmarks import it first, the config package has to be loaded before the repositories.
+"""
+import asyncio
+from config.db_setup import init
+from config.migrations import migrate
+from models import User
+from tortoise import Tortoise, connections
+from time import perf_counter
+from typing import Awaitable, Callable
+
+__all__ = (
+    "BENCHMARK_USER_ID_BASE",
+    "run",
+    "create_users",
+    "drop_users",
+    "timed",
+    "check",
+)
+
+BENCHMARK_USER_ID_BASE = 9_100_000_000_000_000_000  # Far above any Discord ID, so real users are never touched
+
+
+class CheckFailed(Exception):
+    """
+    Raised when a benchmark observes a broken invariant.
+    """
+
+
+def run(main: Callable[[], Awaitable[None]], database: bool = True) -> None:
+    """
+    Run a benchmark, against the configured database with the schema migrated if it uses one.
+
+    Args:
+        main (Callable): The benchmark.
+        database (bool): Whether the benchmark uses the database.
+    """
+
+    async def runner() -> None:
+        if not database:
+            return await main()
+
+        await init()
+        await migrate()
+
+        try:
+            await main()
+        finally:
+            await Tortoise.close_connections()
+
+    try:
+        asyncio.run(runner())
+    except CheckFailed as e:
+        raise SystemExit(f"FAILED: {e}")
+
+
+async def create_users(count: int, balance: int) -> list[int]:
+    """
+    Create benchmark users, replacing the ones a previous run left behind.
+
+    Args:
+        count (int): The amount of users.
+        balance (int): The balance of each user.
+
+    Returns:
+        list[int]: The user IDs.
+    """
+    ids = list(range(BENCHMARK_USER_ID_BASE, BENCHMARK_USER_ID_BASE + count))
+    await drop_users(ids)
+    await connections.get("default").execute_query(
+        f'INSERT INTO "{User._meta.db_table}" (id, balance) SELECT unnest($1::bigint[]), $2',
+        [ids, balance],
+    )
+    return ids
+
+
+async def drop_users(ids: list[int]) -> None:
+    """
+    Delete benchmark users.
+
+    Args:
+        ids (list[int]): The user IDs.
+    """
+    await User.filter(id__in=ids).delete()
+
+
+async def timed(awaitable: Awaitable) -> tuple[object, float]:
+    """
+    Await something and time it.
+
+    Args:
+        awaitable (Awaitable): What to await.
+
+    Returns:
+        tuple: The result and how long it took (in seconds).
+    """
+    started_at = perf_counter()
+    result = await awaitable
+    return result, perf_counter() - started_at
+
+
+def check(condition: bool, message: str) -> None:
+    """
+    Report a check, failing the benchmark if it does not hold.
+
+    Args:
+        condition (bool): Whether the check holds.
+        message (str): What is checked.
+    """
+    print(f"{'ok' if condition else 'FAILED'}: {message}")
+
+    if not condition:
+        raise CheckFailed(message)
@@ -0,0 +1,157 @@
+"""
+This module times routing a click to its popup through the popup router, against the
+wait_for("interaction") predicates every popup registered before, with many popups open.
+
+Run it with: python -m benchmarks.popup_routing --popups 10000 --clicks 1000
+"""
+import argparse
+import asyncio
+import discord
+from time import perf_counter
+from types import SimpleNamespace
+from benchmarks.harness import run, check
+from core.tools import PopupRouter
+
+__all__ = ()
+
+TIMEOUT = 60
+
+
+def click(user_id: int) -> SimpleNamespace:
+    """
+    Build a stand-in for a button click, with what the predicates and the router read from it.
+
+    Args:
+        user_id (int): The ID of the user clicking.
+    """
+    return SimpleNamespace(user=SimpleNamespace(id=user_id))
+
+
+async def legacy_routing(popups: int, clicks: int) -> float:
+    """
+    Open the popups the old way and time the clicks dispatched to them.
+
+    Args:
+        popups (int): The amount of open popups.
+        clicks (int): The amount of clicks timed.
+
+    Returns:
+        float: The microseconds per click.
+    """
+    # Entering the client sets up its loop without connecting to Discord.
+    async with discord.Client(intents=discord.Intents.none()) as client:
+        waiters = [
+            asyncio.create_task(
+                client.wait_for(
+                    "interaction", check=lambda i, user_id=user_id: i.user.id == user_id, timeout=TIMEOUT
+                )
+            )
+            for user_id in range(popups)
+        ]
+        await asyncio.sleep(0)
+
+        # The newest popups are clicked, so every click scans the predicates of all the older ones.
+        start = perf_counter()
+
+        for user_id in range(popups - 1, popups - 1 - clicks, -1):
+            client.dispatch("interaction", click(user_id))
+
+        duration = perf_counter() - start
+        resolved = await asyncio.gather(*waiters[popups - clicks :])
+        check(
+            [interaction.user.id for interaction in resolved] == list(range(popups - clicks, popups)),
+            "every predicate scan resolves its own popup",
+        )
+
+        for waiter in waiters:
+            waiter.cancel()
+
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+    return duration / clicks * 1_000_000
+
+
+async def router_routing(popups: int, clicks: int) -> float:
+    """
+    Open the popups through the router and time the clicks resolved by nonce.
+
+    Args:
+        popups (int): The amount of open popups.
+        clicks (int): The amount of clicks timed.
+
+    Returns:
+        float: The microseconds per click.
+    """
+    router = PopupRouter()
+    nonces = [router.open(TIMEOUT) for _ in range(popups)]
+    waiters = [asyncio.create_task(router.wait(nonce)) for nonce in nonces]
+    await asyncio.sleep(0)
+
+    start = perf_counter()
+
+    for user_id in range(popups - 1, popups - 1 - clicks, -1):
+        router.resolve(nonces[user_id], "confirm", click(user_id))
+
+    duration = perf_counter() - start
+    resolved = await asyncio.gather(*waiters[popups - clicks :])
+    check(
+        [choice.interaction.user.id for choice in resolved] == list(range(popups - clicks, popups)),
+        "every nonce resolves its own popup",
+    )
+
+    for nonce in nonces[: popups - clicks]:
+        router.expire(nonce)
+
+    await asyncio.gather(*waiters)
+    check(router.stats()["pending"] == 0, "no popup is left registered once every wait returned")
+    return duration / clicks * 1_000_000
+
+
+async def early_click() -> None:
+    """
+    Check that a click landing before the command waits on its popup is not lost.
+    """
+    router = PopupRouter()
+    nonce = router.open(TIMEOUT)
+    router.resolve(nonce, "confirm", click(1))
+    choice = await router.wait(nonce)
+    check(choice is not None and choice.choice == "confirm", "a click before wait() is kept")
+    check(not router.resolve(nonce, "cancel", click(1)), "a popup is resolved only once")
+
+    router = PopupRouter()
+    nonce = router.open(0)
+    router.resolve(nonce, "confirm", click(1))
+    router.prune()
+    check(router.stats()["pending"] == 0, "an expired popup nobody waits on is pruned")
+
+
+async def benchmark(popups: int, clicks: int) -> None:
+    """
+    Time both routings and check the router keeps early clicks.
+
+    Args:
+        popups (int): The amount of open popups.
+        clicks (int): The amount of clicks timed.
+    """
+    await early_click()
+    legacy_click = await legacy_routing(popups, clicks)
+    router_click = await router_routing(popups, clicks)
+    print(
+        f"{popups} open popups: wait_for predicates {legacy_click:.2f}us per click, "
+        f"router {router_click:.2f}us per click ({legacy_click / router_click:.0f}x)"
+    )
+
+
+def main() -> None:
+    """
+    Runs the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Time routing clicks to open popups.")
+    parser.add_argument("--popups", type=int, default=10_000)
+    parser.add_argument("--clicks", type=int, default=1000)
+    arguments = parser.parse_args()
+    run(lambda: benchmark(arguments.popups, arguments.clicks), database=False)
+
+
+if __name__ == "__main__":
+    main()
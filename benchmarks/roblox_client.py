@@ -0,0 +1,120 @@
+"""
+This module checks the Roblox client against a local fake server that throttles and fails the way
+Roblox does: HTML error pages, 429s with Retry-After and outages that open the circuit.
+
+Run it with: python -m benchmarks.roblox_client
+"""
+import asyncio
+from aiohttp import web
+from benchmarks.harness import run, check
+from core import routes
+from core.tools import CircuitBreaker, CircuitOpenError, TokenBucket
+
+__all__ = ()
+
+HOST = "127.0.0.1"
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 0.5  # Short, so the half-open probe can be checked without waiting long
+
+
+class FakeRoblox:
+    """
+    Fake Roblox endpoint answering with queued failures before succeeding.
+    """
+
+    def __init__(self) -> None:
+        self.failures: list[int] = []  # The statuses of the next responses, served as HTML pages
+        self.delay = 0.0
+        self.requests = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+
+        if self.failures:
+            return web.Response(
+                status=self.failures.pop(0),
+                text="<html><body>Too many requests</body></html>",
+                content_type="text/html",
+                headers={"Retry-After": "0"},
+            )
+
+        return web.json_response({"data": [{"targetId": 1, "state": "Completed"}]})
+
+
+async def benchmark() -> None:
+    """
+    Run the client against the fake server and check its retries and circuit breaker.
+    """
+    fake = FakeRoblox()
+    app = web.Application()
+    app.router.add_get("/", fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://{HOST}:{port}/"
+
+    routes.buckets[HOST] = TokenBucket(1000, 1000)
+    breaker = routes.breakers[HOST] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+    session = routes.create_http_session()
+
+    try:
+        fake.failures = [429, 503]
+        payload = await routes.request_json(session, url)
+        check("data" in payload, "HTML 429 and 503 pages are retried until the JSON answer")
+        check(breaker.state == "closed", "a success closes the circuit again")
+
+        fake.failures = [500] * (routes.ROBLOX_MAX_RETRIES + 1)
+
+        try:
+            await routes.request_json(session, url)
+        except (ValueError, CircuitOpenError):
+            pass
+
+        check(breaker.state == "open", f"consecutive HTML failures open the circuit ({breaker.state})")
+        requests = fake.requests
+
+        try:
+            await routes.request_json(session, url)
+            short_circuited = False
+        except CircuitOpenError:
+            short_circuited = True
+
+        check(
+            short_circuited and fake.requests == requests,
+            "an open circuit fails fast without reaching the server",
+        )
+
+        await asyncio.sleep(BREAKER_COOLDOWN)
+        fake.delay = 1
+        probe = asyncio.create_task(routes.request_json(session, url))
+        await asyncio.sleep(0.2)
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        check(not breaker.probing, "a cancelled probe is released")
+
+        # The circuit opened before the server served every queued failure.
+        fake.failures = []
+        fake.delay = 0
+        payload = await routes.request_json(session, url)
+        check(
+            "data" in payload and breaker.state == "closed",
+            "the next probe goes through and closes the circuit",
+        )
+        print(f"counters: {dict(routes.request_stats)}")
+    finally:
+        await session.close()
+        await runner.cleanup()
+
+
+def main() -> None:
+    """
+    Runs the check from the command line.
+    """
+    run(benchmark, database=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+This module compares opening a session per Roblox request, as the routes did before, with the
+shared keep-alive session the bot creates in setup_hook, against a local stub server.
+
+Run it with: python -m benchmarks.roblox_http --requests 1000
+"""
+import argparse
+import aiohttp
+import asyncio
+from aiohttp import web
+from benchmarks.harness import run, timed, check
+from core import routes
+from core.tools import TokenBucket
+
+__all__ = ()
+
+HOST = "127.0.0.1"
+
+
+class StubRoblox:
+    """
+    Stub asset details endpoint counting the connections its clients open.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connections: set[tuple] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        return web.json_response({"AssetId": 1, "Name": "Benchmark", "PriceInRobux": 10})
+
+
+async def legacy_get_json(url: str) -> dict:
+    """
+    Get a JSON response the way the routes did before the shared session, with a session per call.
+
+    Args:
+        url (str): The URL to request.
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            return await response.json()
+
+
+async def sequential(get_json, url: str, requests: int) -> float:
+    """
+    Send the requests one after the other.
+
+    Args:
+        get_json: The function getting a JSON response.
+        url (str): The URL to request.
+        requests (int): The amount of requests.
+
+    Returns:
+        float: The duration in seconds.
+    """
+
+    async def send() -> None:
+        for _ in range(requests):
+            await get_json(url)
+
+    _, duration = await timed(send())
+    return duration
+
+
+async def concurrent(get_json, url: str, requests: int) -> float:
+    """
+    Send the requests at once, like a burst of commands.
+
+    Args:
+        get_json: The function getting a JSON response.
+        url (str): The URL to request.
+        requests (int): The amount of requests.
+
+    Returns:
+        float: The duration in seconds.
+    """
+    _, duration = await timed(asyncio.gather(*(get_json(url) for _ in range(requests))))
+    return duration
+
+
+async def benchmark(requests: int) -> None:
+    """
+    Run both clients against the stub server and compare their latency and connections.
+
+    Args:
+        requests (int): The amount of requests of each run.
+    """
+    stub = StubRoblox()
+    app = web.Application()
+    app.router.add_get("/", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://{HOST}:{port}/"
+
+    # Only the session is measured, not the pacing meant for the real Roblox hosts.
+    routes.buckets[HOST] = TokenBucket(10**9, 10**9)
+    session = routes.create_http_session()
+    routes.set_http_session(session)
+    results = {}
+
+    try:
+        # Opens the first connection, as the bot's first request would.
+        await routes.get_json(url)
+
+        for name, get_json in (("session per call", legacy_get_json), ("shared session", routes.get_json)):
+            stub.connections.clear()
+            sequential_time = await sequential(get_json, url, requests)
+            concurrent_time = await concurrent(get_json, url, requests)
+            results[name] = (sequential_time, concurrent_time, len(stub.connections))
+            print(
+                f"{name}: {sequential_time / requests * 1000:.3f}ms per request sequentially, "
+                f"{requests} concurrent in {concurrent_time:.3f}s, "
+                f"{len(stub.connections)} connections opened"
+            )
+
+        legacy_time, _, legacy_connections = results["session per call"]
+        shared_time, _, shared_connections = results["shared session"]
+        print(f"per-request latency {legacy_time / shared_time:.1f}x lower with the shared session")
+
+        check(
+            shared_connections <= routes.HTTP_POOL_SIZE_PER_HOST,
+            f"the shared session stays within its per-host pool ({shared_connections} connections)",
+        )
+        check(
+            shared_time < legacy_time,
+            f"reusing connections lowers the per-request latency "
+            f"({shared_time / requests * 1000:.3f}ms < {legacy_time / requests * 1000:.3f}ms)",
+        )
+    finally:
+        routes.set_http_session(None)
+        await session.close()
+        await runner.cleanup()
+
+
+def main() -> None:
+    """
+    Runs the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Compare a session per request with the shared session.")
+    parser.add_argument("--requests", type=int, default=1000)
+    arguments = parser.parse_args()
+    run(lambda: benchmark(arguments.requests), database=False)
+
+
+if __name__ == "__main__":
+    main()
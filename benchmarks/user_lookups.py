@@ -0,0 +1,96 @@
+"""
+This module measures the queries issued by a burst of concurrent balance commands, each looking
+up its user one query at a time as before and through the batching user loader as now.
+
+Run it with: python -m benchmarks.user_lookups --commands 500
+"""
+import argparse
+import asyncio
+from benchmarks.harness import run, create_users, drop_users, timed, check
+from config.db_pool import pool_metrics
+from models import User
+from repositories import get_user, ensure_user, user_loader
+
+__all__ = ()
+
+
+async def legacy_load_user(id: int):
+    """
+    Look up a user the way economy_handler did before the loader, one query per command.
+
+    Args:
+        id (int): The user ID.
+    """
+    return await User.filter(id=id).first()
+
+
+async def load_user(id: int):
+    """
+    Look up a user the way economy_handler does.
+
+    Args:
+        id (int): The user ID.
+    """
+    return await get_user(id) or await ensure_user(id)
+
+
+async def burst(lookup, ids: list[int]) -> tuple[int, float]:
+    """
+    Look up every user at once.
+
+    Args:
+        lookup (Callable): The lookup of a single user.
+        ids (list[int]): The user IDs.
+
+    Returns:
+        tuple[int, float]: The amount of queries and the elapsed time (in seconds).
+    """
+    acquired = pool_metrics.acquired
+    users, elapsed = await timed(asyncio.gather(*(lookup(id) for id in ids)))
+    check(all(users), "every user was found")
+    return pool_metrics.acquired - acquired, elapsed
+
+
+async def benchmark(commands: int) -> None:
+    """
+    Run the burst with both lookups and compare their queries.
+
+    Args:
+        commands (int): The amount of concurrent balance commands.
+    """
+    ids = await create_users(commands, 0)
+
+    try:
+        before_queries, before_time = await burst(legacy_load_user, ids)
+        print(
+            f"one query per command: {before_queries} queries in {before_time:.3f}s "
+            f"({before_queries / before_time:.0f} queries/s, {commands / before_time:.0f} lookups/s)"
+        )
+
+        batches = user_loader.batches
+        after_queries, after_time = await burst(load_user, ids)
+        print(
+            f"batching loader: {after_queries} queries in {after_time:.3f}s "
+            f"({after_queries / after_time:.0f} queries/s, {commands / after_time:.0f} lookups/s), "
+            f"{user_loader.batches - batches} batches, largest {user_loader.max_batch_size}"
+        )
+        check(
+            after_queries < before_queries,
+            f"the loader issues fewer queries ({after_queries} vs {before_queries})",
+        )
+    finally:
+        await drop_users(ids)
+
+
+def main() -> None:
+    """
+    Runs the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Measure the queries of concurrent user lookups.")
+    parser.add_argument("--commands", type=int, default=500)
+    arguments = parser.parse_args()
+    run(lambda: benchmark(arguments.commands))
+
+
+if __name__ == "__main__":
+    main()
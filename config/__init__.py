@@ -3,4 +3,5 @@ This package contains the configuration files for the application.
 """
 from .settings import *
 from .ugc_bot import *
-from .db_setup import *
\ No newline at end of file
+from .db_setup import *
+from .db_pool import *
@@ -0,0 +1,164 @@
+"""
+This module contains the instrumented Postgres client, used as the Tortoise engine of the bot.
+
+Every connection acquired from the pool is timed, so the pool can be sized from how long
+commands wait for one during peak hours.
+"""
+import asyncpg
+from bisect import bisect_left
+from time import monotonic, perf_counter
+from typing import Optional
+from tortoise import connections
+from tortoise.backends.asyncpg import AsyncpgDBClient
+
+__all__ = ["pool_metrics", "warm_up_pool", "get_pool_stats"]
+
+ACQUIRE_LATENCY_BUCKETS = (1, 5, 10, 50, 100, 500, 1000)  # The upper bounds of the acquire latency histogram (in milliseconds)
+
+
+class PoolMetrics:
+    """
+    Counters of the connection acquisitions, kept across pool re-creations.
+    """
+
+    def __init__(self) -> None:
+        self.acquired = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.histogram = [0] * (len(ACQUIRE_LATENCY_BUCKETS) + 1)
+        self.warmup_duration: Optional[float] = None
+
+    def observe(self, wait: float) -> None:
+        """
+        Record how long an acquisition waited for a connection.
+
+        Args:
+            wait (float): The wait (in seconds).
+        """
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.histogram[bisect_left(ACQUIRE_LATENCY_BUCKETS, wait * 1000)] += 1
+
+    def stats(self) -> dict:
+        """
+        Get the acquisition statistics.
+
+        Returns:
+            dict: The counters and the acquire latency histogram, keyed by bucket.
+        """
+        labels = [f"<={bound}ms" for bound in ACQUIRE_LATENCY_BUCKETS]
+        labels.append(f">{ACQUIRE_LATENCY_BUCKETS[-1]}ms")
+
+        return {
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "waiting": self.waiting,
+            "max waiting": self.max_waiting,
+            "average wait ms": round(self.total_wait / max(self.acquired, 1) * 1000, 2),
+            "max wait ms": round(self.max_wait * 1000, 2),
+            "histogram": dict(zip(labels, self.histogram)),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool:
+    """
+    Wrapper of an asyncpg pool timing how long each acquisition waits for a connection.
+
+    Tortoise only ever awaits acquire and hands the connection back through release,
+    every other attribute is the wrapped pool's.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+
+    def __getattr__(self, name: str):
+        return getattr(self.pool, name)
+
+    async def acquire(self, *, timeout: Optional[float] = None) -> asyncpg.Connection:
+        started_at = monotonic()
+        pool_metrics.waiting += 1
+        pool_metrics.max_waiting = max(pool_metrics.max_waiting, pool_metrics.waiting)
+
+        try:
+            connection = await self.pool.acquire(timeout=timeout)
+        except TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.waiting -= 1
+
+        pool_metrics.observe(monotonic() - started_at)
+        return connection
+
+
+class InstrumentedAsyncpgDBClient(AsyncpgDBClient):
+    """
+    Asyncpg client whose pool reports its acquisitions to the pool metrics.
+    """
+
+    async def create_pool(self, **kwargs) -> InstrumentedPool:
+        return InstrumentedPool(await super().create_pool(**kwargs))
+
+    def pool_stats(self) -> dict:
+        """
+        Get the live state of the pool.
+
+        Returns:
+            dict: The open, in use and idle connections, 0 before the pool is created.
+        """
+        pool = self._pool
+        size = pool.get_size() if pool else 0
+        idle = pool.get_idle_size() if pool else 0
+
+        return {
+            "size": size,
+            "in use": size - idle,
+            "idle": idle,
+            "min size": self.pool_minsize,
+            "max size": self.pool_maxsize,
+        }
+
+
+client_class = InstrumentedAsyncpgDBClient  # Looked up by Tortoise when this module is the engine
+
+
+async def warm_up_pool() -> dict:
+    """
+    Create the pool of the running event loop, opening its minimum amount of connections,
+    so the first commands do not pay for connecting.
+
+    Returns:
+        dict: The live state of the pool once warm.
+    """
+    started_at = perf_counter()
+    client = connections.get("default")
+
+    async with client.acquire_connection() as connection:
+        await connection.fetchval("SELECT 1")
+
+    pool_metrics.warmup_duration = perf_counter() - started_at
+    return client.pool_stats()
+
+
+def get_pool_stats() -> dict:
+    """
+    Get the live state of the pool and its acquisition statistics.
+
+    Returns:
+        dict: The pool state, the acquisition counters and the acquire latency histogram.
+    """
+    client = connections.get("default")
+    stats = client.pool_stats() if isinstance(client, InstrumentedAsyncpgDBClient) else {}
+    stats.update(pool_metrics.stats())
+
+    if pool_metrics.warmup_duration is not None:
+        stats["warmup ms"] = round(pool_metrics.warmup_duration * 1000, 2)
+
+    return stats
@@ -1,7 +1,17 @@
 from tortoise import Tortoise
-import asyncpg
 from dotenv import load_dotenv
 from core.tools import log_info
+from config.settings import (
+    DB_HOST,
+    DB_PORT,
+    DB_NAME,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_COMMAND_TIMEOUT,
+    DB_MAX_INACTIVE_CONNECTION_LIFETIME,
+    DB_MAX_QUERIES,
+)
 import os
 
 __all__ = ["init"]
@@ -13,7 +23,6 @@ async def init() -> None:
     """
     config = await retrieve_tortoise_config()
     await Tortoise.init(config)
-    await Tortoise.generate_schemas()
     log_info("Database connection established from Tortoise ORM")
 
 
@@ -26,11 +35,35 @@ async def retrieve_tortoise_config() -> dict:
     """
     load_dotenv()
     credentials = await retrieve_credentials()
-    user = credentials["user"]
-    password = credentials["password"]
 
     config = {
-        "connections": {"default": f"postgres://{user}:{password}@db:5432/UgcBot"},
+        "connections": {
+            "default": {
+                # The instrumented asyncpg client, see config/db_pool.py.
+                "engine": "config.db_pool",
+                "credentials": {
+                    **credentials,
+                    "host": os.getenv("POSTGRES_HOST", DB_HOST),
+                    "port": int(os.getenv("POSTGRES_PORT", DB_PORT)),
+                    "database": os.getenv("POSTGRES_DB", DB_NAME),
+                    "minsize": int(os.getenv("DB_POOL_MIN_SIZE", DB_POOL_MIN_SIZE)),
+                    "maxsize": int(os.getenv("DB_POOL_MAX_SIZE", DB_POOL_MAX_SIZE)),
+                    "statement_cache_size": int(
+                        os.getenv("DB_STATEMENT_CACHE_SIZE", DB_STATEMENT_CACHE_SIZE)
+                    ),
+                    "command_timeout": float(
+                        os.getenv("DB_COMMAND_TIMEOUT", DB_COMMAND_TIMEOUT)
+                    ),
+                    "max_inactive_connection_lifetime": float(
+                        os.getenv(
+                            "DB_MAX_INACTIVE_CONNECTION_LIFETIME",
+                            DB_MAX_INACTIVE_CONNECTION_LIFETIME,
+                        )
+                    ),
+                    "max_queries": int(os.getenv("DB_MAX_QUERIES", DB_MAX_QUERIES)),
+                },
+            }
+        },
         "apps": {"models": {"models": ["models"], "default_connection": "default"}},
     }
 
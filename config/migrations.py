@@ -0,0 +1,119 @@
+"""
+This module contains the versioned schema migrations, replacing the schema generation ran on every boot.
+
+The applied version is stored in the schema_version table, so a boot against a current schema
+costs a single query. Changes to the models need a migration of their own appended to MIGRATIONS.
+"""
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import OperationalError
+from tortoise.transactions import in_transaction
+from tortoise.utils import generate_schema_for_client
+from core.tools import log_info
+from models import Codes, Item
+from typing import Awaitable, Callable, NamedTuple
+
+__all__ = ["MIGRATIONS", "get_schema_version", "migrate"]
+
+SCHEMA_VERSION_TABLE = "schema_version"
+MIGRATION_LOCK_KEY = 7_261_022  # The advisory lock keeping two instances from migrating at once
+
+
+class Migration(NamedTuple):
+    """
+    A step of the schema, applied once.
+    """
+
+    version: int
+    description: str
+    apply: Callable[[BaseDBAsyncClient], Awaitable[None]]
+
+
+async def create_model_tables(connection: BaseDBAsyncClient) -> None:
+    """
+    Create the tables and indexes of the models that do not exist yet.
+
+    Args:
+        connection (BaseDBAsyncClient): The migration transaction.
+    """
+    await generate_schema_for_client(connection, safe=True)
+
+
+async def add_item_stock(connection: BaseDBAsyncClient) -> None:
+    """
+    Add the stock counter to the items created before it existed, counted from their codes.
+
+    Args:
+        connection (BaseDBAsyncClient): The migration transaction.
+    """
+    item_table = Item._meta.db_table
+    codes_table = Codes._meta.db_table
+    await connection.execute_script(
+        f'ALTER TABLE "{item_table}" ADD COLUMN IF NOT EXISTS stock INT NOT NULL DEFAULT 0;'
+        f'UPDATE "{item_table}" AS i SET stock = '
+        f'(SELECT COUNT(*) FROM "{codes_table}" AS c WHERE c.item_id = i.item_id);'
+    )
+
+
+MIGRATIONS = (
+    # Also creates the ledger_checkpoint, transactions and purchase_outbox tables on older databases.
+    Migration(1, "create the model tables", create_model_tables),
+    Migration(2, "add the item stock counter", add_item_stock),
+)
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def get_schema_version(connection: BaseDBAsyncClient) -> int:
+    """
+    Get the version of the schema.
+
+    Args:
+        connection (BaseDBAsyncClient): The connection.
+
+    Returns:
+        int: The last applied migration, 0 if none was.
+    """
+    try:
+        rows = await connection.execute_query_dict(
+            f'SELECT MAX(version) AS version FROM "{SCHEMA_VERSION_TABLE}"'
+        )
+    except OperationalError:
+        return 0
+
+    return rows[0]["version"] or 0
+
+
+async def migrate() -> int:
+    """
+    Apply the migrations the database is missing, in a single transaction holding the migration lock.
+
+    Returns:
+        int: The version of the schema.
+    """
+    if await get_schema_version(connections.get("default")) == LATEST_VERSION:
+        return LATEST_VERSION
+
+    async with in_transaction() as connection:
+        await connection.execute_query("SELECT pg_advisory_xact_lock($1)", [MIGRATION_LOCK_KEY])
+        await connection.execute_script(
+            f'CREATE TABLE IF NOT EXISTS "{SCHEMA_VERSION_TABLE}" ('
+            "version INT PRIMARY KEY, "
+            "description TEXT NOT NULL, "
+            "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        )
+        # Read again under the lock, another instance may have migrated in the meantime.
+        version = await get_schema_version(connection)
+
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+
+            await migration.apply(connection)
+            await connection.execute_query(
+                f'INSERT INTO "{SCHEMA_VERSION_TABLE}" (version, description) VALUES ($1, $2)',
+                [migration.version, migration.description],
+            )
+            log_info(f"Applied migration {migration.version}: {migration.description}")
+            version = migration.version
+
+    return version
@@ -16,4 +16,70 @@ ADMIN_IDS = {
 
 MAX_SLOTS = 3  # The maximum amount of slots that can be played at once
 MAX_COINFLIP = 4000  # The maximum amount that can be bet on a coinflip
-DEFAULT_CLAIM_COOLDOWN = 1800  # The default cooldown for claiming rewards (in seconds)
\ No newline at end of file
+MAX_SPINS = 100  # The maximum amount of spins that can be played with a single command
+DEFAULT_CLAIM_COOLDOWN = 1800  # The default cooldown for claiming rewards (in seconds)
+GUILD_CACHE_MAX_SIZE = 1024  # The maximum amount of guild configs kept in memory
+UGC_GROUP_ID = 6471663  # The ID of the Roblox group whose items can be registered
+MAX_PURCHASE_QUANTITY = 25  # The maximum amount of codes of a single item that can be bought at once
+OUTBOX_POLL_INTERVAL = 5  # How often queued purchase DMs are checked for due deliveries (in seconds)
+OUTBOX_BATCH_SIZE = 50  # The maximum amount of purchase DMs delivered at once
+OUTBOX_MAX_ATTEMPTS = 6  # How many times a purchase DM is tried before the purchase is refunded
+OUTBOX_BACKOFF_BASE = 5  # The base delay between purchase DM attempts (in seconds)
+OUTBOX_BACKOFF_MAX = 600  # The maximum delay between purchase DM attempts (in seconds)
+OUTBOX_LEASE = 120  # How long a claimed purchase DM is hidden from other dispatchers while it is delivered (in seconds)
+
+
+# Database settings
+
+DB_HOST = "db"  # The host of the Postgres server (env: POSTGRES_HOST)
+DB_PORT = 5432  # The port of the Postgres server (env: POSTGRES_PORT)
+DB_NAME = "UgcBot"  # The name of the database (env: POSTGRES_DB)
+DB_POOL_MIN_SIZE = 5  # The amount of connections opened at startup and kept open (env: DB_POOL_MIN_SIZE)
+DB_POOL_MAX_SIZE = 20  # The maximum amount of open connections (env: DB_POOL_MAX_SIZE)
+DB_STATEMENT_CACHE_SIZE = 256  # The amount of prepared statements cached per connection (env: DB_STATEMENT_CACHE_SIZE)
+DB_COMMAND_TIMEOUT = 30  # The timeout of a single query (in seconds, env: DB_COMMAND_TIMEOUT)
+DB_MAX_INACTIVE_CONNECTION_LIFETIME = 300  # How long an idle connection is kept before being closed (in seconds, env: DB_MAX_INACTIVE_CONNECTION_LIFETIME)
+DB_MAX_QUERIES = 50_000  # The amount of queries after which a connection is replaced (env: DB_MAX_QUERIES)
+
+
+# HTTP settings
+
+HTTP_POOL_SIZE = 100  # The maximum amount of open connections of the shared HTTP client
+HTTP_POOL_SIZE_PER_HOST = 20  # The maximum amount of open connections to a single host
+HTTP_KEEPALIVE_TIMEOUT = 60  # How long idle connections are kept alive (in seconds)
+HTTP_DNS_CACHE_TTL = 300  # How long resolved hostnames are cached (in seconds)
+HTTP_CONNECT_TIMEOUT = 5  # The timeout for opening a connection (in seconds)
+HTTP_TIMEOUT = 15  # The timeout for a whole request (in seconds)
+ROBLOX_DETAILS_CACHE_TTL = 600  # How long cached asset details are fresh (in seconds)
+ROBLOX_THUMBNAIL_CACHE_TTL = 3600  # How long cached asset thumbnails are fresh (in seconds)
+ROBLOX_CACHE_STALE_TTL = 86400  # How long expired responses are still served while refreshed (in seconds)
+ROBLOX_CACHE_MAX_SIZE = 2048  # The maximum amount of responses kept per cache
+ROBLOX_DETAILS_CONCURRENCY = 5  # The maximum amount of concurrent asset details requests
+ROBLOX_THUMBNAIL_BATCH_SIZE = 100  # The maximum amount of assets per thumbnails request
+ROBLOX_REQUESTS_PER_SECOND = 5  # The steady amount of requests sent to each Roblox host per second
+ROBLOX_REQUEST_BURST = 10  # The amount of requests that can be sent to a Roblox host in a burst
+ROBLOX_MAX_RETRIES = 3  # How many times a throttled or failed request is retried
+ROBLOX_BACKOFF_BASE = 0.5  # The base delay of the exponential backoff (in seconds)
+ROBLOX_BACKOFF_MAX = 10  # The maximum delay between retries (in seconds)
+ROBLOX_BREAKER_THRESHOLD = 5  # The consecutive failures that make requests to a host fail fast
+ROBLOX_BREAKER_COOLDOWN = 30  # How long requests to an unhealthy host fail fast (in seconds)
+
+
+# Ledger settings
+
+WRITE_BEHIND_BALANCES = False  # Whether game outcomes are written to the database in the background
+LEDGER_FLUSH_INTERVAL = 0.25  # The maximum time a balance delta waits before being flushed (in seconds)
+LEDGER_FLUSH_MAX_ENTRIES = 500  # The amount of queued balance deltas that triggers a flush right away
+LEDGER_JOURNAL_PATH = "ledger/balance_journal.log"  # The local journal of unflushed balance deltas
+TRANSACTION_FLUSH_INTERVAL = 1  # The maximum time a recorded transaction waits before being written (in seconds)
+TRANSACTION_FLUSH_MAX_ROWS = 1000  # The amount of buffered transactions that triggers a write right away
+TRANSACTION_BUFFER_MAX_SIZE = 100_000  # The amount of transactions kept in memory while the database is unreachable
+
+
+# Simulation settings
+
+SIMULATION_DEFAULT_SPINS = 10_000_000  # The amount of spins simulated when none is given
+SIMULATION_MAX_SPINS = 500_000_000  # The maximum amount of spins the simulate command accepts
+SIMULATION_CHUNK_SIZE = 1_000_000  # The amount of spins drawn at once by a simulation worker
+SIMULATION_RUIN_SESSIONS = 10_000  # The amount of sessions played to estimate the ruin curves
+SIMULATION_RUIN_SESSION_SPINS = 1000  # The amount of spins of each ruin session
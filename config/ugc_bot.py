@@ -1,16 +1,51 @@
 from discord.ext.commands import Bot
 from core.tools import log_info
 from pathlib import Path
+from contextlib import contextmanager
+from time import perf_counter
 from discord import Intents
 from config.db_setup import init
-from tortoise import run_async
-from config import BOT_PREFIX
+from config.db_pool import warm_up_pool
+from config.migrations import migrate
+from core.routes import create_http_session, set_http_session
+from tortoise import Tortoise
+from repositories import balance_ledger, transaction_log, warm_up_caches
+from config import (
+    BOT_PREFIX,
+    DEFAULT_CLAIM_COOLDOWN,
+    WRITE_BEHIND_BALANCES,
+    LEDGER_JOURNAL_PATH,
+    LEDGER_FLUSH_INTERVAL,
+    LEDGER_FLUSH_MAX_ENTRIES,
+    TRANSACTION_FLUSH_INTERVAL,
+    TRANSACTION_FLUSH_MAX_ROWS,
+    TRANSACTION_BUFFER_MAX_SIZE,
+)
 from dotenv import load_dotenv
+import asyncio
+import ast
 import os
 
 __all__ = ["UgcBot"]
 
 
+def has_setup(filepath: Path) -> bool:
+    """
+    Checks whether a module defines the setup function of an extension, without importing it.
+
+    Args:
+        filepath (Path): The path of the module.
+
+    Returns:
+        bool: Whether the module is an extension.
+    """
+    tree = ast.parse(filepath.read_text(encoding="utf-8"), filename=str(filepath))
+    return any(
+        isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "setup"
+        for node in tree.body
+    )
+
+
 class UgcBot(Bot):
 
     def __init__(self):
@@ -44,19 +79,92 @@ class UgcBot(Bot):
 
     async def setup_hook(self) -> None:
         """
-        Load the cogs when the bot is ready.
+        Run the startup pipeline on the bot's event loop, timing each phase.
         """
         log_info(f"Logged in as {self.user.name} ({self.user.id})")
-        await self.load_cogs(self)
+        self.startup_timings = {}
+        started_at = perf_counter()
+
+        with self.startup_phase("database"):
+            await init()
+
+        with self.startup_phase("migrations"):
+            schema_version = await migrate()
+
+        log_info(f"Database schema at version {schema_version}")
+
+        with self.startup_phase("pool warmup"):
+            pool = await warm_up_pool()
+
+        log_info(f"Database pool warmed up with {pool['size']} connections")
+
+        with self.startup_phase("cache warmup"):
+            caches = await warm_up_caches(DEFAULT_CLAIM_COOLDOWN)
+
+        log_info(
+            "Caches warmed up: "
+            + ", ".join(
+                f"{name} {load['rows']} rows in {load['ms']}ms" for name, load in caches.items()
+            )
+        )
+
+        with self.startup_phase("background tasks"):
+            self.http_session = create_http_session()
+            set_http_session(self.http_session)
+            transaction_log.start(
+                TRANSACTION_FLUSH_INTERVAL,
+                TRANSACTION_FLUSH_MAX_ROWS,
+                TRANSACTION_BUFFER_MAX_SIZE,
+            )
+
+            if WRITE_BEHIND_BALANCES:
+                await balance_ledger.start(
+                    LEDGER_JOURNAL_PATH, LEDGER_FLUSH_INTERVAL, LEDGER_FLUSH_MAX_ENTRIES
+                )
+
+        with self.startup_phase("cogs"):
+            await self.load_cogs(self)
+
+        log_info(f"Ready in {(perf_counter() - started_at) * 1000:.0f}ms")
+
+    @contextmanager
+    def startup_phase(self, name: str):
+        """
+        Time a phase of the startup pipeline and log how long it took.
+
+        Args:
+            name (str): The name of the phase.
+        """
+        started_at = perf_counter()
+        yield
+        self.startup_timings[name] = perf_counter() - started_at
+        log_info(f"Startup phase '{name}' took {self.startup_timings[name] * 1000:.0f}ms")
+
+    async def close(self) -> None:
+        """
+        Flush the balance ledger and the transaction log and close the shared HTTP
+        session and the database connections when the bot shuts down.
+        """
+        await balance_ledger.stop()
+        await transaction_log.stop()
+
+        if getattr(self, "http_session", None):
+            set_http_session(None)
+            await self.http_session.close()
+
+        await super().close()
+        await Tortoise.close_connections()
 
     async def load_cogs(self, bot: Bot) -> None:
         """
-        This function loads the cogs for the bot.
+        This function loads the cogs for the bot, all at once.
 
         Args:
             bot (Bot): The bot object.
         """
         cogs_dir = Path("./core/cogs")
+        extensions = []
+
         for filepath in cogs_dir.rglob("*.py"):
 
             if filepath.stem == "__init__":
@@ -68,8 +176,18 @@ class UgcBot(Bot):
                 .as_posix()
                 .replace("/", ".")
             )
-            await bot.load_extension(f"core.cogs.{module_path}")
-            log_info(f"Loaded cog: {module_path}")
+
+            # Helper modules living next to the cogs are not extensions. Their source is read
+            # rather than imported, load_extension executes each module from its own spec.
+            if not has_setup(filepath):
+                continue
+
+            extensions.append(module_path)
+
+        await asyncio.gather(
+            *(bot.load_extension(f"core.cogs.{module_path}") for module_path in extensions)
+        )
+        log_info(f"Loaded cogs: {', '.join(extensions)}")
 
     def setup_token(self) -> str:
         """
@@ -86,5 +204,4 @@ class UgcBot(Bot):
         This function runs the bot.
         """
         log_info("Bot is starting...")
-        run_async(init())
         super().run(self.setup_token())
@@ -2,7 +2,7 @@
 This module contains the developer commands for the bot.
 """
 from discord.ext.commands import Cog, Context, command
-from discord import Member, ButtonStyle, Interaction
+from discord import Guild, Member
 from core.tools import (
     admin_only,
     send_bot_embed,
@@ -10,26 +10,52 @@ from core.tools import (
     retrieve_application_emoji,
     embed_builder,
     confirmation_popup,
-    view_button_builder,
+    popup_router,
+    CircuitOpenError,
 )
-from core.routes import get_item_by_id, get_item_image_by_id
+from core.routes import (
+    get_item_by_id,
+    get_item_image_by_id,
+    get_items_by_ids,
+    get_item_images_by_ids,
+    get_route_cache_stats,
+    get_request_stats,
+    get_thumbnail_url,
+)
+from core.simulator import SIMULATED_GAMES, simulate, format_report
 from collections import defaultdict
-from discord.ui import Button
-from core.views import AddCodes, ChangePrice
+from discord.ui import View
+from core.views import ItemAdminButton, ITEM_ADMIN_ACTIONS
 from repositories import (
     get_user,
-    create_user,
-    update_user,
+    ensure_user,
+    ensure_users,
+    adjust_balance,
     create_guild,
     get_guild,
     update_guild,
     get_item_by_roblox_id,
     create_item,
-    delete_item,
+    create_items,
+    get_registered_item_ids,
     get_code_count,
+    verify_item_stock,
+    guild_config_cache,
+    user_loader,
+    balance_ledger,
+    transaction_log,
+    after_commit,
+    item_loader,
+)
+from tortoise.transactions import in_transaction
+from config import (
+    UGC_GROUP_ID,
+    SIMULATION_DEFAULT_SPINS,
+    SIMULATION_MAX_SPINS,
+    get_pool_stats,
 )
 from typing import Optional
-from discord import Member
+import asyncio
 
 __all__ = ("DeveloperCommands",)
 
@@ -60,13 +86,8 @@ class DeveloperCommands(Cog):
         if amount < 0:
             return await ctx.send("You can't give negative points.")
 
-        user_data = await get_user(user.id)
-
-        if not user_data:
-            await create_user(user.id)
-            user_data = await get_user(user.id)
-
-        await update_user(user.id, balance=user_data.balance + amount)
+        await ensure_user(user.id)
+        await adjust_balance(user.id, amount, reason="givepoints")
         await send_bot_embed(
             ctx,
             title="Success",
@@ -79,13 +100,12 @@ class DeveloperCommands(Cog):
     @economy_handler(user_data=True)
     @admin_only()
     async def donate(self, ctx: Context, user: Member, amount: int) -> None:
-        author_data = ctx.user_data
         user_data = await get_user(user.id)
         paw_emoji = await retrieve_application_emoji("paw", 1295095109645373474)
 
-        if author_data.balance < amount and amount > 0:
+        if amount <= 0:
             return await send_bot_embed(
-                ctx, description=f"{paw_emoji} You don't have enough money to donate."
+                ctx, description=f"{paw_emoji} You can't donate negative candies."
             )
 
         if not user_data:
@@ -94,8 +114,17 @@ class DeveloperCommands(Cog):
                 description=f"{paw_emoji} **{user.display_name}** is not registered.",
             )
 
-        await update_user(user.id, balance=user_data.balance + amount)
-        await update_user(ctx.author.id, balance=author_data.balance - amount)
+        async with after_commit(), in_transaction():
+            donated = await adjust_balance(ctx.author.id, -amount, reason="donate") is not None
+
+            if donated:
+                await adjust_balance(user.id, amount, reason="donate")
+
+        if not donated:
+            return await send_bot_embed(
+                ctx,
+                description=f"{paw_emoji} You don't have enough money to donate.",
+            )
 
         candy_emoji = await retrieve_application_emoji(
             "candy", 1295095109645373474, is_animated=True
@@ -105,6 +134,56 @@ class DeveloperCommands(Cog):
             description=f"{candy_emoji} {ctx.author.display_name} has sucessfully donated **{amount}** candies to **{user.display_name}**.",
         )
 
+    @Cog.listener()
+    async def on_guild_join(self, guild: Guild) -> None:
+        """
+        Creates the accounts of every member of a guild the bot joins.
+
+        Args:
+            guild (Guild): The guild.
+
+        Returns:
+            None
+        """
+        await self.provision_guild_members(guild)
+
+    @command(
+        name="provisionmembers",
+        aliases=["pm"],
+        description="Create accounts for every member of this guild.",
+    )
+    @admin_only()
+    async def provision_members(self, ctx: Context) -> None:
+        """
+        Creates the accounts of every member of the guild at once.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        created = await self.provision_guild_members(ctx.guild)
+        await send_bot_embed(
+            ctx,
+            description=f":white_check_mark: **{created}** new accounts have been created.",
+        )
+
+    async def provision_guild_members(self, guild: Guild) -> int:
+        """
+        Creates the missing accounts of a guild's members with a single insert.
+
+        Args:
+            guild (Guild): The guild.
+
+        Returns:
+            int: The amount of accounts created.
+        """
+        if not guild.chunked:
+            await guild.chunk()
+
+        return await ensure_users([member.id for member in guild.members if not member.bot])
+
     @command(name="sync", description="Sync the bot's hybrid commands.")
     @admin_only()
     async def sync(self, ctx: Context) -> None:
@@ -120,6 +199,132 @@ class DeveloperCommands(Cog):
         await self.bot.tree.sync()
         await ctx.send("Hybrid commands have been synced.")
 
+    @command(name="cachestats", description="Show the hit/miss counters of the caches.")
+    @admin_only()
+    async def cache_stats(self, ctx: Context) -> None:
+        """
+        Shows the statistics of the in-process caches.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        caches = {
+            "guilds": guild_config_cache.stats(),
+            **get_route_cache_stats(),
+            "user lookups": user_loader.stats(),
+            "item lookups": item_loader.stats(),
+            "balance ledger": balance_ledger.stats(),
+            "transaction log": transaction_log.stats(),
+            "popups": popup_router.stats(),
+        }
+        description = "\n".join(
+            f"**{name}**: "
+            + ", ".join(f"{counter} {value}" for counter, value in stats.items())
+            for name, stats in caches.items()
+        )
+        await send_bot_embed(ctx, title="🗃️ Cache statistics", description=description)
+
+    @command(name="poolstats", description="Show the database connection pool usage.")
+    @admin_only()
+    async def pool_stats(self, ctx: Context) -> None:
+        """
+        Shows the live state of the database pool and how long commands wait for a connection.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        stats = get_pool_stats()
+        histogram = stats.pop("histogram")
+        counters = "\n".join(f"**{counter}**: {value}" for counter, value in stats.items())
+        buckets = ", ".join(f"{bucket} {count}" for bucket, count in histogram.items())
+        await send_bot_embed(
+            ctx,
+            title="🐘 Database pool statistics",
+            description=f"{counters}\n\n**Acquire latency**: {buckets}",
+        )
+
+    @command(name="apistats", description="Show the Roblox API client counters.")
+    @admin_only()
+    async def api_stats(self, ctx: Context) -> None:
+        """
+        Shows the request counters and circuit state of the Roblox API client.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        stats = get_request_stats()
+        counters = ", ".join(
+            f"{counter} {value}" for counter, value in stats["counters"].items()
+        )
+        hosts = "\n".join(
+            f"**{host}**: circuit {host_stats['circuit']}, opened {host_stats['times_opened']} times, "
+            f"{host_stats['rate_limited_waits']} rate limited waits"
+            for host, host_stats in stats["hosts"].items()
+        )
+        await send_bot_embed(
+            ctx,
+            title="🌐 Roblox API statistics",
+            description=f"{counters or 'No requests sent yet.'}\n\n{hosts}",
+        )
+
+    @command(
+        name="simulate", description="Simulate a casino game to measure its payouts."
+    )
+    @admin_only()
+    async def simulate_game(
+        self,
+        ctx: Context,
+        game: str,
+        spins: int = SIMULATION_DEFAULT_SPINS,
+        choice: Optional[str] = None,
+    ) -> None:
+        """
+        Simulates spins of a casino game and shows its return to player.
+
+        Args:
+            game (str): The name of the game.
+            spins (int): The amount of spins to simulate.
+            choice (Optional[str]): What is bet on, e.g. Red or Heads.
+
+        Returns:
+            None
+        """
+        game = game.lower()
+
+        if game not in SIMULATED_GAMES:
+            return await send_bot_embed(
+                ctx, description=f"The game must be one of: {', '.join(SIMULATED_GAMES)}."
+            )
+
+        if not 0 < spins <= SIMULATION_MAX_SPINS:
+            return await send_bot_embed(
+                ctx,
+                description=f"The amount of spins must be between 1 and {SIMULATION_MAX_SPINS:,}.",
+            )
+
+        try:
+            report = await asyncio.to_thread(simulate, game, spins, choice=choice)
+        except ValueError as e:
+            return await send_bot_embed(ctx, description=str(e))
+
+        title = f"🎲 {game.capitalize()} simulation"
+
+        if report.choice:
+            title += f" ({report.choice})"
+
+        await send_bot_embed(
+            ctx, title=title, description=f"```\n{format_report(report)}\n```"
+        )
+
     @command(
         name="registerchannel",
         aliases=["rc"],
@@ -228,25 +433,23 @@ class DeveloperCommands(Cog):
                 ctx, description=":no_entry_sign: The price of the item cannot be less than or equal to 0."
             )
 
-        item_info = await get_item_by_id(item_id)
-
-        if "errors" in item_info:
-            await self.parse_error_message(ctx, item_info)
-            return
+        try:
+            item_info = await get_item_by_id(item_id)
 
-        item_creator_type = item_info["Creator"]["CreatorType"]
-        item_creator_id = item_info["Creator"]["CreatorTargetId"]
+            if "errors" in item_info:
+                await self.parse_error_message(ctx, item_info)
+                return
 
-        if not item_creator_type == "Group" or item_creator_id != 6471663:
-            return await send_bot_embed(
-                ctx,
-                description=":no_entry_sign: This item is not created by the UGC group.",
-            )
+            if not await self.is_ugc_group_item(item_info):
+                return await send_bot_embed(
+                    ctx,
+                    description=":no_entry_sign: This item is not created by the UGC group.",
+                )
 
-        item_image = await get_item_image_by_id(item_id)
+            item_image = get_thumbnail_url(await get_item_image_by_id(item_id))
+        except CircuitOpenError:
+            return await self.send_roblox_unavailable(ctx)
 
-        item_image = item_image["data"][0]
-        item_image = item_image["imageUrl"]
         item_name = item_info["Name"]
         item_description = item_info["Description"]
         item_price_robux = item_info["PriceInRobux"]
@@ -281,6 +484,137 @@ class DeveloperCommands(Cog):
             item_id, item_name, item_description, item_price, item_category
         )
 
+    @command(
+        name="registeritems",
+        aliases=["ris"],
+        description="Register several items in the bot's database at once.",
+    )
+    @admin_only()
+    async def register_items(self, ctx: Context, *entries: str) -> None:
+        """
+        Registers several items at once, fetching their information in batches.
+
+        Args:
+            entries (str): The items to register, each written as item_id:item_price.
+
+        Returns:
+            None
+        """
+        prices = {}
+
+        for entry in entries:
+            item_id, _, item_price = entry.partition(":")
+
+            if not item_id.isdigit() or not item_price.isdigit() or int(item_price) <= 0:
+                return await send_bot_embed(
+                    ctx,
+                    description=f":no_entry_sign: **{entry}** is not a valid entry, write each item as item_id:item_price.",
+                )
+
+            prices[int(item_id)] = int(item_price)
+
+        if not prices:
+            return await send_bot_embed(
+                ctx,
+                description=":no_entry_sign: Provide the items to register as item_id:item_price.",
+            )
+
+        registered_ids = await get_registered_item_ids(list(prices))
+        rejected = [f"`{item_id}` is already registered" for item_id in registered_ids]
+        candidate_ids = [item_id for item_id in prices if item_id not in registered_ids]
+
+        try:
+            items_info = await get_items_by_ids(candidate_ids)
+        except CircuitOpenError:
+            return await self.send_roblox_unavailable(ctx)
+
+        items = []
+
+        for item_id, item_info in items_info.items():
+            if "errors" in item_info:
+                rejected.append(f"`{item_id}` could not be fetched")
+                continue
+
+            if not await self.is_ugc_group_item(item_info):
+                rejected.append(f"`{item_id}` is not created by the UGC group")
+                continue
+
+            items.append(
+                {
+                    "item_id": item_id,
+                    "item_name": item_info["Name"],
+                    "item_description": item_info["Description"],
+                    "item_price": prices[item_id],
+                    "item_category": await self.asset_type_id(item_info["AssetTypeId"]),
+                }
+            )
+
+        if not items:
+            return await send_bot_embed(
+                ctx,
+                description=":no_entry_sign: None of the items can be registered.\n"
+                + "\n".join(rejected),
+            )
+
+        try:
+            item_images = await get_item_images_by_ids([item["item_id"] for item in items])
+        except CircuitOpenError:
+            return await self.send_roblox_unavailable(ctx)
+
+        description = "\n".join(
+            f"🏷️ **{item['item_name']}** ({item['item_category']}) costing **{item['item_price']}** candies"
+            for item in items
+        )
+
+        if rejected:
+            description += "\n\n**Skipped**\n" + "\n".join(rejected)
+
+        embed = await embed_builder(
+            embed_color="FFC5D3",
+            description=description,
+            thumbnail=item_images[items[0]["item_id"]],
+            title=f"💻 Register {len(items)} items",
+        )
+        has_confirmed = await confirmation_popup(ctx, embed=embed)
+
+        if not has_confirmed:
+            return await send_bot_embed(
+                ctx,
+                description=":no_entry_sign: The registration process has been cancelled.",
+            )
+
+        await create_items(items)
+        await send_bot_embed(
+            ctx,
+            description=f":white_check_mark: {len(items)} items have been successfully registered.",
+        )
+
+    async def is_ugc_group_item(self, item_info: dict) -> bool:
+        """
+        Checks whether an item was created by the UGC group.
+
+        Args:
+            item_info (dict): The item information.
+
+        Returns:
+            bool: Whether the item belongs to the UGC group.
+        """
+        item_creator_type = item_info["Creator"]["CreatorType"]
+        item_creator_id = item_info["Creator"]["CreatorTargetId"]
+        return item_creator_type == "Group" and item_creator_id == UGC_GROUP_ID
+
+    async def send_roblox_unavailable(self, ctx: Context) -> None:
+        """
+        Tells the admin the Roblox API is refusing requests while it recovers.
+
+        Args:
+            ctx (Context): The context of the command.
+        """
+        await send_bot_embed(
+            ctx,
+            description=":no_entry_sign: Roblox is not responding right now, try again in a minute.",
+        )
+
     async def parse_error_message(self, ctx: Context, item_info: dict) -> None:
         """
         Parses the error message.
@@ -304,6 +638,45 @@ class DeveloperCommands(Cog):
                 description=":no_entry_sign: Something went wrong while registering the item.",
             )
 
+    @command(
+        name="verifystock",
+        aliases=["vs"],
+        description="Check the item stock counters against the stored codes.",
+    )
+    @admin_only()
+    async def verify_stock(self, ctx: Context, repair: bool = False) -> None:
+        """
+        Checks the stock counter of every item against its codes.
+
+        Args:
+            repair (bool): Whether to fix the mismatched counters.
+
+        Returns:
+            None
+        """
+        mismatches = await verify_item_stock(repair=repair)
+
+        if not mismatches:
+            return await send_bot_embed(
+                ctx, description=":white_check_mark: Every item stock counter is correct."
+            )
+
+        description = "\n".join(
+            f"**{item_id}**: counter {counts['stock']}, codes {counts['actual']}"
+            for item_id, counts in mismatches.items()
+        )
+        footer_text = (
+            "The counters have been repaired."
+            if repair
+            else "Run this command again with 'true' to repair the counters."
+        )
+        await send_bot_embed(
+            ctx,
+            title="📦 Stock mismatches",
+            description=description,
+            footer_text=footer_text,
+        )
+
     @command(name="displayitem", aliases=["display"], description="Display an item.")
     @admin_only()
     async def display_item(self, ctx: Context, item_id: int):
@@ -317,19 +690,22 @@ class DeveloperCommands(Cog):
             None
         """
         item = await get_item_by_roblox_id(item_id)
-        item_image = await get_item_image_by_id(item_id)
 
         if not item:
             return await send_bot_embed(
                 ctx, description=":no_entry_sign: This item is not registered."
             )
 
+        try:
+            item_image = get_thumbnail_url(await get_item_image_by_id(item_id))
+        except CircuitOpenError:
+            # The item can still be managed without its thumbnail.
+            item_image = None
+
         item_name = item["item_name"]
         item_description = item["item_description"]
         item_price = item["item_price"]
         active_codes = await get_code_count(item_id)
-        item_image = item_image["data"][0]
-        item_image = item_image["imageUrl"]
         item_category = item["item_category"]
 
         description = (
@@ -347,122 +723,13 @@ class DeveloperCommands(Cog):
             title="💻 Item Information",
             footer_text="Click any button to update the item.",
         )
-        buttons = await self.edit_buttons()
-        view = await view_button_builder(*buttons)
-        await ctx.send(embed=embed, view=view)
-
-        try:
-            interaction = await self.bot.wait_for(
-                "interaction", check=lambda i: i.user == ctx.author, timeout=60
-            )
-            await self.button_handler(interaction, interaction.data, item_id)
-        except TimeoutError:
-            await ctx.send("The item display cooldown has expired.")
+        # The buttons are routed by their custom ID, so nothing waits on them here.
+        view = View(timeout=None)
 
-    async def button_handler(
-        self, interaction: Interaction, interaction_data: dict, item_id: int
-    ) -> None:
-        """
-        Handles the button interaction.
-
-        Args:
-            interaction_data (dict): The interaction data.
-
-        Returns:
-            None
-        """
-        interaction_id = interaction_data["custom_id"]
+        for action in ITEM_ADMIN_ACTIONS:
+            view.add_item(ItemAdminButton(action, item_id))
 
-        if interaction_id == "add_code":
-            return await self.add_code(interaction, item_id)
-        elif interaction_id == "change_price":
-            return await self.change_price(interaction, item_id)
-        elif interaction_id == "delete_item":
-            return await self.delete_item(interaction, item_id)
-
-    async def edit_buttons(self) -> tuple:
-        """
-        Edits the buttons of the item.
-
-        Args:
-            None
-
-        Returns:
-            Button: The button.
-        """
-        add_code = Button(
-            style=ButtonStyle.green, label="Add code", emoji="➕", custom_id="add_code"
-        )
-        change_price = Button(
-            style=ButtonStyle.blurple,
-            label="Change price",
-            emoji="💰",
-            custom_id="change_price",
-        )
-        delete_item = Button(
-            style=ButtonStyle.red,
-            label="Delete item",
-            emoji="🗑️",
-            custom_id="delete_item",
-        )
-        return add_code, change_price, delete_item
-
-    async def delete_item(self, interaction: Interaction, item_id: int) -> None:
-        """
-        Deletes an item.
-
-        Args:
-            None
-
-        Returns:
-            None
-        """
-        embed = await embed_builder(
-            embed_color="FFC5D3",
-            description="Are you sure you want to delete this item?",
-            title="💻 Delete Item",
-        )
-        confirmation = await confirmation_popup(
-            interaction, embed=embed, ephemeral=True
-        )
-
-        if not confirmation:
-            return await interaction.followup.send(
-                "❌ The deletion process has been cancelled.", ephemeral=True
-            )
-
-        await delete_item(item_id)
-        await send_bot_embed(
-            interaction,
-            description="✅ The item has been successfully deleted.",
-            ephemeral=True,
-        )
-
-    async def add_code(self, interaction: Interaction, item_id: int) -> None:
-        """
-        Adds a code to the item.
-
-        Args:
-            None
-
-        Returns:
-            None
-        """
-        addCodes = AddCodes(item_id)
-        await interaction.response.send_modal(addCodes)
-
-    async def change_price(self, interaction: Interaction, item_id: int) -> None:
-        """
-        Changes the price of the item.
-
-        Args:
-            None
-
-        Returns:
-            None
-        """
-        changePrice = ChangePrice(item_id)
-        await interaction.response.send_modal(changePrice)
+        await ctx.send(embed=embed, view=view)
 
     async def asset_type_id(self, asset_id: int) -> dict:
         """
@@ -489,4 +756,6 @@ class DeveloperCommands(Cog):
 
 
 async def setup(bot):
+    # Registered once so item admin buttons keep working after a restart.
+    bot.add_dynamic_items(ItemAdminButton)
     await bot.add_cog(DeveloperCommands(bot))
@@ -6,12 +6,10 @@ from core.tools import (
     color_autocomplete,
 )
 from models import User
-from random import choices, randint
-from repositories import update_user
-from math import ceil
-from collections import Counter
-from typing import Union
-from config import MAX_SLOTS
+from repositories import settle_game_outcome
+from typing import Optional, Union
+from config import MAX_SPINS
+from .games import SLOT_JACKPOTS, GAMES, Game, SpinBatch
 
 __all__ = ("BetCommands",)
 
@@ -23,24 +21,18 @@ class BetCommands(Cog):
 
     @hybrid_group(name="slots", description="Bet on the slot machine.")
     @economy_handler()
-    async def slots(self, ctx: Context, bet_amount) -> None:
+    async def slots(self, ctx: Context, bet_amount, spins: int = 1) -> None:
         """
         Test command.
 
         Args:
-            None
+            bet_amount (Union[str, int]): The bet of each spin.
+            spins (int): The amount of spins to play.
 
         Returns:
             None
         """
-        User = ctx.user_data
-
-        bet_amount = await self.bet_validator(ctx, User, bet_amount)
-
-        if bet_amount == -1:
-            return
-
-        await self.slots_handler(ctx, User, bet_amount)
+        await self.play(ctx, GAMES["slots"], bet_amount, spins=spins)
 
     @hybrid_command(name="jackpots", description="Check the jackpot values.")
     async def jackpots(self, ctx: Context) -> None:
@@ -53,7 +45,7 @@ class BetCommands(Cog):
         Returns:
             None
         """
-        jackpots = await self.get_jackpots()
+        jackpots = SLOT_JACKPOTS
         title = "🎰 Jackpots 🎰"
         description = "``"
         description += "\n".join(
@@ -70,49 +62,164 @@ class BetCommands(Cog):
     )
     @app_commands.autocomplete(color_picked=color_autocomplete)
     @economy_handler()
-    async def roulette(self, ctx: Context, bet_amount, color_picked: str) -> None:
+    async def roulette(
+        self, ctx: Context, bet_amount, color_picked: str, spins: int = 1
+    ) -> None:
         """
         Roulette command for the betting system.
 
         Args:
+            bet_amount (Union[str, int]): The bet of each spin.
+            color_picked (str): The color bet on.
+            spins (int): The amount of spins to play.
+
+        Returns:
             None
+        """
+        await self.play(ctx, GAMES["roulette"], bet_amount, color_picked, spins)
+
+    @hybrid_command(name="coinflip", aliases=["cf"], description="Bet on a coin flip.")
+    @economy_handler()
+    async def coinflip(self, ctx: Context, bet_amount, side: str) -> None:
+        """
+        Coinflip command for the betting system.
+
+        Args:
+            bet_amount (Union[str, int]): The bet amount.
+            side (str): Heads or Tails.
 
         Returns:
             None
         """
-        bet_amount = await self.bet_validator(ctx, ctx.user_data, bet_amount)
+        await self.play(ctx, GAMES["coinflip"], bet_amount, side)
+
+    async def play(
+        self,
+        ctx: Context,
+        game: Game,
+        bet_amount: Union[str, int],
+        choice: Optional[str] = None,
+        spins: int = 1,
+    ) -> None:
+        """
+        Settles a bet on a game: validates it, draws an outcome and applies the balance change.
+
+        Several spins are drawn in one batch and settled with a single balance change.
+
+        Args:
+            game (Game): The game played.
+            bet_amount (Union[str, int]): The bet amount.
+            choice (Optional[str]): What was bet on, for games with choices.
+            spins (int): The amount of spins to play.
+
+        Returns:
+            None
+        """
+        user = ctx.user_data
+
+        if not 1 <= spins <= MAX_SPINS:
+            return await send_bot_embed(
+                ctx, description=f"You can play between 1 and **{MAX_SPINS}** spins at once."
+            )
+
+        try:
+            choice = game.parse_choice(choice)
+        except ValueError as e:
+            return await send_bot_embed(ctx, description=str(e))
+
+        bet_amount = await self.bet_validator(ctx, user, bet_amount)
 
         if bet_amount == -1:
             return
 
-        total_chances = 37
-        bet_multiplier = 2
-        random_value = randint(0, total_chances)
-        red_color = ceil((total_chances - 1) / 2)
-        red_color = list(range(1, red_color))
-        rng_color = None
+        if game.max_bet and bet_amount > game.max_bet:
+            return await send_bot_embed(
+                ctx, description=f"You can bet at most **{game.max_bet}** on {game.name}."
+            )
+
+        if spins > 1:
+            return await self.play_many(ctx, game, choice, bet_amount, spins)
+
+        outcome = game.draw()
+        winnings = game.winnings(outcome, choice, bet_amount)
+
+        # The stake must still be covered when the bet settles.
+        new_balance = await settle_game_outcome(
+            user.id, winnings - bet_amount, min_balance=winnings, reason=game.name
+        )
+
+        if new_balance is None:
+            return await send_bot_embed(
+                ctx, description="You do not have enough money to bet."
+            )
+
+        description = game.describe(
+            ctx.author.display_name, game.outcomes[outcome], choice, bet_amount, winnings
+        )
+        await send_bot_embed(ctx, title=game.title, description=description)
+
+    async def play_many(
+        self, ctx: Context, game: Game, choice: Optional[str], bet_amount: int, spins: int
+    ) -> None:
+        """
+        Plays several spins of a game and replies with a single summary.
+
+        Args:
+            game (Game): The game played.
+            choice (Optional[str]): What was bet on, for games with choices.
+            bet_amount (int): The bet of each spin.
+            spins (int): The amount of spins requested.
 
+        Returns:
+            None
+        """
         user = ctx.user_data
+        batch = game.play_many(choice, bet_amount, spins, user.balance)
+        new_balance = await settle_game_outcome(
+            user.id, batch.net, min_balance=batch.min_balance, reason=game.name
+        )
 
-        if random_value == 0:
-            rng_color = "Green"
-            bet_multiplier = 14
+        if new_balance is None:
+            return await send_bot_embed(
+                ctx, description="You do not have enough money to bet."
+            )
 
-        elif random_value in red_color:
-            rng_color = "Red"
+        await send_bot_embed(
+            ctx,
+            title=game.title or f"🎲 {game.name.capitalize()}",
+            description=self.spin_summary(ctx, bet_amount, spins, batch),
+        )
 
-        else:
-            rng_color = "Black"
+    def spin_summary(
+        self, ctx: Context, bet_amount: int, spins: int, batch: SpinBatch
+    ) -> str:
+        """
+        Summarizes several spins.
 
-        if color_picked.lower() == rng_color.lower():
-            user.balance += bet_amount * bet_multiplier
-            description = f"🎉 **{ctx.author.display_name}** has won **{bet_amount * bet_multiplier}**."
-        else:
-            user.balance -= bet_amount
-            description = f"😢 **{ctx.author.display_name}** has lost **{bet_amount}** The color picked was **{rng_color}**"
+        Args:
+            bet_amount (int): The bet of each spin.
+            spins (int): The amount of spins requested.
+            batch (SpinBatch): The spins played.
+
+        Returns:
+            str: The summary.
+        """
+        description = f"🎲 **{ctx.author.display_name}** played **{batch.played}** spins of **{bet_amount}**"
 
-        if await update_user(user.id, balance=user.balance):
-            await send_bot_embed(ctx, description=description)
+        if batch.played < spins:
+            description += " before running out of money"
+
+        outcome = "won" if batch.net >= 0 else "lost"
+        description += (
+            f".\n\nWagered: **{bet_amount * batch.played}**"
+            f"\nPaid back: **{batch.paid_back}**"
+            f"\nBiggest win: **{max(batch.biggest_win, 0)}**"
+            f"\nThey have {outcome} **{abs(batch.net)}** in total."
+        )
+        distribution = "\n".join(
+            f"{label}: {count}" for label, count in batch.distribution.items()
+        )
+        return f"{description}\n```\n{distribution}\n```"
 
     async def bet_validator(
         self, ctx: Context, User: User, bet_amount: Union[str, int]
@@ -144,77 +251,6 @@ class BetCommands(Cog):
 
         return bet_amount
 
-    async def slots_handler(self, ctx: Context, User, bet_amount) -> None:
-        User.balance -= bet_amount
-        fruits = await self.get_fruits()
-        random_fruits = choices(fruits, k=MAX_SLOTS)
-
-        title = "🎰 Slot Machine 🎰"
-        row1 = "| {} | {} | {} |".format(*choices(fruits, k=3))
-        row2 = "| {} | {} | {} | <".format(*random_fruits)
-        row3 = "| {} | {} | {} |".format(*choices(fruits, k=3))
-        description = "```\n{}\n{}\n{}\n```".format(row1, row2, row3)
-
-        fruits_freq = Counter(random_fruits)
-        possible_jackpots = await self.get_jackpots()
-
-        if len(fruits_freq) == 1:
-            fruit = fruits_freq.most_common(1)[0][0]
-            fruit = fruit * 3
-            jackpot = possible_jackpots[fruit]
-            User.balance += jackpot * bet_amount
-            description += f"\n🎉 **{ctx.author.display_name}** hit the jackpot! They won **{jackpot * bet_amount}**."
-
-        elif len(fruits_freq) == 2:
-            fruit = fruits_freq.most_common(1)[0][0]
-            fruit = fruit * 2
-            jackpot = possible_jackpots[fruit]
-            User.balance += int(jackpot * bet_amount)
-            description += f"\n💰 **{ctx.author.display_name}** has won **{int(jackpot * bet_amount)}**."
-
-        else:
-            description += (
-                f"\n😢 **{ctx.author.display_name}** has lost **{bet_amount}**."
-            )
-
-        if await update_user(User.id, balance=User.balance):
-            await send_bot_embed(ctx, title=title, description=description)
-
-    async def get_jackpots(self) -> dict:
-        """
-        Returns the jackpot values for the casino.
-
-        Args:
-            None
-
-        Returns:
-            dict: The jackpot values.
-        """
-        return {
-            "🍇🍇🍇": 12,
-            "🍋🍋🍋": 9,
-            "🍒🍒🍒": 7,
-            "🍊🍊🍊": 5,
-            "🍉🍉🍉": 3,
-            "🍇🍇": 1.5,
-            "🍋🍋": 1.4,
-            "🍒🍒": 1.3,
-            "🍊🍊": 1.2,
-            "🍉🍉": 1.1,
-        }
-
-    async def get_fruits(self) -> list:
-        """
-        Returns the fruits for the casino.
-
-        Args:
-            None
-
-        Returns:
-            list: The fruits.
-        """
-        return ["🍇", "🍋", "🍒", "🍊", "🍉"]
-
 
 async def setup(bot):
     await bot.add_cog(BetCommands(bot))
@@ -2,9 +2,11 @@
 This module contains the economy commands for the bot.
 """
 
+import aiohttp
+import asyncio
 from math import ceil
 from discord.ext.commands import Cog, Context, hybrid_command
-from discord import Interaction, app_commands, Member
+from discord import Interaction, app_commands, Member, Forbidden, NotFound, HTTPException
 from tortoise.transactions import in_transaction
 from core.tools import (
     send_bot_embed,
@@ -13,23 +15,49 @@ from core.tools import (
     ugc_item_auto_complete,
     confirmation_popup,
     embed_builder,
+    log_error,
+    log_warning,
 )
-from models import User
+from models import User, PurchaseOutbox
 from repositories import (
-    get_command_timestamp,
-    create_command_timestamp,
-    update_command_timestamp,
-    update_user,
+    claim_reward,
+    claim_rewards,
+    adjust_balance,
+    after_commit,
     get_user,
     get_code_from_item,
     get_item_by_roblox_id,
+    claim_codes,
+    enqueue_purchase,
+    get_due_purchases,
+    mark_purchase_delivered,
+    reschedule_purchase,
+    refund_purchase,
+    fail_purchase,
 )
 from random import randint
-from config import DEFAULT_CLAIM_COOLDOWN
-from datetime import datetime, timezone
+from typing import Optional
+from config import (
+    DEFAULT_CLAIM_COOLDOWN,
+    MAX_PURCHASE_QUANTITY,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_BACKOFF_BASE,
+    OUTBOX_BACKOFF_MAX,
+    OUTBOX_LEASE,
+)
 
 __all__ = ("EconomyCommands",)
 
+REWARD_RANGES = {
+    "candy": (300, 3000),
+    "candyhunt": (500, 5000),
+    "candydrop": (500, 5000),
+    "booster": (500, 5000),
+}  # The range of candies rewarded by each timed reward
+BOOSTER_REWARDS = {"candydrop", "booster"}  # The rewards reserved to server boosters
+
 
 class EconomyCommands(Cog):
 
@@ -77,9 +105,8 @@ class EconomyCommands(Cog):
         Returns:
             None
         """
-        points_rewarded = await self.get_points_rewarded(500, 5000)
+        points_rewarded = await self.get_points_rewarded(*REWARD_RANGES["booster"])
         await self.generic_timestamp_function(
-            User,
             ctx,
             "booster",
             f"{await retrieve_application_emoji(emoji_name='booster', emoji_id=1297349785442979881)} You have claimed your daily booster reward",
@@ -89,9 +116,8 @@ class EconomyCommands(Cog):
     @hybrid_command(name="candydrop", description="Claim your daily candy drop.")
     @economy_handler(booster_command=True)
     async def candy_drop(self, ctx: Context) -> None:
-        points_rewarded = await self.get_points_rewarded(500, 5000)
+        points_rewarded = await self.get_points_rewarded(*REWARD_RANGES["candydrop"])
         await self.generic_timestamp_function(
-            ctx.user_data,
             ctx,
             "candydrop",
             f"{await retrieve_application_emoji('booster', 1297349785442979881)}You have claimed your daily candy drop and found **{points_rewarded}** candies.",
@@ -101,9 +127,8 @@ class EconomyCommands(Cog):
     @hybrid_command(name="candy", description="Claim your daily candy reward.")
     @economy_handler()
     async def candy(self, ctx: Context) -> None:
-        points_rewarded = await self.get_points_rewarded(300, 3000)
+        points_rewarded = await self.get_points_rewarded(*REWARD_RANGES["candy"])
         await self.generic_timestamp_function(
-            ctx.user_data,
             ctx,
             "candy",
             f"{await retrieve_application_emoji('candy', 1295095109645373474, True)} You check your pockets and find **{points_rewarded}** candies.",
@@ -113,9 +138,8 @@ class EconomyCommands(Cog):
     @hybrid_command(name="candyhunt", description="Claim your daily candy hunt reward.")
     @economy_handler()
     async def candy_hunt(self, ctx: Context) -> None:
-        points_rewarded = await self.get_points_rewarded(500, 5000)
+        points_rewarded = await self.get_points_rewarded(*REWARD_RANGES["candyhunt"])
         await self.generic_timestamp_function(
-            ctx.user_data,
             ctx,
             "candyhunt",
             f"{await retrieve_application_emoji('candy', 1295095109645373474, True)} You’re on a mission to gather some delicious candies! You stumble upon a hidden stash in the forest finding **{points_rewarded}** candies.",
@@ -124,7 +148,6 @@ class EconomyCommands(Cog):
 
     async def generic_timestamp_function(
         self,
-        user: User,
         ctx: Context,
         command_name: str,
         description: str,
@@ -134,34 +157,74 @@ class EconomyCommands(Cog):
         Generic timestamp function for the economy commands.
 
         Args:
-            User (User): The user data.
             ctx (Context): The context.
-            description (str): The description to send.
             command_name (str): The command name.
+            description (str): The description to send.
+            points_rewarded (int): The amount of candies rewarded.
         """
-        is_first_time_claiming = False
-        member = ctx.author
-
-        timestamp = await get_command_timestamp(member.id, command_name)
-
-        if not timestamp:
-            is_first_time_claiming = True
-            await create_command_timestamp(member.id, command_name)
-            timestamp = await get_command_timestamp(member.id, command_name)
-
-        time_difference = (datetime.now(timezone.utc) - timestamp).seconds
-        time_remaining = DEFAULT_CLAIM_COOLDOWN - time_difference
+        result = await claim_reward(
+            ctx.author.id, command_name, points_rewarded, DEFAULT_CLAIM_COOLDOWN
+        )
 
-        if timestamp and time_remaining > 0 and not is_first_time_claiming:
+        if not result.claimed:
             return await send_bot_embed(
                 ctx,
-                description=f":no_entry_sign: You have already claimed this reward, please wait **{ceil((time_remaining) / 60)}** minutes.",
+                description=f":no_entry_sign: You have already claimed this reward, please wait **{ceil(result.remaining / 60)}** minutes.",
             )
 
-        await update_user(member.id, balance=user.balance + points_rewarded)
-        await update_command_timestamp(member.id, command_name)
         await send_bot_embed(ctx, description=description)
 
+    @hybrid_command(name="claimall", description="Claim every reward available to you.")
+    @economy_handler()
+    async def claim_all(self, ctx: Context) -> None:
+        """
+        Allows users to claim every reward that is off cooldown at once.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        rewards = {
+            command_name: await self.get_points_rewarded(*points_range)
+            for command_name, points_range in REWARD_RANGES.items()
+            if command_name not in BOOSTER_REWARDS or ctx.author.premium_since
+        }
+        results = await claim_rewards(ctx.author.id, rewards, DEFAULT_CLAIM_COOLDOWN)
+
+        candy_emoji = await retrieve_application_emoji(
+            "candy", 1295095109645373474, True
+        )
+        claimed_lines = []
+        cooldown_lines = []
+
+        for command_name, result in results.items():
+            if result.claimed:
+                claimed_lines.append(
+                    f"{candy_emoji} **{command_name}**: {rewards[command_name]} candies"
+                )
+            else:
+                cooldown_lines.append(
+                    f":no_entry_sign: **{command_name}**: available in {ceil(result.remaining / 60)} minutes"
+                )
+
+        total_rewarded = sum(
+            rewards[command_name]
+            for command_name, result in results.items()
+            if result.claimed
+        )
+        title = (
+            f"You have claimed {total_rewarded} candies"
+            if total_rewarded
+            else "You have already claimed every reward"
+        )
+        await send_bot_embed(
+            ctx,
+            title=title,
+            description="\n".join(claimed_lines + cooldown_lines),
+        )
+
     async def get_points_rewarded(self, initial_range: int, final_range: int) -> int:
         """
         Get the points rewarded for the command.
@@ -237,37 +300,323 @@ class EconomyCommands(Cog):
         self, interaction: Interaction, chosen_item, user: User
     ) -> None:
         """
-        Dispatch the item codes to the user who purchased the items
+        Charge the user for an item and queue the DM with its code.
+
+        The transaction only covers the debit, the code claim and the queued DM, the
+        DM itself is delivered by the purchase dispatcher once the transaction committed.
 
         Args:
-            chosen_items (list): The items that the user has chosen to purchase
+            chosen_item (dict): The item that the user has chosen to purchase
+            user (User): The user data.
         """
-        async with in_transaction():
-            failure_error_message = "⚠️ Something went wrong! We couldn’t send you the codes, possibly because your direct messages are disabled or you blocked me. Don’t worry, your payment has been refunded, and you can try purchasing the items again."
-            await update_user(user.id, balance=user.balance - chosen_item["item_price"])
+        item_code = None
 
-            item_code = await get_code_from_item(chosen_item["item_id"])
+        async with after_commit(), in_transaction():
+            new_balance = await adjust_balance(
+                user.id, -chosen_item["item_price"], reason="purchase"
+            )
 
-            if not item_code:
-                failure_error_message = "❌ Oops! Someone else bought the items before you did. Don't worry, your money has been refunded and you can buy the items again."
+            if new_balance is not None:
+                item_code = await get_code_from_item(chosen_item["item_id"])
+
+                if not item_code:
+                    await adjust_balance(user.id, chosen_item["item_price"], reason="refund")
+                else:
+                    await enqueue_purchase(
+                        user.id,
+                        chosen_item["item_price"],
+                        {chosen_item["item_id"]: [item_code]},
+                        title="✅ Purchase successful",
+                        description=f"Here is the code you purchased: \n```{item_code}```",
+                    )
+
+        if new_balance is None:
+            return await send_bot_embed(
+                interaction,
+                description="❌ You do not have enough candies to purchase this item.",
+                is_dm=True,
+            )
 
-                await update_user(
-                    user.id, balance=user.balance + chosen_item["item_price"]
+        if not item_code:
+            return await send_bot_embed(
+                interaction,
+                description="❌ Oops! Someone else bought the items before you did. Don't worry, your money has been refunded and you can buy the items again.",
+                ephemeral=True,
+                is_dm=True,
+            )
+
+        self.outbox_wakeup.set()
+
+    @app_commands.command(
+        name="buy", description="Buy several codes of up to three items at once."
+    )
+    @app_commands.autocomplete(
+        item=ugc_item_auto_complete,
+        second_item=ugc_item_auto_complete,
+        third_item=ugc_item_auto_complete,
+    )
+    async def buy_items(
+        self,
+        interaction: Interaction,
+        item: str,
+        quantity: app_commands.Range[int, 1, MAX_PURCHASE_QUANTITY] = 1,
+        second_item: Optional[str] = None,
+        second_quantity: app_commands.Range[int, 1, MAX_PURCHASE_QUANTITY] = 1,
+        third_item: Optional[str] = None,
+        third_quantity: app_commands.Range[int, 1, MAX_PURCHASE_QUANTITY] = 1,
+    ) -> None:
+        """
+        Allows users to buy several codes of one or more items in a single purchase.
+
+        Args:
+            item (str): The ID of the first item.
+            quantity (int): The amount of codes of the first item.
+            second_item (Optional[str]): The ID of the second item.
+            second_quantity (int): The amount of codes of the second item.
+            third_item (Optional[str]): The ID of the third item.
+            third_quantity (int): The amount of codes of the third item.
+
+        Returns:
+            None
+        """
+        quantities = {}
+
+        for item_id, item_quantity in (
+            (item, quantity),
+            (second_item, second_quantity),
+            (third_item, third_quantity),
+        ):
+            if item_id is None:
+                continue
+
+            if not item_id.isdigit():
+                return await send_bot_embed(
+                    interaction,
+                    description="❌ The item you are looking for does not exist.",
+                    ephemeral=True,
                 )
 
+            item_id = int(item_id)
+            quantities[item_id] = min(
+                quantities.get(item_id, 0) + item_quantity, MAX_PURCHASE_QUANTITY
+            )
+
+        cart = []
+
+        for item_id, item_quantity in quantities.items():
+            chosen_item = await get_item_by_roblox_id(item_id)
+
+            if not chosen_item:
                 return await send_bot_embed(
                     interaction,
-                    description=failure_error_message,
+                    description="❌ The item you are looking for does not exist.",
                     ephemeral=True,
-                    is_dm=True,
                 )
-            await send_bot_embed(
+
+            cart.append((chosen_item, item_quantity))
+
+        user = await get_user(interaction.user.id)
+
+        if not user:
+            return await send_bot_embed(
+                interaction,
+                description="❌ You do not have an account yet.",
+                ephemeral=True,
+            )
+
+        total_price = sum(
+            chosen_item["item_price"] * item_quantity for chosen_item, item_quantity in cart
+        )
+
+        if user.balance < total_price:
+            return await send_bot_embed(
                 interaction,
-                title="✅ Purchase successful",
-                description=f"Here is the code you purchased: \n```{item_code}```",
+                description=f"❌ You need **{total_price}** candies to buy these items.",
+                ephemeral=True,
+            )
+
+        await send_bot_embed(
+            interaction,
+            description="✅ Check your DMs to confirm the purchase.",
+            ephemeral=True,
+        )
+
+        cart_description = "\n".join(
+            f"**{item_quantity}x {chosen_item['item_name']}**: {chosen_item['item_price'] * item_quantity} candies"
+            for chosen_item, item_quantity in cart
+        )
+        confirmation_embed = await embed_builder(
+            title="Are you sure you want to purchase the following items?",
+            description=f"{cart_description}\n\n**Total:** {total_price} candies",
+        )
+
+        result = await confirmation_popup(interaction, confirmation_embed, is_dm=True)
+
+        if not result:
+            return
+
+        await self.dispatch_cart_codes(interaction, cart, user, total_price)
+
+    async def dispatch_cart_codes(
+        self, interaction: Interaction, cart: list, user: User, total_price: int
+    ) -> None:
+        """
+        Debit the cart once, claim every code and queue a single DM with them.
+
+        Items that sold out partway are partially filled and the remainder is refunded.
+
+        Args:
+            cart (list): The chosen items paired with the amount of codes to buy.
+            user (User): The user data.
+            total_price (int): The price of the whole cart.
+        """
+        refund = 0
+        purchased = []
+
+        async with after_commit(), in_transaction():
+            new_balance = await adjust_balance(user.id, -total_price, reason="purchase")
+
+            if new_balance is not None:
+                for chosen_item, item_quantity in cart:
+                    item_codes = await claim_codes(chosen_item["item_id"], item_quantity)
+                    refund += chosen_item["item_price"] * (item_quantity - len(item_codes))
+
+                    if item_codes:
+                        purchased.append((chosen_item, item_codes))
+
+                if refund:
+                    await adjust_balance(user.id, refund, reason="refund")
+
+                if purchased:
+                    sections = []
+
+                    for chosen_item, item_codes in purchased:
+                        codes_block = "\n".join(item_codes)
+                        sections.append(f"**{chosen_item['item_name']}**\n```{codes_block}```")
+
+                    description = "\n\n".join(sections)
+                    footer_text = (
+                        f"Some items sold out before your order was filled, {refund} candies have been refunded."
+                        if refund
+                        else ""
+                    )
+                    await enqueue_purchase(
+                        user.id,
+                        total_price - refund,
+                        {
+                            chosen_item["item_id"]: item_codes
+                            for chosen_item, item_codes in purchased
+                        },
+                        title="✅ Purchase successful",
+                        description=f"Here are the codes you purchased:\n\n{description}",
+                        footer_text=footer_text,
+                    )
+
+        if new_balance is None:
+            return await send_bot_embed(
+                interaction,
+                description="❌ You do not have enough candies to purchase these items.",
                 is_dm=True,
-                dm_failure_error_message=failure_error_message,
             )
 
+        if not purchased:
+            return await send_bot_embed(
+                interaction,
+                description="❌ Oops! Someone else bought the items before you did. Don't worry, your money has been refunded and you can buy the items again.",
+                is_dm=True,
+            )
+
+        self.outbox_wakeup.set()
+
+    async def run_purchase_dispatcher(self) -> None:
+        """
+        Deliver the queued purchase DMs, woken up by new purchases and polling for retries.
+        """
+        await self.bot.wait_until_ready()
+
+        while True:
+            try:
+                await asyncio.wait_for(self.outbox_wakeup.wait(), OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+            self.outbox_wakeup.clear()
+
+            try:
+                purchases = await get_due_purchases(OUTBOX_BATCH_SIZE, OUTBOX_LEASE)
+                await asyncio.gather(
+                    *(self.deliver_purchase(purchase) for purchase in purchases)
+                )
+            except Exception as e:
+                log_error("Failed to deliver the queued purchase DMs", e)
+                continue
+
+            # A full batch means more DMs may already be due.
+            if len(purchases) == OUTBOX_BATCH_SIZE:
+                self.outbox_wakeup.set()
+
+    async def deliver_purchase(self, purchase: PurchaseOutbox) -> None:
+        """
+        Try to deliver a queued purchase DM, retrying later or refunding the purchase on failure.
+
+        Args:
+            purchase (PurchaseOutbox): The queued DM.
+        """
+        try:
+            buyer = self.bot.get_user(purchase.user_id) or await self.bot.fetch_user(
+                purchase.user_id
+            )
+            embed = await embed_builder(
+                title=purchase.title,
+                description=purchase.description,
+                footer_text=purchase.footer_text,
+            )
+            await buyer.send(embed=embed)
+        except (Forbidden, NotFound) as e:
+            # The DM can never be delivered, e.g. the user closed their DMs.
+            await self.give_up_purchase(purchase, str(e), restock=True)
+        except (HTTPException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if purchase.attempts + 1 >= OUTBOX_MAX_ATTEMPTS:
+                # The DM may have reached the buyer before the error, its codes are not resold.
+                await self.give_up_purchase(
+                    purchase, f"{e} after {OUTBOX_MAX_ATTEMPTS} attempts", restock=False
+                )
+                return
+
+            delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2**purchase.attempts)
+            await reschedule_purchase(purchase.id, delay, str(e))
+        else:
+            await mark_purchase_delivered(purchase.id)
+
+    async def give_up_purchase(
+        self, purchase: PurchaseOutbox, error: str, restock: bool
+    ) -> None:
+        """
+        Refund an undelivered purchase, taking it off the queue for good if the refund fails.
+
+        Args:
+            purchase (PurchaseOutbox): The queued DM.
+            error (str): Why the DM could not be delivered.
+            restock (bool): Whether the DM definitely never reached the buyer.
+        """
+        try:
+            await refund_purchase(purchase.id, error, restock=restock)
+        except Exception as e:
+            await fail_purchase(purchase.id, f"{error}, refund failed: {e}")
+            return log_error(f"Failed to refund purchase {purchase.id}, it needs a manual review", e)
+
+        if restock:
+            log_warning(f"Refunded purchase {purchase.id}: {error}")
+        else:
+            log_warning(f"Refunded purchase {purchase.id}, its codes are held for review: {error}")
+
+    async def cog_load(self) -> None:
+        self.outbox_wakeup = asyncio.Event()
+        self.outbox_task = asyncio.create_task(self.run_purchase_dispatcher())
+
+    async def cog_unload(self) -> None:
+        self.outbox_task.cancel()
+
+
 async def setup(bot):
     await bot.add_cog(EconomyCommands(bot))
@@ -0,0 +1,348 @@
+"""
+This module contains the casino game engine, shared by the bet commands and the simulator.
+"""
+import numpy as np
+from abc import ABC, abstractmethod
+from array import array
+from random import choices as random_choices, randrange
+from itertools import product
+from math import ceil
+from typing import Hashable, Iterable, NamedTuple, Optional
+from config import MAX_SLOTS, MAX_COINFLIP
+
+__all__ = (
+    "SLOT_FRUITS",
+    "SLOT_JACKPOTS",
+    "ROULETTE_COLORS",
+    "SpinBatch",
+    "Game",
+    "Slots",
+    "Roulette",
+    "Coinflip",
+    "GAMES",
+)
+
+SLOT_FRUITS = ("🍇", "🍋", "🍒", "🍊", "🍉")
+SLOT_JACKPOTS = {
+    "🍇🍇🍇": 12,
+    "🍋🍋🍋": 9,
+    "🍒🍒🍒": 7,
+    "🍊🍊🍊": 5,
+    "🍉🍉🍉": 3,
+    "🍇🍇": 1.5,
+    "🍋🍋": 1.4,
+    "🍒🍒": 1.3,
+    "🍊🍊": 1.2,
+    "🍉🍉": 1.1,
+}  # How many times the bet a combination pays back, the bet included
+
+ROULETTE_TOTAL_CHANCES = 37  # The highest pocket, pockets are drawn from 0 up to it
+ROULETTE_RED_POCKETS = frozenset(range(1, ceil((ROULETTE_TOTAL_CHANCES - 1) / 2)))
+ROULETTE_COLORS = ("Red", "Black", "Green")
+ROULETTE_MULTIPLIERS = {
+    "Red": 2,
+    "Black": 2,
+    "Green": 14,
+}  # How many times the bet a winning color adds to the balance, the bet is kept
+
+COIN_SIDES = ("Heads", "Tails")
+
+rng = np.random.default_rng()
+
+
+class SpinBatch(NamedTuple):
+    """
+    The outcome of several spins played in a row with the same bet.
+    """
+
+    played: int  # The spins played before the balance ran out
+    net: int  # The balance change of all the spins
+    min_balance: int  # The lowest balance the change may leave, so every spin was covered
+    biggest_win: int  # The largest balance change of a single spin
+    paid_back: int  # The amount paid back by all the spins, the bets included
+    distribution: dict[str, int]  # How many spins landed on each label, most frequent first
+
+
+class Game(ABC):
+    """
+    A casino game whose outcomes are all equally likely.
+
+    The outcome space and the payout of every outcome for every choice are compiled
+    into flat arrays once, so settling a bet is a random index and a lookup.
+    """
+
+    name = ""
+    title: Optional[str] = None
+    choices: tuple[str, ...] = ()  # What can be bet on, empty when there is nothing to pick
+    max_bet: Optional[int] = None
+
+    def __init__(self) -> None:
+        self.outcomes = tuple(self.outcome_space())
+        self.payout_tables = {
+            choice: array("d", (self.payout(outcome, choice) for outcome in self.outcomes))
+            for choice in self.choices or (None,)
+        }
+        self.payout_arrays = {
+            choice: np.asarray(table) for choice, table in self.payout_tables.items()
+        }
+        labels = [self.label(outcome) for outcome in self.outcomes]
+        self.labels = tuple(dict.fromkeys(labels))
+        self.label_indexes = np.array([self.labels.index(label) for label in labels])
+
+    @abstractmethod
+    def outcome_space(self) -> Iterable[Hashable]:
+        """
+        Lists every outcome of the game.
+
+        Returns:
+            Iterable: The outcomes, all equally likely.
+        """
+
+    @abstractmethod
+    def payout(self, outcome: Hashable, choice: Optional[str]) -> float:
+        """
+        Gets how many times the bet an outcome pays back, the bet included.
+
+        Args:
+            outcome (Hashable): The outcome.
+            choice (Optional[str]): What was bet on.
+
+        Returns:
+            float: The payout, 0 when the bet is lost.
+        """
+
+    @abstractmethod
+    def label(self, outcome: Hashable) -> str:
+        """
+        Names the group an outcome is counted in when summarizing several spins.
+
+        Args:
+            outcome (Hashable): The outcome.
+
+        Returns:
+            str: The label.
+        """
+
+    @abstractmethod
+    def describe(
+        self, player: str, outcome: Hashable, choice: Optional[str], bet: int, winnings: int
+    ) -> str:
+        """
+        Describes the result of a bet.
+
+        Args:
+            player (str): The name of the player.
+            outcome (Hashable): The outcome.
+            choice (Optional[str]): What was bet on.
+            bet (int): The bet amount.
+            winnings (int): The amount paid back.
+
+        Returns:
+            str: The description.
+        """
+
+    def parse_choice(self, choice: Optional[str]) -> Optional[str]:
+        """
+        Matches what a player picked against the choices of the game.
+
+        Args:
+            choice (Optional[str]): What the player picked.
+
+        Returns:
+            Optional[str]: The choice, None for games without one.
+
+        Raises:
+            ValueError: If the pick is not one of the choices.
+        """
+        if not self.choices:
+            return None
+
+        for option in self.choices:
+            if choice and choice.lower() == option.lower():
+                return option
+
+        raise ValueError(f"Please pick one of: {', '.join(self.choices)}.")
+
+    def draw(self) -> int:
+        """
+        Draws an outcome.
+
+        Returns:
+            int: The index of the outcome.
+        """
+        return randrange(len(self.outcomes))
+
+    def winnings(self, outcome_index: int, choice: Optional[str], bet: int) -> int:
+        """
+        Gets the amount an outcome pays back for a bet, rounded down.
+
+        Args:
+            outcome_index (int): The index of the outcome.
+            choice (Optional[str]): What was bet on.
+            bet (int): The bet amount.
+
+        Returns:
+            int: The amount paid back, the bet included.
+        """
+        return int(self.payout_tables[choice][outcome_index] * bet)
+
+    def play_many(
+        self, choice: Optional[str], bet: int, spins: int, balance: int
+    ) -> SpinBatch:
+        """
+        Plays several spins in one vectorized batch, stopping once the balance can not cover the bet.
+
+        Args:
+            choice (Optional[str]): What is bet on.
+            bet (int): The bet of each spin.
+            spins (int): The amount of spins requested.
+            balance (int): The balance before the first spin.
+
+        Returns:
+            SpinBatch: The spins played, the net change and the summary of the outcomes.
+        """
+        outcomes = rng.integers(0, len(self.outcomes), size=spins)
+        winnings = np.floor(self.payout_arrays[choice][outcomes] * bet).astype(np.int64)
+        deltas = winnings - bet
+        change_before = np.concatenate(([0], np.cumsum(deltas)[:-1]))
+        broke = np.flatnonzero(balance + change_before < bet)
+        played = int(broke[0]) if broke.size else spins
+
+        if not played:
+            return SpinBatch(0, 0, 0, 0, 0, {})
+
+        net = int(deltas[:played].sum())
+        counts = np.bincount(self.label_indexes[outcomes[:played]], minlength=len(self.labels))
+
+        return SpinBatch(
+            played=played,
+            net=net,
+            # The balance must still cover the bet at the lowest point of the run.
+            min_balance=net + bet - int(change_before[:played].min()),
+            biggest_win=int(deltas[:played].max()),
+            paid_back=int(winnings[:played].sum()),
+            distribution={
+                self.labels[index]: int(counts[index])
+                for index in np.argsort(-counts, kind="stable")
+                if counts[index]
+            },
+        )
+
+
+class Slots(Game):
+    name = "slots"
+    title = "🎰 Slot Machine 🎰"
+
+    def outcome_space(self) -> Iterable[tuple[str, ...]]:
+        return product(SLOT_FRUITS, repeat=MAX_SLOTS)
+
+    def payout(self, outcome: tuple[str, ...], choice: Optional[str]) -> float:
+        fruits = set(outcome)
+        fruit = max(outcome, key=outcome.count)
+
+        if len(fruits) == 1:
+            return SLOT_JACKPOTS[fruit * 3]
+
+        if len(fruits) == 2:
+            return SLOT_JACKPOTS[fruit * 2]
+
+        return 0
+
+    def label(self, outcome: tuple[str, ...]) -> str:
+        fruits = set(outcome)
+        fruit = max(outcome, key=outcome.count)
+
+        if len(fruits) == 1:
+            return fruit * 3
+
+        if len(fruits) == 2:
+            return fruit * 2
+
+        return "No match"
+
+    def describe(
+        self, player: str, outcome: tuple[str, ...], choice: Optional[str], bet: int, winnings: int
+    ) -> str:
+        row1 = "| {} | {} | {} |".format(*random_choices(SLOT_FRUITS, k=3))
+        row2 = "| {} | {} | {} | <".format(*outcome)
+        row3 = "| {} | {} | {} |".format(*random_choices(SLOT_FRUITS, k=3))
+        description = "```\n{}\n{}\n{}\n```".format(row1, row2, row3)
+
+        if len(set(outcome)) == 1:
+            return description + f"\n🎉 **{player}** hit the jackpot! They won **{winnings}**."
+
+        if winnings:
+            return description + f"\n💰 **{player}** has won **{winnings}**."
+
+        return description + f"\n😢 **{player}** has lost **{bet}**."
+
+
+class Roulette(Game):
+    name = "roulette"
+    choices = ROULETTE_COLORS
+
+    def outcome_space(self) -> Iterable[int]:
+        return range(ROULETTE_TOTAL_CHANCES + 1)
+
+    def payout(self, outcome: int, choice: Optional[str]) -> float:
+        if self.color(outcome) != choice:
+            return 0
+
+        return ROULETTE_MULTIPLIERS[choice] + 1
+
+    def label(self, outcome: int) -> str:
+        return self.color(outcome)
+
+    def describe(
+        self, player: str, outcome: int, choice: Optional[str], bet: int, winnings: int
+    ) -> str:
+        if winnings:
+            return f"🎉 **{player}** has won **{winnings - bet}**."
+
+        return f"😢 **{player}** has lost **{bet}** The color picked was **{self.color(outcome)}**"
+
+    def color(self, pocket: int) -> str:
+        """
+        Gets the color of a roulette pocket.
+
+        Args:
+            pocket (int): The pocket, from 0 to ROULETTE_TOTAL_CHANCES.
+
+        Returns:
+            str: Green, Red or Black.
+        """
+        if pocket == 0:
+            return "Green"
+
+        if pocket in ROULETTE_RED_POCKETS:
+            return "Red"
+
+        return "Black"
+
+
+class Coinflip(Game):
+    name = "coinflip"
+    choices = COIN_SIDES
+    max_bet = MAX_COINFLIP
+
+    def outcome_space(self) -> Iterable[str]:
+        return COIN_SIDES
+
+    def payout(self, outcome: str, choice: Optional[str]) -> float:
+        return 2 if outcome == choice else 0
+
+    def label(self, outcome: str) -> str:
+        return outcome
+
+    def describe(
+        self, player: str, outcome: str, choice: Optional[str], bet: int, winnings: int
+    ) -> str:
+        description = f"🪙 The coin landed on **{outcome}**."
+
+        if winnings:
+            return description + f"\n🎉 **{player}** has won **{winnings - bet}**."
+
+        return description + f"\n😢 **{player}** has lost **{bet}**."
+
+
+GAMES = {game.name: game for game in (Slots(), Roulette(), Coinflip())}
@@ -1,4 +1,224 @@
 import aiohttp
+import asyncio
+from collections import Counter
+from random import uniform
+from typing import Optional
+from yarl import URL
+from config import (
+    HTTP_POOL_SIZE,
+    HTTP_POOL_SIZE_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_TIMEOUT,
+    ROBLOX_DETAILS_CACHE_TTL,
+    ROBLOX_THUMBNAIL_CACHE_TTL,
+    ROBLOX_CACHE_STALE_TTL,
+    ROBLOX_CACHE_MAX_SIZE,
+    ROBLOX_DETAILS_CONCURRENCY,
+    ROBLOX_THUMBNAIL_BATCH_SIZE,
+    ROBLOX_REQUESTS_PER_SECOND,
+    ROBLOX_REQUEST_BURST,
+    ROBLOX_MAX_RETRIES,
+    ROBLOX_BACKOFF_BASE,
+    ROBLOX_BACKOFF_MAX,
+    ROBLOX_BREAKER_THRESHOLD,
+    ROBLOX_BREAKER_COOLDOWN,
+)
+from core.tools import (
+    ResponseCache,
+    TokenBucket,
+    CircuitBreaker,
+    CircuitOpenError,
+    log_warning,
+)
+
+http_session: Optional[aiohttp.ClientSession] = None
+details_cache = ResponseCache(
+    "asset details",
+    ttl=ROBLOX_DETAILS_CACHE_TTL,
+    stale_ttl=ROBLOX_CACHE_STALE_TTL,
+    max_size=ROBLOX_CACHE_MAX_SIZE,
+)
+thumbnail_cache = ResponseCache(
+    "asset thumbnails",
+    ttl=ROBLOX_THUMBNAIL_CACHE_TTL,
+    stale_ttl=ROBLOX_CACHE_STALE_TTL,
+    max_size=ROBLOX_CACHE_MAX_SIZE,
+)
+buckets: dict[str, TokenBucket] = {}
+breakers: dict[str, CircuitBreaker] = {}
+request_stats = Counter()
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    Creates an HTTP session with a keep-alive connection pool.
+
+    Returns:
+        aiohttp.ClientSession: The session.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_SIZE,
+        limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def set_http_session(session: Optional[aiohttp.ClientSession]) -> None:
+    """
+    Sets the session shared by the route functions.
+
+    Args:
+        session (aiohttp.ClientSession): The session, usually owned by the bot.
+    """
+    global http_session
+    http_session = session
+
+
+async def get_json(url: str) -> dict:
+    """
+    Gets a JSON response through the shared session, reusing its open connections.
+
+    Requests are paced per host, retried with jittered exponential backoff when
+    Roblox throttles or fails, and refused at once while the host is unhealthy.
+    Falls back to a short-lived session when no shared one is set, e.g. outside the bot.
+
+    Args:
+        url (str): The URL to request.
+    """
+    if http_session is None or http_session.closed:
+        async with create_http_session() as session:
+            return await request_json(session, url)
+
+    return await request_json(http_session, url)
+
+
+async def request_json(session: aiohttp.ClientSession, url: str) -> dict:
+    """
+    Sends a GET request, applying the host's rate limit, retries and circuit breaker.
+
+    Args:
+        session (aiohttp.ClientSession): The session to send the request with.
+        url (str): The URL to request.
+
+    Returns:
+        dict: The response, the last one if Roblox still throttles after every retry.
+
+    Raises:
+        CircuitOpenError: If the host is unhealthy.
+    """
+    host = URL(url).host
+    bucket = buckets.setdefault(
+        host, TokenBucket(ROBLOX_REQUESTS_PER_SECOND, ROBLOX_REQUEST_BURST)
+    )
+    breaker = breakers.setdefault(
+        host, CircuitBreaker(ROBLOX_BREAKER_THRESHOLD, ROBLOX_BREAKER_COOLDOWN)
+    )
+
+    for attempt in range(ROBLOX_MAX_RETRIES + 1):
+        try:
+            breaker.before_request()
+        except CircuitOpenError:
+            request_stats["short_circuited"] += 1
+            raise
+
+        retry_after = None
+
+        try:
+            await bucket.acquire()
+            request_stats["requests"] += 1
+
+            async with session.get(url) as response:
+                status = response.status
+                retry_after = response.headers.get("Retry-After")
+                payload = await response.json(content_type=None)
+        # Throttled and failing responses are often HTML pages, which fail to decode.
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            breaker.record_failure()
+            request_stats["failures"] += 1
+
+            if attempt == ROBLOX_MAX_RETRIES:
+                raise
+        except BaseException:
+            # Cancelled or unexpected, the request says nothing about the host.
+            breaker.release_probe()
+            raise
+        else:
+            if not is_throttled(status, payload):
+                breaker.record_success()
+                return payload
+
+            breaker.record_failure()
+            request_stats["throttled"] += 1
+
+            if attempt == ROBLOX_MAX_RETRIES:
+                return payload
+
+        request_stats["retries"] += 1
+        delay = retry_delay(attempt, retry_after)
+        log_warning(f"Request to {host} failed, retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+def is_throttled(status: int, payload) -> bool:
+    """
+    Checks whether a response means Roblox is throttling or failing.
+
+    Args:
+        status (int): The HTTP status.
+        payload: The decoded response.
+
+    Returns:
+        bool: Whether the request should be retried.
+    """
+    if status == 429 or status >= 500:
+        return True
+
+    errors = payload.get("errors", []) if isinstance(payload, dict) else []
+    return any(error.get("code") == 0 for error in errors)
+
+
+def retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    """
+    Computes how long to wait before retrying, honouring the Retry-After header.
+
+    Args:
+        attempt (int): The index of the attempt that failed.
+        retry_after (Optional[str]): The Retry-After header, if any.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), ROBLOX_BACKOFF_MAX)
+
+    # Full jitter keeps concurrent retries from hitting Roblox in lockstep.
+    return uniform(0, min(ROBLOX_BACKOFF_MAX, ROBLOX_BACKOFF_BASE * 2**attempt))
+
+
+def get_request_stats() -> dict:
+    """
+    Gets the counters of the Roblox client.
+
+    Returns:
+        dict: The request counters and the state of each host.
+    """
+    return {
+        "counters": dict(request_stats),
+        "hosts": {
+            host: {
+                "circuit": breakers[host].state,
+                "times_opened": breakers[host].times_opened,
+                "rate_limited_waits": buckets[host].waits,
+            }
+            for host in breakers
+        },
+    }
+
 
 async def get_item_by_id(id: int):
     """
@@ -7,9 +227,11 @@ async def get_item_by_id(id: int):
     Args:
         id (int): The item ID.
     """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"https://economy.roblox.com/v2/assets/{id}/details") as response:
-            return await response.json()
+    return await details_cache.get(
+        id,
+        lambda: get_json(f"https://economy.roblox.com/v2/assets/{id}/details"),
+        is_cacheable=lambda response: "errors" not in response,
+    )
         
 async def get_item_image_by_id(id: int):
     """
@@ -18,6 +240,104 @@ async def get_item_image_by_id(id: int):
     Args:
         id (int): The item ID.
     """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"https://thumbnails.roblox.com/v1/assets?assetIds={id}&size=150x150&format=Png&isCircular=false") as response:
-            return await response.json()
\ No newline at end of file
+    return await thumbnail_cache.get(
+        id,
+        lambda: get_json(f"https://thumbnails.roblox.com/v1/assets?assetIds={id}&size=150x150&format=Png&isCircular=false"),
+        is_cacheable=is_completed_thumbnail,
+    )
+
+
+async def get_items_by_ids(ids: list[int]) -> dict[int, dict]:
+    """
+    Gets the information of several roblox items concurrently, a few requests at a time.
+
+    Args:
+        ids (list[int]): The item IDs.
+
+    Returns:
+        dict: The information of each item, keyed by item ID.
+    """
+    semaphore = asyncio.Semaphore(ROBLOX_DETAILS_CONCURRENCY)
+
+    async def fetch(id: int) -> dict:
+        async with semaphore:
+            return await get_item_by_id(id)
+
+    responses = await asyncio.gather(*(fetch(id) for id in ids))
+    return dict(zip(ids, responses))
+
+
+async def get_item_images_by_ids(ids: list[int]) -> dict[int, Optional[str]]:
+    """
+    Gets the images of several roblox items, batching the uncached ones into as few requests as possible.
+
+    Args:
+        ids (list[int]): The item IDs.
+
+    Returns:
+        dict: The image URL of each item keyed by item ID, None when it could not be rendered.
+    """
+    images = {}
+    missing = []
+
+    for id in ids:
+        cached = thumbnail_cache.peek(id)
+
+        if cached:
+            images[id] = cached["data"][0]["imageUrl"]
+        else:
+            missing.append(id)
+
+    for start in range(0, len(missing), ROBLOX_THUMBNAIL_BATCH_SIZE):
+        batch = missing[start : start + ROBLOX_THUMBNAIL_BATCH_SIZE]
+        asset_ids = ",".join(str(id) for id in batch)
+        response = await get_json(
+            f"https://thumbnails.roblox.com/v1/assets?assetIds={asset_ids}&size=150x150&format=Png&isCircular=false"
+        )
+
+        for thumbnail in response.get("data", []):
+            single_response = {"data": [thumbnail]}
+
+            if is_completed_thumbnail(single_response):
+                thumbnail_cache.put(thumbnail["targetId"], single_response)
+            images[thumbnail["targetId"]] = thumbnail.get("imageUrl")
+
+    return {id: images.get(id) for id in ids}
+
+
+def get_thumbnail_url(response: dict) -> Optional[str]:
+    """
+    Gets the image URL of a single asset thumbnails response.
+
+    Args:
+        response (dict): The thumbnails response.
+
+    Returns:
+        Optional[str]: The image URL, None when Roblox returned an error or no image.
+    """
+    data = response.get("data")
+    return data[0].get("imageUrl") if data else None
+
+
+def is_completed_thumbnail(response: dict) -> bool:
+    """
+    Checks whether a thumbnails response holds a rendered image worth caching.
+
+    Args:
+        response (dict): The thumbnails response.
+    """
+    data = response.get("data")
+    return bool(data) and data[0].get("state") == "Completed"
+
+
+def get_route_cache_stats() -> dict:
+    """
+    Gets the statistics of the Roblox response caches.
+
+    Returns:
+        dict: The statistics of each cache.
+    """
+    return {
+        "details": details_cache.stats(),
+        "thumbnails": thumbnail_cache.stats(),
+    }
@@ -0,0 +1,255 @@
+"""
+This module contains the Monte Carlo simulator that measures the return to player of the casino games.
+
+Run it from the command line with: python -m core.simulator slots --spins 100000000
+"""
+import argparse
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+from typing import NamedTuple, Optional
+from config import (
+    SIMULATION_CHUNK_SIZE,
+    SIMULATION_RUIN_SESSIONS,
+    SIMULATION_RUIN_SESSION_SPINS,
+)
+from core.cogs.economy.games import GAMES
+
+__all__ = ("SIMULATED_GAMES", "SimulationReport", "simulate", "format_report")
+
+SIMULATED_GAMES = tuple(GAMES)
+RUIN_BANKROLLS = (10, 100, 1000)  # The starting balances of the ruin curves (in bets)
+RUIN_CHECKPOINTS = (10, 100, 1000)  # The session lengths the ruin probability is reported at (in spins)
+
+
+class SimulationReport(NamedTuple):
+    """
+    The outcome of a simulation, the amounts are per spin and in units of the bet.
+    """
+
+    game: str
+    choice: Optional[str]
+    spins: int
+    rtp: float  # The share of the wagered amount paid back
+    mean: float  # The average balance change
+    variance: float  # The variance of the balance change
+    hit_frequency: float  # The share of spins that paid anything back
+    max_win: float  # The largest balance change of a single spin
+    ruin: dict[int, dict[int, float]]  # The chance of going broke, by bankroll then session length
+    duration: float  # How long the simulation took (in seconds)
+
+
+def draw(
+    game: str, rng: np.random.Generator, spins: int, bet: int, choice: Optional[str]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Draws spins of a game the way the bet commands settle them.
+
+    Args:
+        game (str): The name of the game.
+        rng (np.random.Generator): The random generator.
+        spins (int): The amount of spins.
+        bet (int): The bet of each spin.
+        choice (Optional[str]): What is bet on, for games with choices.
+
+    Returns:
+        tuple: The balance change and the amount paid back of each spin.
+    """
+    payouts = GAMES[game].payout_arrays[choice]
+    outcomes = rng.integers(0, len(payouts), size=spins)
+    winnings = np.floor(payouts[outcomes] * bet)
+    return winnings - bet, winnings
+
+
+def simulate_share(
+    game: str,
+    spins: int,
+    sessions: int,
+    bet: int,
+    choice: Optional[str],
+    seed: np.random.SeedSequence,
+) -> dict:
+    """
+    Simulates one worker's share of the spins and ruin sessions.
+
+    Args:
+        game (str): The name of the game.
+        spins (int): The amount of spins.
+        sessions (int): The amount of ruin sessions.
+        bet (int): The bet of each spin.
+        choice (Optional[str]): What is bet on, for games with choices.
+        seed (np.random.SeedSequence): The seed of the worker.
+
+    Returns:
+        dict: The sums the report is computed from.
+    """
+    rng = np.random.default_rng(seed)
+    totals = {"spins": 0, "sum": 0.0, "squares": 0.0, "hits": 0, "max_win": -1.0}
+
+    for start in range(0, spins, SIMULATION_CHUNK_SIZE):
+        size = min(SIMULATION_CHUNK_SIZE, spins - start)
+        deltas, winnings = draw(game, rng, size, bet, choice)
+        deltas = deltas / bet
+
+        totals["spins"] += size
+        totals["sum"] += float(deltas.sum())
+        totals["squares"] += float(np.square(deltas).sum())
+        totals["hits"] += int(np.count_nonzero(winnings))
+        totals["max_win"] = max(totals["max_win"], float(deltas.max()))
+
+    checkpoints = [min(length, SIMULATION_RUIN_SESSION_SPINS) for length in RUIN_CHECKPOINTS]
+    ruined = np.zeros((len(RUIN_BANKROLLS), len(checkpoints)), dtype=np.int64)
+    block = max(1, SIMULATION_CHUNK_SIZE // SIMULATION_RUIN_SESSION_SPINS)
+
+    for start in range(0, sessions, block):
+        size = min(block, sessions - start)
+        deltas, _ = draw(game, rng, size * SIMULATION_RUIN_SESSION_SPINS, bet, choice)
+        balances = np.cumsum(
+            (deltas / bet).reshape(size, SIMULATION_RUIN_SESSION_SPINS), axis=1
+        )
+        lowest = np.minimum.accumulate(balances, axis=1)
+
+        # A player is broke once the balance can no longer cover the bet.
+        for row, bankroll in enumerate(RUIN_BANKROLLS):
+            for column, length in enumerate(checkpoints):
+                ruined[row, column] += np.count_nonzero(bankroll + lowest[:, length - 1] < 1)
+
+    totals["sessions"] = sessions
+    totals["ruined"] = ruined
+    return totals
+
+
+def simulate(
+    game: str,
+    spins: int,
+    bet: int = 100,
+    choice: Optional[str] = None,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> SimulationReport:
+    """
+    Simulates spins of a game, split across a process pool.
+
+    Args:
+        game (str): The name of the game.
+        spins (int): The amount of spins.
+        bet (int): The bet of each spin, payouts are rounded down like in the commands.
+        choice (Optional[str]): What is bet on. Defaults to the first choice of the game.
+        workers (Optional[int]): The amount of processes. Defaults to the amount of CPUs.
+        seed (Optional[int]): The seed, for reproducible reports.
+
+    Returns:
+        SimulationReport: The return to player, variance, hit frequency and ruin curves.
+    """
+    if game not in SIMULATED_GAMES:
+        raise ValueError(f"Game '{game}' can not be simulated.")
+
+    if choice is None and GAMES[game].choices:
+        choice = GAMES[game].choices[0]
+
+    choice = GAMES[game].parse_choice(choice)
+
+    started_at = perf_counter()
+    workers = max(1, min(workers or os.cpu_count() or 1, spins))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    spin_shares = [spins // workers + (index < spins % workers) for index in range(workers)]
+    session_shares = [
+        SIMULATION_RUIN_SESSIONS // workers + (index < SIMULATION_RUIN_SESSIONS % workers)
+        for index in range(workers)
+    ]
+
+    # Spawned rather than forked, forking a process running the event loop is unsafe.
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as executor:
+        shares = list(
+            executor.map(
+                simulate_share,
+                [game] * workers,
+                spin_shares,
+                session_shares,
+                [bet] * workers,
+                [choice] * workers,
+                seeds,
+            )
+        )
+
+    total_spins = sum(share["spins"] for share in shares)
+    mean = sum(share["sum"] for share in shares) / total_spins
+    squares = sum(share["squares"] for share in shares) / total_spins
+    ruined = sum(share["ruined"] for share in shares)
+    sessions = sum(share["sessions"] for share in shares)
+
+    return SimulationReport(
+        game=game,
+        choice=choice,
+        spins=total_spins,
+        rtp=1 + mean,
+        mean=mean,
+        variance=squares - mean**2,
+        hit_frequency=sum(share["hits"] for share in shares) / total_spins,
+        max_win=max(share["max_win"] for share in shares),
+        ruin={
+            bankroll: {
+                min(length, SIMULATION_RUIN_SESSION_SPINS): ruined[row, column] / max(sessions, 1)
+                for column, length in enumerate(RUIN_CHECKPOINTS)
+            }
+            for row, bankroll in enumerate(RUIN_BANKROLLS)
+        },
+        duration=perf_counter() - started_at,
+    )
+
+
+def format_report(report: SimulationReport) -> str:
+    """
+    Formats a simulation report as text.
+
+    Args:
+        report (SimulationReport): The report.
+
+    Returns:
+        str: The report, one figure per line.
+    """
+    lines = [
+        f"Spins: {report.spins:,} in {report.duration:.1f}s",
+        f"RTP: {report.rtp:.4%}",
+        f"Mean: {report.mean:+.4f} bets per spin",
+        f"Variance: {report.variance:.4f}",
+        f"Hit frequency: {report.hit_frequency:.2%}",
+        f"Biggest win: {report.max_win:+.2f} bets",
+        "Ruin chance (bankroll in bets: chance by spins played):",
+    ]
+    lines += [
+        f"  {bankroll}: "
+        + ", ".join(f"{chance:.2%} by {length}" for length, chance in curve.items())
+        for bankroll, curve in report.ruin.items()
+    ]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """
+    Runs a simulation from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Simulate the casino games.")
+    parser.add_argument("game", choices=SIMULATED_GAMES)
+    parser.add_argument("--spins", type=int, default=10_000_000)
+    parser.add_argument("--bet", type=int, default=100)
+    parser.add_argument("--choice", default=None, help="What is bet on, e.g. Red or Heads.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    arguments = parser.parse_args()
+
+    report = simulate(
+        arguments.game,
+        arguments.spins,
+        bet=arguments.bet,
+        choice=arguments.choice,
+        workers=arguments.workers,
+        seed=arguments.seed,
+    )
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
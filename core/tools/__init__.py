@@ -4,4 +4,7 @@ This package contains tools that are used in the core of the application.
 from .lib import *
 from .logs import *
 from .decorators import *
-from .autocompletes import *
\ No newline at end of file
+from .autocompletes import *
+from .response_cache import *
+from .rate_limits import *
+from .popups import *
\ No newline at end of file
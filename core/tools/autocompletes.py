@@ -1,5 +1,5 @@
 from discord import Interaction, app_commands
-from repositories import get_all_items_with_codes_and_quantity
+from repositories import search_catalog
 
 __all__ = ["color_autocomplete", "ugc_item_auto_complete"]
 
@@ -16,12 +16,11 @@ async def color_autocomplete(
 async def ugc_item_auto_complete(
     interaction: Interaction, current_choice: str
 ) -> list[app_commands.Choice]:
-    items = await get_all_items_with_codes_and_quantity()
+    items = await search_catalog(current_choice)
     return [
         app_commands.Choice(
-            name=f"{item["item_name"]}: {item["item_price"]} candies, 📦 stock: {len(item["codes__code"])}",
+            name=f"{item['item_name']}: {item['item_price']} candies, 📦 stock: {item['stock']}",
             value=str(item["item_id"]))
         for item in items
-        if current_choice.lower() in item["item_name"].lower()
     ]
-    
\ No newline at end of file
+    
@@ -6,7 +6,7 @@ from config import CAN_LOG, ADMIN_IDS
 from core.tools.lib import send_bot_embed, retrieve_application_emoji
 from discord.ext.commands import check
 from contextlib import suppress
-from repositories import get_user, create_user, get_guild, create_guild
+from repositories import get_user, ensure_user, get_allowed_channels
 
 __all__ = (
     "economy_handler",
@@ -29,19 +29,15 @@ def economy_handler(user_data=True, guild_data=True, booster_command=False):
     async def predicate(ctx):
 
         if guild_data:
-            guild_config = await get_guild(ctx.guild.id)
+            allowed_channels = await get_allowed_channels(ctx.guild.id)
 
-            if not guild_config:
-                guild_config = await create_guild(ctx.guild.id)
-
-            if ctx.channel.id not in guild_config.allowed_channels:
+            if ctx.channel.id not in allowed_channels:
                 return False
 
         if user_data:
-            user = await get_user(ctx.author.id)
-
-            if not user:
-                user = await create_user(ctx.author.id)
+            # Batched with the lookups of the other commands of the same tick, only a
+            # first-time user costs a query of its own.
+            user = await get_user(ctx.author.id) or await ensure_user(ctx.author.id)
 
             if booster_command:
                 if not ctx.author.premium_since:
@@ -5,6 +5,7 @@ This module contains the tools that are used in the bot.
 from discord import Embed, File, Interaction, ButtonStyle
 from discord.ext.commands import Context
 from discord.ui import Button, View
+from .popups import PopupView
 
 __all__ = (
     "send_bot_embed",
@@ -187,17 +188,18 @@ async def confirmation_popup(
         label="Confirm", style=ButtonStyle.green, custom_id="confirm"
     )
 
-    view = await view_button_builder(cancel_button, confirm_button)
-
     is_interaction = isinstance(ctx, Interaction)
+    author = (
+        ctx.user if is_interaction else ctx.author
+    )  # Interaction and Context have different names for the author.
+    view = PopupView(author.id, (cancel_button, confirm_button), timeout=60)
 
     if is_dm:
 
         if ephemeral:
             raise ValueError("Ephemeral messages are not supported in DMs.")
 
-        user = ctx.author if not is_interaction else ctx.user
-        await user.send(embed=embed, view=view)
+        await author.send(embed=embed, view=view)
 
     else:
         if is_interaction:
@@ -210,21 +212,10 @@ async def confirmation_popup(
         else:
             await ctx.send(embed=embed, view=view)
 
-    client = (
-        ctx.client if is_interaction else ctx.bot
-    )  # Interaction and Context have different names for the bot.
-    author = (
-        ctx.user if is_interaction else ctx.author
-    )  # Interaction and Context have different names for the author.
-
-    try:
-        interaction = await client.wait_for(
-            "interaction", check=lambda i: i.user.id == author.id, timeout=60
-        )
-        await interaction.response.defer()
+    popup_choice = await view.wait_for_choice()
 
-        if interaction.data["custom_id"] == "confirm":
-            return True
-        return False
-    except TimeoutError:
+    if not popup_choice:
         return False
+
+    await popup_choice.interaction.response.defer()
+    return popup_choice.choice == "confirm"
@@ -0,0 +1,209 @@
+"""
+This module contains the popup router, which hands button clicks to the command waiting for them.
+"""
+import asyncio
+import secrets
+from discord import Interaction
+from discord.ui import Button, View
+from time import monotonic
+from typing import NamedTuple, Optional
+
+__all__ = ("PopupChoice", "PopupRouter", "PopupView", "popup_router")
+
+POPUP_PRUNE_INTERVAL = 256  # How many popups are opened between sweeps of the expired ones
+
+
+class PopupChoice(NamedTuple):
+    """
+    The button a user clicked on a popup.
+    """
+
+    choice: str  # The custom ID the button was created with
+    interaction: Interaction  # The click, still to be responded to
+
+
+class PopupRouter:
+    """
+    Registry of the popups waiting for a click, keyed by a nonce unique to each popup.
+
+    A click is routed with a single dictionary lookup, however many popups are open,
+    and only ever resolves the popup it was made on.
+    """
+
+    def __init__(self) -> None:
+        self.opened = 0
+        self.resolved = 0
+        self.expired = 0
+        self._pending: dict[str, tuple[asyncio.Future, float]] = {}
+
+    def open(self, timeout: float) -> str:
+        """
+        Register a popup.
+
+        Args:
+            timeout (float): How long the popup waits for a click (in seconds).
+
+        Returns:
+            str: The nonce of the popup.
+        """
+        self.opened += 1
+
+        if self.opened % POPUP_PRUNE_INTERVAL == 0:
+            self.prune()
+
+        nonce = secrets.token_hex(8)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[nonce] = (future, monotonic() + timeout)
+        return nonce
+
+    async def wait(self, nonce: str) -> Optional[PopupChoice]:
+        """
+        Wait for the click on a popup.
+
+        Args:
+            nonce (str): The nonce of the popup.
+
+        Returns:
+            Optional[PopupChoice]: The click, or None if the popup expired.
+        """
+        entry = self._pending.get(nonce)
+
+        if not entry:
+            return None
+
+        future, expires_at = entry
+
+        try:
+            return await asyncio.wait_for(future, max(0, expires_at - monotonic()))
+        except asyncio.TimeoutError:
+            self.expired += 1
+            return None
+        finally:
+            self._pending.pop(nonce, None)
+
+    def resolve(self, nonce: str, choice: str, interaction: Interaction) -> bool:
+        """
+        Hand a click to the command waiting on its popup.
+
+        Args:
+            nonce (str): The nonce of the popup.
+            choice (str): The custom ID the button was created with.
+            interaction (Interaction): The click.
+
+        Returns:
+            bool: Whether a command was still waiting on the popup.
+        """
+        # The entry stays registered until wait() consumes it, the click may land before it awaits.
+        entry = self._pending.get(nonce)
+
+        if not entry or entry[0].done():
+            return False
+
+        entry[0].set_result(PopupChoice(choice, interaction))
+        self.resolved += 1
+        return True
+
+    def expire(self, nonce: str) -> None:
+        """
+        Stop waiting on a popup, unless it was already clicked.
+
+        Args:
+            nonce (str): The nonce of the popup.
+        """
+        entry = self._pending.get(nonce)
+
+        if entry and not entry[0].done():
+            entry[0].set_result(None)
+            self.expired += 1
+
+    def prune(self) -> None:
+        """
+        Drop the popups whose timeout passed without anyone waiting on them anymore.
+        """
+        now = monotonic()
+
+        for nonce, (_, expires_at) in list(self._pending.items()):
+            if expires_at <= now:
+                self.expire(nonce)
+                self._pending.pop(nonce, None)
+
+    def stats(self) -> dict:
+        """
+        Get the router statistics.
+
+        Returns:
+            dict: The popup counters.
+        """
+        return {
+            "pending": len(self._pending),
+            "opened": self.opened,
+            "resolved": self.resolved,
+            "expired": self.expired,
+        }
+
+
+popup_router = PopupRouter()
+
+
+class PopupButton(Button):
+    """
+    Button of a popup, routing its clicks through the popup router.
+    """
+
+    def __init__(self, nonce: str, button: Button) -> None:
+        super().__init__(
+            style=button.style,
+            label=button.label,
+            emoji=button.emoji,
+            custom_id=f"popup:{nonce}:{button.custom_id}",
+        )
+        self.choice = button.custom_id
+
+    async def callback(self, interaction: Interaction) -> None:
+        await self.view.choose(interaction, self.choice)
+
+
+class PopupView(View):
+    """
+    View whose buttons resolve the popup they belong to, and only for the user it was sent to.
+    """
+
+    def __init__(self, user_id: int, buttons: tuple[Button, ...], timeout: float = 60) -> None:
+        super().__init__(timeout=timeout)
+        self.user_id = user_id
+        self.nonce = popup_router.open(timeout)
+
+        for button in buttons:
+            self.add_item(PopupButton(self.nonce, button))
+
+    async def choose(self, interaction: Interaction, choice: str) -> None:
+        """
+        Resolve the popup with the clicked button.
+
+        Args:
+            interaction (Interaction): The click.
+            choice (str): The custom ID the button was created with.
+        """
+        if interaction.user.id != self.user_id:
+            return await interaction.response.send_message(
+                "This popup is not for you.", ephemeral=True
+            )
+
+        if not popup_router.resolve(self.nonce, choice, interaction):
+            await interaction.response.send_message(
+                "This popup has expired.", ephemeral=True
+            )
+
+        self.stop()
+
+    async def wait_for_choice(self) -> Optional[PopupChoice]:
+        """
+        Wait for the user to click a button.
+
+        Returns:
+            Optional[PopupChoice]: The click, or None if the popup expired.
+        """
+        return await popup_router.wait(self.nonce)
+
+    async def on_timeout(self) -> None:
+        popup_router.expire(self.nonce)
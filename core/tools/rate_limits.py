@@ -0,0 +1,120 @@
+"""
+This module contains the rate limiting primitives used to call external APIs politely.
+"""
+import asyncio
+from time import monotonic
+
+__all__ = ("TokenBucket", "CircuitBreaker", "CircuitOpenError")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a request is refused because the upstream is considered unhealthy.
+    """
+
+
+class TokenBucket:
+    """
+    Token bucket pacing requests to a steady rate while allowing short bursts.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.waits = 0
+        self._updated_at = monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Wait until a token is available and consume it.
+        """
+        async with self._lock:
+            while True:
+                now = monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                self.waits += 1
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker that fails fast after consecutive failures until a cooldown passes.
+
+    Once the cooldown is over a single probe request is let through; its outcome
+    either closes the circuit again or restarts the cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """
+        Get the state of the circuit.
+
+        Returns:
+            str: closed, open or half-open.
+        """
+        if self.opened_at is None:
+            return "closed"
+        if monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def before_request(self) -> None:
+        """
+        Check whether a request may go through.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or a probe is already in flight.
+        """
+        state = self.state
+
+        if state == "closed":
+            return
+
+        if state == "open" or self.probing:
+            raise CircuitOpenError("The upstream is unhealthy, try again later.")
+
+        self.probing = True
+
+    def record_success(self) -> None:
+        """
+        Record a successful request, closing the circuit.
+        """
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def release_probe(self) -> None:
+        """
+        Give up a probe whose outcome is unknown, e.g. cancelled, so the next request probes again.
+        """
+        self.probing = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed request, opening the circuit once the threshold is reached.
+        """
+        self.failures += 1
+
+        if self.probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.probing:
+                self.times_opened += 1
+            self.opened_at = monotonic()
+            self.probing = False
@@ -0,0 +1,166 @@
+"""
+This module contains the response cache used to avoid repeating external API calls.
+"""
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Hashable
+from core.tools.logs import log_error
+
+__all__ = ("ResponseCache",)
+
+
+class ResponseCache:
+    """
+    LRU cache with a time to live, serving stale values while they are refreshed.
+
+    Fresh values are returned as is. Values past their time to live but within the
+    stale window are returned at once while a background refresh runs, and
+    concurrent misses for the same key share a single fetch.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float, max_size: int) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refresh_failures = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        is_cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        Get a value from the cache, fetching it when missing or expired.
+
+        Args:
+            key (Hashable): The cache key.
+            fetch (Callable): The coroutine function that fetches the value.
+            is_cacheable (Callable): Whether a fetched value may be stored, e.g. not an error response.
+
+        Returns:
+            Any: The value.
+        """
+        entry = self._entries.get(key)
+
+        if entry:
+            value, fetched_at = entry
+            age = monotonic() - fetched_at
+
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+
+                if key not in self._inflight:
+                    self._start_fetch(key, fetch, is_cacheable, background=True, stale=value)
+                return value
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            self._start_fetch(key, fetch, is_cacheable, background=False)
+
+        # Shielded so a cancelled caller does not cancel the fetch other callers are waiting on.
+        return await asyncio.shield(self._inflight[key])
+
+    def peek(self, key: Hashable) -> Any:
+        """
+        Get a fresh value from the cache without fetching it.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Any: The value, or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+
+        if entry and monotonic() - entry[1] < self.ttl:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+        return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value fetched elsewhere, e.g. as part of a batched request.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value.
+        """
+        self._store(key, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop a value from the cache.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """
+        Get the cache statistics.
+
+        Returns:
+            dict: The size and hit/miss counters of the cache.
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refresh_failures": self.refresh_failures,
+        }
+
+    def _start_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        is_cacheable: Callable[[Any], bool],
+        background: bool,
+        stale: Any = None,
+    ) -> None:
+        async def run() -> Any:
+            try:
+                value = await fetch()
+            except Exception as e:
+                if not background:
+                    raise
+                self.refresh_failures += 1
+                log_error(f"Failed to refresh {self.name} cache entry {key}", e)
+                # Callers that joined the refresh after the entry expired or was dropped get the stale value.
+                return stale
+            finally:
+                self._inflight.pop(key, None)
+
+            if is_cacheable(value):
+                self._store(key, value)
+            return value
+
+        self._inflight[key] = asyncio.create_task(run())
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, monotonic())
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -2,4 +2,5 @@
 This module initializes the views for the core app.
 """
 from .add_code_modal import AddCodes
-from .change_price_modal import ChangePrice
\ No newline at end of file
+from .change_price_modal import ChangePrice
+from .item_admin import ItemAdminButton, ITEM_ADMIN_ACTIONS
\ No newline at end of file
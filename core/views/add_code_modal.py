@@ -21,12 +21,16 @@ class AddCodes(Modal, title="Add Codes"):
     async def on_submit(self, interaction: Interaction) -> None:
         try:
             codes = self.codes.value.split()
-            await add_item_code(self.item_id, codes)
-            await send_bot_embed(
-                interaction,
-                description="✅ The codes have been added successfully.",
-                ephemeral=True,
-            )
+            added = await add_item_code(self.item_id, codes)
+
+            if added is None:
+                description = "❌ This item no longer exists."
+            elif added < len(codes):
+                description = f"✅ {added} codes have been added, {len(codes) - added} were already in stock."
+            else:
+                description = "✅ The codes have been added successfully."
+
+            await send_bot_embed(interaction, description=description, ephemeral=True)
         except Exception as e:
             print(e)
             await send_bot_embed(
@@ -0,0 +1,100 @@
+from discord.ui import Button, DynamicItem
+from discord import ButtonStyle, Interaction
+from core.tools import send_bot_embed, embed_builder, confirmation_popup
+from repositories import delete_item, get_item_by_roblox_id
+from config import ADMIN_IDS
+from re import Match
+from .add_code_modal import AddCodes
+from .change_price_modal import ChangePrice
+
+ITEM_ADMIN_ACTIONS = {
+    "add_code": (ButtonStyle.green, "Add code", "➕"),
+    "change_price": (ButtonStyle.blurple, "Change price", "💰"),
+    "delete_item": (ButtonStyle.red, "Delete item", "🗑️"),
+}  # The style, label and emoji of each item admin button
+
+
+class ItemAdminButton(
+    DynamicItem[Button],
+    template=r"item_admin:(?P<action>add_code|change_price|delete_item):(?P<item_id>[0-9]+)",
+):
+    """
+    Item admin button that keeps working across restarts, the item ID lives in its custom ID.
+    """
+
+    def __init__(self, action: str, item_id: int) -> None:
+        style, label, emoji = ITEM_ADMIN_ACTIONS[action]
+        super().__init__(
+            Button(
+                style=style,
+                label=label,
+                emoji=emoji,
+                custom_id=f"item_admin:{action}:{item_id}",
+            )
+        )
+        self.action = action
+        self.item_id = item_id
+
+    @classmethod
+    async def from_custom_id(
+        cls, interaction: Interaction, item: Button, match: Match[str]
+    ) -> "ItemAdminButton":
+        return cls(match["action"], int(match["item_id"]))
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        if interaction.user.id in ADMIN_IDS:
+            return True
+
+        await send_bot_embed(
+            interaction,
+            description=":no_entry_sign: Only administrators can update items.",
+            ephemeral=True,
+        )
+        return False
+
+    async def callback(self, interaction: Interaction) -> None:
+        # The button outlives the item, which another admin may have deleted since.
+        if not await get_item_by_roblox_id(self.item_id):
+            return await send_bot_embed(
+                interaction,
+                description="❌ This item no longer exists.",
+                ephemeral=True,
+            )
+
+        if self.action == "add_code":
+            return await interaction.response.send_modal(AddCodes(self.item_id))
+        elif self.action == "change_price":
+            return await interaction.response.send_modal(ChangePrice(self.item_id))
+        elif self.action == "delete_item":
+            return await self.delete_item(interaction)
+
+    async def delete_item(self, interaction: Interaction) -> None:
+        """
+        Deletes the item after the admin confirms it.
+
+        Args:
+            interaction (Interaction): The click on the delete button.
+
+        Returns:
+            None
+        """
+        embed = await embed_builder(
+            embed_color="FFC5D3",
+            description="Are you sure you want to delete this item?",
+            title="💻 Delete Item",
+        )
+        confirmation = await confirmation_popup(
+            interaction, embed=embed, ephemeral=True
+        )
+
+        if not confirmation:
+            return await interaction.followup.send(
+                "❌ The deletion process has been cancelled.", ephemeral=True
+            )
+
+        await delete_item(self.item_id)
+        await send_bot_embed(
+            interaction,
+            description="✅ The item has been successfully deleted.",
+            ephemeral=True,
+        )
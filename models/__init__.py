@@ -5,4 +5,7 @@ from .user import *
 from .codes import *
 from .guild import *
 from .item import *
-from .commands_timestamp import *
\ No newline at end of file
+from .commands_timestamp import *
+from .ledger_checkpoint import *
+from .transaction import *
+from .purchase_outbox import *
\ No newline at end of file
@@ -10,3 +10,4 @@ class Item(Model):
     item_description = fields.TextField()
     item_price = fields.IntField()
     item_category = fields.CharField(max_length=255)
+    stock = fields.IntField(default=0)  # Kept in sync with the item's codes, see verify_item_stock
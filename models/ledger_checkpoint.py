@@ -0,0 +1,12 @@
+from tortoise.models import Model
+from tortoise import fields
+
+__all__ = ["LedgerCheckpoint"]
+
+
+class LedgerCheckpoint(Model):
+    id = fields.IntField(primary_key=True)
+    last_sequence = fields.BigIntField(default=0)  # The last journal entry applied to the balances
+
+    def __str__(self):
+        return f"ledger_checkpoint: {self.last_sequence}"
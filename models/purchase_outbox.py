@@ -0,0 +1,26 @@
+from tortoise.models import Model
+from tortoise import fields
+
+__all__ = ["PurchaseOutbox"]
+
+
+class PurchaseOutbox(Model):
+    id = fields.BigIntField(primary_key=True)
+    user_id = fields.BigIntField()
+    amount = fields.IntField()  # The amount refunded if the codes can never be delivered
+    codes = fields.JSONField()  # The claimed codes, keyed by item ID
+    title = fields.CharField(max_length=255)
+    description = fields.TextField()
+    footer_text = fields.TextField(default="")
+    status = fields.CharField(max_length=16, default="pending")  # pending, refunded, held (refunded, codes possibly delivered) or failed
+    attempts = fields.IntField(default=0)
+    next_attempt_at = fields.DatetimeField()
+    last_error = fields.TextField(null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "purchase_outbox"
+        indexes = (("status", "next_attempt_at"),)
+
+    def __str__(self):
+        return f"purchase of {self.user_id}: {self.status} after {self.attempts} attempts"
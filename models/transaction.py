@@ -0,0 +1,19 @@
+from tortoise.models import Model
+from tortoise import fields
+
+__all__ = ["Transaction"]
+
+
+class Transaction(Model):
+    id = fields.BigIntField(primary_key=True)
+    user_id = fields.BigIntField(db_index=True)  # Not a foreign key so batched inserts skip the lookups
+    delta = fields.IntField()
+    reason = fields.CharField(max_length=32)
+    created_at = fields.DatetimeField(db_index=True)
+
+    class Meta:
+        table = "transactions"
+        indexes = (("user_id", "created_at"),)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.delta} ({self.reason}) at {self.created_at}"
@@ -1,6 +1,14 @@
 """
 Package containing all the controllers for the application.
 """
+from .commit_hooks import *
 from .user_repository import *
 from .guild_repository import *
-from .item_repository import *
\ No newline at end of file
+from .item_repository import *
+from .catalog_index import *
+from .cooldown_repository import *
+from .purchase_outbox import *
+from .balance_ledger import *
+from .transaction_log import *
+from .loaders import *
+from .warmup import *
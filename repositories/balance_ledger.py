@@ -0,0 +1,392 @@
+"""
+This module contains the write-behind ledger that takes balance writes of game outcomes off the response path.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from pathlib import Path
+from time import monotonic
+from typing import AsyncIterator, Iterator, Optional
+from models import User, LedgerCheckpoint
+from repositories.commit_hooks import on_finish
+from tortoise import connections
+from tortoise.transactions import in_transaction
+from core.tools.logs import log_info, log_error
+
+__all__ = ("BalanceLedger", "balance_ledger")
+
+CHECKPOINT_ID = 1  # The ID of the single ledger checkpoint row
+OWNER_LOCK_KEY = 7_261_023  # The advisory lock held by the one process running the ledger
+
+
+class BalanceLedger:
+    """
+    Write-behind ledger for balance deltas.
+
+    Deltas are applied to an in-process balance table, serialized per user, appended
+    to a local journal and queued. A background task flushes the queue to the
+    database in batched transactions, recording the last flushed journal entry so
+    entries left unflushed by a crash are replayed exactly once on the next start.
+
+    The journal sequence lives in the process, so a single process may run the ledger,
+    which is enforced with an advisory lock held from start to stop.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.applied = 0
+        self.flushes = 0
+        self.flushed_entries = 0
+        self.flush_failures = 0
+        self.replayed = 0
+        self._sequence = 0
+        self._pending: dict[int, int] = defaultdict(int)
+        self._bases: dict[int, int] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._lock_holders: dict[int, int] = defaultdict(int)
+        self._writers: dict[int, int] = defaultdict(int)
+        self._writes_done: dict[int, asyncio.Event] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._unflushed: list[tuple[int, int, int]] = []
+        self._flushing = 0
+        self._generation = 0
+        self._journal = None
+        self._task: Optional[asyncio.Task] = None
+        self._owner: Optional[AsyncExitStack] = None
+
+    async def start(
+        self, journal_path: str, flush_interval: float, flush_max_entries: int
+    ) -> None:
+        """
+        Replay the entries a previous run left unflushed and start the flush task.
+
+        Args:
+            journal_path (str): The path of the local journal.
+            flush_interval (float): The maximum time an entry waits before being flushed (in seconds).
+            flush_max_entries (int): The amount of entries that triggers a flush right away.
+
+        Raises:
+            RuntimeError: If another process is running the ledger.
+        """
+        self.flush_interval = flush_interval
+        self.flush_max_entries = flush_max_entries
+        await self._acquire_ownership()
+
+        journal_path = Path(journal_path)
+        journal_path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint, _ = await LedgerCheckpoint.get_or_create(id=CHECKPOINT_ID)
+        self._sequence = checkpoint.last_sequence
+        entries = []
+
+        if journal_path.exists():
+            with journal_path.open() as journal:
+                for line in journal:
+                    fields = line.split()
+
+                    # A torn last line means the entry was never acknowledged.
+                    if len(fields) != 3:
+                        continue
+
+                    sequence, user_id, delta = map(int, fields)
+                    self._sequence = max(self._sequence, sequence)
+
+                    if sequence > checkpoint.last_sequence:
+                        entries.append((sequence, user_id, delta))
+
+        if entries:
+            for _, user_id, delta in entries:
+                self._pending[user_id] += delta
+            await self._flush(entries)
+            self.replayed += len(entries)
+            log_info(f"Replayed {len(entries)} unflushed balance ledger entries")
+
+        self._journal = journal_path.open("w")
+        self._task = asyncio.create_task(self._run())
+        self.enabled = True
+
+    async def stop(self) -> None:
+        """
+        Stop accepting deltas and flush everything still queued.
+        """
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        # Asked to finish rather than cancelled, wait_for swallows a cancellation that lands
+        # together with an entry.
+        self._queue.put_nowait(None)
+        await self._task
+
+        while not self._queue.empty():
+            self._unflushed.append(self._queue.get_nowait())
+
+        try:
+            if self._unflushed:
+                await self._flush(self._unflushed)
+                self._unflushed = []
+        finally:
+            self._journal.close()
+            await self._owner.aclose()
+            self._owner = None
+
+    async def apply(self, user_id: int, delta: int, min_balance: int = 0) -> Optional[int]:
+        """
+        Apply a delta to the in-process balance of a user and queue it for flushing.
+
+        Args:
+            user_id (int): The user ID.
+            delta (int): The amount to add to the balance, negative to debit.
+            min_balance (int): The lowest balance the delta may leave the user with.
+
+        Returns:
+            int: The new balance, or None if the user does not exist or has insufficient funds.
+        """
+        async with self._lock(user_id):
+            while True:
+                # Writes made outside the ledger are waited for, the balance they leave is only
+                # known once their transaction ended.
+                while user_id in self._writes_done:
+                    await self._writes_done[user_id].wait()
+
+                base = await self._load_base(user_id)
+
+                if base is None:
+                    return None
+
+                if user_id not in self._writes_done:
+                    break
+
+            balance = base + self._pending[user_id] + delta
+
+            if balance < min_balance:
+                return None
+
+            self._sequence += 1
+            self._journal.write(f"{self._sequence} {user_id} {delta}\n")
+            self._journal.flush()
+            self._pending[user_id] += delta
+            self._queue.put_nowait((self._sequence, user_id, delta))
+            self.applied += 1
+            return balance
+
+    def pending_delta(self, user_id: int) -> int:
+        """
+        Get the sum of a user's deltas that are not in the database yet.
+
+        Args:
+            user_id (int): The user ID.
+
+        Returns:
+            int: The unflushed delta.
+        """
+        return self._pending.get(user_id, 0)
+
+    @contextmanager
+    def external_write(self, user_id: int) -> Iterator[int]:
+        """
+        Hold back the deltas of a user while their balance is written outside the ledger.
+
+        The write counts as finished once the surrounding transaction ended, committed or not,
+        so a delta is never checked against a balance read before the write committed.
+
+        Args:
+            user_id (int): The user ID.
+
+        Yields:
+            int: The unflushed delta of the user, to count towards the written balance.
+        """
+        self._writers[user_id] += 1
+        self._writes_done.setdefault(user_id, asyncio.Event())
+
+        try:
+            yield self.pending_delta(user_id)
+        finally:
+            on_finish(lambda: self._end_external_write(user_id))
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Forget the database balance of a user after it was written outside the ledger.
+
+        Args:
+            user_id (int): The user ID.
+        """
+        self._bases.pop(user_id, None)
+        # A balance read concurrently may predate the write, it is read again.
+        self._generation += 1
+
+    def stats(self) -> dict:
+        """
+        Get the ledger statistics.
+
+        Returns:
+            dict: The ledger counters.
+        """
+        return {
+            "enabled": self.enabled,
+            "applied": self.applied,
+            "queued": self._queue.qsize() + len(self._unflushed),
+            "flushes": self.flushes,
+            "flushed_entries": self.flushed_entries,
+            "flush_failures": self.flush_failures,
+            "replayed": self.replayed,
+        }
+
+    @asynccontextmanager
+    async def _lock(self, user_id: int) -> AsyncIterator[None]:
+        # The lock of a user is only kept while someone holds or waits for it.
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        self._lock_holders[user_id] += 1
+
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_holders[user_id] -= 1
+
+            if not self._lock_holders[user_id]:
+                del self._lock_holders[user_id]
+                del self._locks[user_id]
+
+    def _end_external_write(self, user_id: int) -> None:
+        self._writers[user_id] -= 1
+        self.invalidate(user_id)
+
+        if not self._writers[user_id]:
+            del self._writers[user_id]
+            self._writes_done.pop(user_id).set()
+
+    async def _acquire_ownership(self) -> None:
+        # Held on a dedicated connection, Postgres releases it if the process dies.
+        owner = AsyncExitStack()
+        connection = await owner.enter_async_context(
+            connections.get("default").acquire_connection()
+        )
+
+        if not await connection.fetchval("SELECT pg_try_advisory_lock($1)", OWNER_LOCK_KEY):
+            await owner.aclose()
+            raise RuntimeError("The balance ledger is already running in another process")
+
+        owner.push_async_callback(
+            connection.execute, "SELECT pg_advisory_unlock($1)", OWNER_LOCK_KEY
+        )
+        self._owner = owner
+
+    async def _load_base(self, user_id: int) -> Optional[int]:
+        while user_id not in self._bases:
+            generation = self._generation
+            balance = await User.filter(id=user_id).values_list("balance", flat=True)
+
+            if not balance:
+                return None
+
+            # A flush committing while the balance was read may already be counted in it.
+            if generation == self._generation and not self._flushing:
+                self._bases[user_id] = balance[0]
+
+        return self._bases[user_id]
+
+    async def _run(self) -> None:
+        # Runs until stop queues None, the entries still unflushed are left to stop.
+        stopping = False
+
+        while not stopping:
+            if not self._unflushed:
+                entry = await self._queue.get()
+
+                if entry is None:
+                    return
+
+                self._unflushed.append(entry)
+
+            deadline = monotonic() + self.flush_interval
+
+            while len(self._unflushed) < self.flush_max_entries:
+                timeout = deadline - monotonic()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+                if entry is None:
+                    stopping = True
+                    break
+
+                self._unflushed.append(entry)
+
+            try:
+                await self._flush(self._unflushed)
+                self._unflushed = []
+            except Exception as e:
+                # The entries stay queued and are retried with the next batch.
+                self.flush_failures += 1
+                log_error("Failed to flush the balance ledger", e)
+                await asyncio.sleep(self.flush_interval)
+
+    async def _flush(self, entries: list[tuple[int, int, int]]) -> None:
+        # Bounds what a power loss can take to the entries written since the last flush.
+        if self._journal and not self._journal.closed:
+            os.fsync(self._journal.fileno())
+
+        checkpoint_table = LedgerCheckpoint._meta.db_table
+        applied: dict[int, int] = defaultdict(int)
+        skipped: set[int] = set()
+        self._flushing += 1
+
+        try:
+            async with in_transaction() as connection:
+                # Locking the checkpoint serializes flushes and skips entries a flush
+                # whose outcome was unknown, e.g. cancelled mid-commit, already applied.
+                _, rows = await connection.execute_query(
+                    f'SELECT last_sequence FROM "{checkpoint_table}" WHERE id = $1 FOR UPDATE',
+                    [CHECKPOINT_ID],
+                )
+                last_sequence = rows[0]["last_sequence"]
+
+                for sequence, user_id, delta in entries:
+                    if sequence > last_sequence:
+                        applied[user_id] += delta
+                    else:
+                        skipped.add(user_id)
+
+                await connection.execute_query(
+                    f'UPDATE "{User._meta.db_table}" AS u SET balance = u.balance + d.delta '
+                    "FROM unnest($1::bigint[], $2::bigint[]) AS d(id, delta) WHERE u.id = d.id",
+                    [list(applied), list(applied.values())],
+                )
+                await connection.execute_query(
+                    f'UPDATE "{checkpoint_table}" SET last_sequence = $1 WHERE id = $2',
+                    [max(last_sequence, *(sequence for sequence, _, _ in entries)), CHECKPOINT_ID],
+                )
+        finally:
+            self._generation += 1
+            self._flushing -= 1
+
+        for _, user_id, delta in entries:
+            self._pending[user_id] -= delta
+
+            if not self._pending[user_id]:
+                del self._pending[user_id]
+
+        for user_id, delta in applied.items():
+            if user_id in self._bases:
+                self._bases[user_id] += delta
+
+        # It is unknown whether a stored balance already counted the skipped entries.
+        for user_id in skipped:
+            self.invalidate(user_id)
+
+        self.flushes += 1
+        self.flushed_entries += len(entries)
+
+        # Once everything is in the database the journal can start over.
+        if self._journal and not self._journal.closed and self._queue.empty():
+            self._journal.seek(0)
+            self._journal.truncate()
+
+
+balance_ledger = BalanceLedger()
@@ -0,0 +1,244 @@
+"""
+This module contains the in-memory catalog index used to search the shop items.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Optional
+
+__all__ = ("CatalogIndex", "catalog_index")
+
+MAX_CATALOG_RESULTS = 25  # Discord only accepts up to 25 autocomplete choices
+MIN_TRIGRAM_SIMILARITY = 0.3  # The fraction of query trigrams an item name must share
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split a text into lowercase search tokens.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list[str]: The tokens.
+    """
+    return "".join(char if char.isalnum() else " " for char in text.lower()).split()
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Build the set of trigrams of a text, padding every token with spaces.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        set[str]: The trigrams.
+    """
+    grams = set()
+
+    for token in tokenize(text):
+        padded = f"  {token} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+
+    return grams
+
+
+class CatalogIndex:
+    """
+    Index holding one entry per item with its name, price, category and live stock.
+
+    Entries are looked up by token prefix and by trigram similarity, so searching
+    costs the same no matter how many codes are stocked.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.mutations = 0
+        self._items: dict[int, dict] = {}
+        self._postings: dict[str, set[int]] = defaultdict(set)
+        self._trigrams: dict[str, set[int]] = defaultdict(set)
+        self._sorted_tokens: list[str] = []
+
+    def load(self, items: list[dict]) -> None:
+        """
+        Replace the indexed catalog.
+
+        Args:
+            items (list[dict]): The items, each with an item_id, item_name, item_price, item_category and stock.
+        """
+        self._items.clear()
+        self._postings.clear()
+        self._trigrams.clear()
+        self._sorted_tokens.clear()
+
+        for item in items:
+            self._add(dict(item))
+
+        self.loaded = True
+
+    def upsert(self, item: dict) -> None:
+        """
+        Add an item to the index or replace the indexed one.
+
+        Args:
+            item (dict): The item.
+        """
+        self.mutations += 1
+
+        if not self.loaded:
+            return
+
+        self._remove(item["item_id"])
+        self._add(dict(item))
+
+    def remove(self, item_id: int) -> None:
+        """
+        Remove an item from the index.
+
+        Args:
+            item_id (int): The ID of the item.
+        """
+        self.mutations += 1
+
+        if self.loaded:
+            self._remove(item_id)
+
+    def update(self, item_id: int, **fields) -> None:
+        """
+        Update the fields of an indexed item that do not affect its name.
+
+        Args:
+            item_id (int): The ID of the item.
+            **fields: The fields to update.
+        """
+        self.mutations += 1
+        item = self._items.get(item_id)
+
+        if item:
+            item.update(fields)
+
+    def adjust_stock(self, item_id: int, delta: int) -> None:
+        """
+        Add a delta to the stock of an indexed item.
+
+        Args:
+            item_id (int): The ID of the item.
+            delta (int): The amount of codes added, negative when codes were claimed.
+        """
+        self.mutations += 1
+        item = self._items.get(item_id)
+
+        if item:
+            item["stock"] = max(item["stock"] + delta, 0)
+
+    def get(self, item_id: int) -> Optional[dict]:
+        """
+        Get an indexed item.
+
+        Args:
+            item_id (int): The ID of the item.
+
+        Returns:
+            dict: The item, or None if it is not indexed.
+        """
+        return self._items.get(item_id)
+
+    def search(self, query: str, limit: int = MAX_CATALOG_RESULTS) -> list[dict]:
+        """
+        Search the in-stock items, ranking exact and prefix matches above fuzzy ones.
+
+        Args:
+            query (str): The text typed by the user.
+            limit (int): The maximum amount of results.
+
+        Returns:
+            list[dict]: The matching items, best match first.
+        """
+        limit = min(limit, MAX_CATALOG_RESULTS)
+        query = query.strip().lower()
+
+        if not query:
+            in_stock = [item for item in self._items.values() if item["stock"] > 0]
+            in_stock.sort(key=lambda item: item["item_name"].lower())
+            return in_stock[:limit]
+
+        scores: dict[int, float] = defaultdict(float)
+
+        for item_id in self._prefix_matches(tokenize(query)):
+            name = self._items[item_id]["item_name"].lower()
+            scores[item_id] += 3 if name == query else 2 if name.startswith(query) else 1
+
+        query_trigrams = trigrams(query)
+        shared: dict[int, int] = defaultdict(int)
+
+        for gram in query_trigrams:
+            for item_id in self._trigrams.get(gram, ()):
+                shared[item_id] += 1
+
+        for item_id, count in shared.items():
+            similarity = count / len(query_trigrams)
+
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scores[item_id] += similarity
+
+        ranked = sorted(
+            (self._items[item_id] for item_id in scores),
+            key=lambda item: (-scores[item["item_id"]], -item["stock"], item["item_name"]),
+        )
+        return [item for item in ranked if item["stock"] > 0][:limit]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _prefix_matches(self, tokens: list[str]) -> set[int]:
+        matches = None
+
+        for token in tokens:
+            token_matches = set()
+            position = bisect_left(self._sorted_tokens, token)
+
+            while position < len(self._sorted_tokens) and self._sorted_tokens[
+                position
+            ].startswith(token):
+                token_matches |= self._postings[self._sorted_tokens[position]]
+                position += 1
+
+            matches = token_matches if matches is None else matches & token_matches
+
+        return matches or set()
+
+    def _add(self, item: dict) -> None:
+        item_id = item["item_id"]
+        self._items[item_id] = item
+
+        for token in tokenize(item["item_name"]):
+            if not self._postings[token]:
+                insort(self._sorted_tokens, token)
+            self._postings[token].add(item_id)
+
+        for gram in trigrams(item["item_name"]):
+            self._trigrams[gram].add(item_id)
+
+    def _remove(self, item_id: int) -> None:
+        item = self._items.pop(item_id, None)
+
+        if not item:
+            return
+
+        for token in tokenize(item["item_name"]):
+            postings = self._postings.get(token)
+
+            if postings is None:
+                continue
+
+            postings.discard(item_id)
+
+            if not postings:
+                del self._postings[token]
+                self._sorted_tokens.pop(bisect_left(self._sorted_tokens, token))
+
+        for gram in trigrams(item["item_name"]):
+            self._trigrams[gram].discard(item_id)
+
+
+catalog_index = CatalogIndex()
@@ -0,0 +1,76 @@
+"""
+This module contains the commit hooks, holding back in-memory side effects of database writes
+until the transaction they belong to has committed.
+"""
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Optional
+
+__all__ = ("after_commit", "on_commit", "on_finish")
+
+pending_effects: ContextVar[Optional[list[Callable[[], None]]]] = ContextVar(
+    "pending_effects", default=None
+)
+pending_finalizers: ContextVar[Optional[list[Callable[[], None]]]] = ContextVar(
+    "pending_finalizers", default=None
+)
+
+
+def on_commit(effect: Callable[[], None]) -> None:
+    """
+    Run a side effect once the surrounding transaction commits, or right away outside of one.
+
+    Args:
+        effect (Callable): The side effect, e.g. updating a cache.
+    """
+    effects = pending_effects.get()
+
+    if effects is None:
+        effect()
+    else:
+        effects.append(effect)
+
+
+def on_finish(finalizer: Callable[[], None]) -> None:
+    """
+    Run a callback once the surrounding transaction ended, committed or rolled back, or right away outside of one.
+
+    Args:
+        finalizer (Callable): The callback, e.g. releasing something held for the transaction.
+    """
+    finalizers = pending_finalizers.get()
+
+    if finalizers is None:
+        finalizer()
+    else:
+        finalizers.append(finalizer)
+
+
+@asynccontextmanager
+async def after_commit() -> AsyncIterator[None]:
+    """
+    Hold back the side effects of the block until it exits without an error.
+
+    Meant to wrap a database transaction, so a rolled back write never reaches memory:
+    async with after_commit(), in_transaction(). Nested blocks run their effects with the outermost one.
+    """
+    if pending_effects.get() is not None:
+        yield
+        return
+
+    effects = []
+    finalizers = []
+    token = pending_effects.set(effects)
+    finalizers_token = pending_finalizers.set(finalizers)
+
+    try:
+        yield
+    finally:
+        pending_effects.reset(token)
+        pending_finalizers.reset(finalizers_token)
+
+        for finalizer in finalizers:
+            finalizer()
+
+    for effect in effects:
+        effect()
@@ -0,0 +1,250 @@
+from models import User, CommandsTimestamp
+from repositories.balance_ledger import balance_ledger
+from repositories.transaction_log import transaction_log
+from tortoise import connections
+from asyncio import Lock
+from datetime import datetime, timedelta, timezone
+from time import time
+from typing import NamedTuple, Optional
+
+__all__ = (
+    "REWARD_COMMANDS",
+    "ClaimResult",
+    "CooldownIndex",
+    "cooldown_index",
+    "claim_reward",
+    "claim_rewards",
+    "load_active_cooldowns",
+)
+
+REWARD_COMMANDS = frozenset({"booster", "candydrop", "candy", "candyhunt"})
+COOLDOWN_INDEX_PRUNE_SIZE = 100_000  # The amount of entries after which expired ones are dropped
+
+warmup_lock = Lock()
+
+
+class ClaimResult(NamedTuple):
+    """
+    The outcome of a reward claim.
+    """
+
+    claimed: bool
+    remaining: float  # Seconds left on the cooldown when the claim was rejected, 0 if the user does not exist
+    balance: Optional[int]  # The new balance when the claim went through
+
+
+class CooldownIndex:
+    """
+    In-memory index of when each user's reward commands come off cooldown.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.hits = 0
+        self._expiry: dict[tuple[int, str], float] = {}
+
+    def remaining(self, user_id: int, command_name: str) -> float:
+        """
+        Get the seconds left on a cooldown.
+
+        Args:
+            user_id (int): The user ID.
+            command_name (str): The command name.
+
+        Returns:
+            float: The seconds left, 0 if the cooldown is unknown or over.
+        """
+        key = (user_id, command_name)
+        expires_at = self._expiry.get(key)
+
+        if expires_at is None:
+            return 0
+
+        remaining = expires_at - time()
+
+        if remaining <= 0:
+            del self._expiry[key]
+            return 0
+
+        self.hits += 1
+        return remaining
+
+    def set(
+        self, user_id: int, command_name: str, claimed_at: datetime, cooldown: int
+    ) -> None:
+        """
+        Record when a reward was last claimed.
+
+        Args:
+            user_id (int): The user ID.
+            command_name (str): The command name.
+            claimed_at (datetime): When the reward was claimed.
+            cooldown (int): The cooldown of the reward (in seconds).
+        """
+        if len(self._expiry) >= COOLDOWN_INDEX_PRUNE_SIZE:
+            self.prune()
+
+        self._expiry[(user_id, command_name)] = claimed_at.timestamp() + cooldown
+
+    def load(self, rows: list[dict], cooldown: int) -> None:
+        """
+        Fill the index with claims read from the database.
+
+        Args:
+            rows (list[dict]): The claims, each with a user_id, command_name and timestamp.
+            cooldown (int): The cooldown of the rewards (in seconds).
+        """
+        for row in rows:
+            self.set(row["user_id"], row["command_name"], row["timestamp"], cooldown)
+
+        self.loaded = True
+
+    def prune(self) -> None:
+        """
+        Drop the cooldowns that are already over.
+        """
+        now = time()
+        self._expiry = {
+            key: expires_at for key, expires_at in self._expiry.items() if expires_at > now
+        }
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+cooldown_index = CooldownIndex()
+
+
+async def load_active_cooldowns(cooldown: int) -> int:
+    """
+    Load every claim still on cooldown into the in-memory index with a single query.
+
+    Args:
+        cooldown (int): The cooldown of the rewards (in seconds).
+
+    Returns:
+        int: The amount of cooldowns loaded.
+    """
+    since = datetime.now(timezone.utc) - timedelta(seconds=cooldown)
+    rows = await CommandsTimestamp.filter(timestamp__gt=since).values(
+        "command_name", "timestamp", user_id="user_id_id"
+    )
+    cooldown_index.load(rows, cooldown)
+    return len(rows)
+
+
+async def claim_reward(
+    user_id: int, command_name: str, reward: int, cooldown: int
+) -> ClaimResult:
+    """
+    Claim a reward, crediting the balance only if its cooldown is over.
+
+    Args:
+        user_id (int): The user ID.
+        command_name (str): The command name.
+        reward (int): The amount to credit.
+        cooldown (int): The cooldown of the reward (in seconds).
+
+    Returns:
+        ClaimResult: Whether the reward was claimed, the cooldown left and the new balance.
+    """
+    results = await claim_rewards(user_id, {command_name: reward}, cooldown)
+    return results[command_name]
+
+
+async def claim_rewards(
+    user_id: int, rewards: dict[str, int], cooldown: int
+) -> dict[str, ClaimResult]:
+    """
+    Claim several rewards at once, crediting the balance for the ones whose cooldown is over.
+
+    The timestamp upserts and the balance credit run as one conditional statement,
+    and rewards rejected on a cooldown already known in memory cost no queries.
+
+    Args:
+        user_id (int): The user ID.
+        rewards (dict[str, int]): The amount to credit for each command name.
+        cooldown (int): The cooldown of the rewards (in seconds).
+
+    Returns:
+        dict[str, ClaimResult]: The outcome of each claim, keyed by command name.
+    """
+    for command_name in rewards:
+        if command_name not in REWARD_COMMANDS:
+            raise ValueError(f"Command name '{command_name}' is not valid.")
+
+    if not cooldown_index.loaded:
+        async with warmup_lock:
+            if not cooldown_index.loaded:
+                await load_active_cooldowns(cooldown)
+
+    results = {}
+    claimable = {}
+
+    for command_name, reward in rewards.items():
+        remaining = cooldown_index.remaining(user_id, command_name)
+
+        if remaining:
+            results[command_name] = ClaimResult(False, remaining, None)
+        else:
+            claimable[command_name] = reward
+
+    if not claimable:
+        return results
+
+    timestamps_table = CommandsTimestamp._meta.db_table
+    connection = connections.get("default")
+    with balance_ledger.external_write(user_id):
+        rows = await connection.execute_query_dict(
+            f"""WITH requested AS (
+                SELECT * FROM unnest($2::text[], $4::int[]) AS requested(command_name, reward)
+            ), claim AS (
+                INSERT INTO "{timestamps_table}" (user_id_id, command_name, timestamp)
+                SELECT $1::bigint, command_name, now() FROM requested
+                WHERE EXISTS (SELECT 1 FROM "{User._meta.db_table}" WHERE id = $1::bigint)
+                ON CONFLICT (user_id_id, command_name) DO UPDATE SET timestamp = EXCLUDED.timestamp
+                WHERE "{timestamps_table}".timestamp <= EXCLUDED.timestamp - $3::int * INTERVAL '1 second'
+                RETURNING command_name, timestamp
+            )
+            UPDATE "{User._meta.db_table}"
+            SET balance = balance + (SELECT SUM(reward) FROM claim JOIN requested USING (command_name))
+            WHERE id = $1::bigint AND EXISTS (SELECT 1 FROM claim)
+            RETURNING balance,
+                (SELECT array_agg(command_name) FROM claim) AS claimed,
+                (SELECT max(timestamp) FROM claim) AS claimed_at""",
+            [user_id, list(claimable), cooldown, list(claimable.values())],
+        )
+
+    claimed = set(rows[0]["claimed"]) if rows else set()
+
+    for command_name in claimed:
+        transaction_log.record(user_id, claimable[command_name], command_name)
+        cooldown_index.set(user_id, command_name, rows[0]["claimed_at"], cooldown)
+        results[command_name] = ClaimResult(
+            True, 0, rows[0]["balance"] + balance_ledger.pending_delta(user_id)
+        )
+
+    rejected = [command_name for command_name in claimable if command_name not in claimed]
+
+    if rejected:
+        # These cooldowns were not known in memory, e.g. claimed from another process.
+        # They are measured on the database clock the claims were stamped with.
+        timestamps = await connection.execute_query_dict(
+            f'SELECT command_name, now() - timestamp AS elapsed FROM "{timestamps_table}" '
+            f"WHERE user_id_id = $1 AND command_name = ANY($2::text[])",
+            [user_id, rejected],
+        )
+
+        for row in timestamps:
+            command_name = row["command_name"]
+            elapsed = row["elapsed"]
+            cooldown_index.set(user_id, command_name, datetime.now(timezone.utc) - elapsed, cooldown)
+            # A claim rejected right as its cooldown ends still reports some time left.
+            remaining = max(cooldown - elapsed.total_seconds(), 1)
+            results[command_name] = ClaimResult(False, remaining, None)
+
+        for command_name in rejected:
+            # Without a timestamp the user does not exist, nothing was claimed.
+            results.setdefault(command_name, ClaimResult(False, 0, None))
+
+    return results
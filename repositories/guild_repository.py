@@ -1,6 +1,104 @@
 from models.guild import Guilds
+from collections import OrderedDict
+from typing import Optional
+from config import GUILD_CACHE_MAX_SIZE
 
-__all__ = ("get_guild", "create_guild", "update_guild")
+__all__ = (
+    "get_guild",
+    "create_guild",
+    "update_guild",
+    "get_allowed_channels",
+    "load_guild_configs",
+    "guild_config_cache",
+)
+
+
+class GuildConfigCache:
+    """
+    Bounded LRU cache that keeps each guild's channel allowlist as a frozenset.
+    """
+
+    def __init__(self, max_size: int = GUILD_CACHE_MAX_SIZE) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, frozenset] = OrderedDict()
+
+    def get(self, guild_id: int) -> Optional[frozenset]:
+        """
+        Get the cached allowlist of a guild.
+
+        Args:
+            guild_id (int): The guild ID.
+
+        Returns:
+            frozenset: The allowed channels, or None if the guild is not cached.
+        """
+        allowed_channels = self._entries.get(guild_id)
+
+        if allowed_channels is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(guild_id)
+        return allowed_channels
+
+    def set(self, guild_id: int, allowed_channels: Optional[list[int]]) -> frozenset:
+        """
+        Store the allowlist of a guild, evicting the least recently used entry if full.
+
+        Args:
+            guild_id (int): The guild ID.
+            allowed_channels (list[int]): The allowed channels stored for the guild.
+
+        Returns:
+            frozenset: The cached allowlist.
+        """
+        allowed_channels = frozenset(allowed_channels or ())
+        self._entries[guild_id] = allowed_channels
+        self._entries.move_to_end(guild_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+        return allowed_channels
+
+    def load(self, rows: list[tuple[int, Optional[list[int]]]]) -> None:
+        """
+        Fill the cache with guild configs read from the database.
+
+        Args:
+            rows (list[tuple]): The guild ID and allowed channels of each guild.
+        """
+        for guild_id, allowed_channels in rows:
+            self.set(guild_id, allowed_channels)
+
+    def invalidate(self, guild_id: int) -> None:
+        """
+        Drop a guild from the cache.
+
+        Args:
+            guild_id (int): The guild ID.
+        """
+        self._entries.pop(guild_id, None)
+
+    def stats(self) -> dict:
+        """
+        Get the cache statistics.
+
+        Returns:
+            dict: The size, hits and misses of the cache.
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+guild_config_cache = GuildConfigCache()
 
 
 async def get_guild(guild_id: int) -> Guilds:
@@ -25,7 +123,9 @@ async def create_guild(guild_id: int) -> bool:
     Returns:
         bool: Whether the guild was created.
     """
-    return await Guilds.create(id=guild_id)
+    guild = await Guilds.create(id=guild_id)
+    guild_config_cache.set(guild_id, guild.allowed_channels)
+    return guild
 
 async def update_guild(guild_id: int, **kwargs) -> bool:
     """
@@ -38,4 +138,45 @@ async def update_guild(guild_id: int, **kwargs) -> bool:
     Returns:
         bool: Whether the guild was updated.
     """
-    return await Guilds.filter(id=guild_id).update(**kwargs)
+    updated = await Guilds.filter(id=guild_id).update(**kwargs)
+
+    if "allowed_channels" in kwargs:
+        guild_config_cache.set(guild_id, kwargs["allowed_channels"])
+
+    return updated
+
+async def get_allowed_channels(guild_id: int) -> frozenset:
+    """
+    Get the channels a guild allows the bot to be used in, creating the guild if needed.
+
+    Served from memory once the guild is cached, so the check costs no I/O.
+
+    Args:
+        guild_id (int): The guild ID.
+
+    Returns:
+        frozenset: The allowed channels.
+    """
+    allowed_channels = guild_config_cache.get(guild_id)
+
+    if allowed_channels is not None:
+        return allowed_channels
+
+    guild = await get_guild(guild_id)
+
+    if not guild:
+        guild = await create_guild(guild_id)
+
+    return guild_config_cache.set(guild_id, guild.allowed_channels)
+
+
+async def load_guild_configs() -> int:
+    """
+    Load the config of every guild into the cache with a single query.
+
+    Returns:
+        int: The amount of guilds loaded.
+    """
+    rows = await Guilds.all().values_list("id", "allowed_channels")
+    guild_config_cache.load(rows)
+    return len(rows)
@@ -1,22 +1,34 @@
 from models import Item, Codes
+from repositories.catalog_index import catalog_index
+from repositories.loaders import item_loader
+from repositories.commit_hooks import on_commit
+from tortoise import connections
+from tortoise.transactions import in_transaction
 from asyncio import Lock
+from typing import Optional
 
-lock = Lock()
+catalog_lock = Lock()
 
 __all__ = (
     "get_item_by_roblox_id",
     "create_item",
+    "create_items",
+    "get_registered_item_ids",
     "delete_item",
     "add_item_code",
     "get_code_count",
     "update_item_price",
     "get_code_from_item",
-    'get_all_items_with_codes_and_quantity'
+    "claim_codes",
+    "get_catalog_items",
+    "search_catalog",
+    "verify_item_stock",
+    "load_catalog",
 )
 
 async def get_item_by_roblox_id(item_id: int) -> dict:
     """
-    Function that retrieves an item by its roblox ID.
+    Function that retrieves an item by its roblox ID, batched with the other lookups of the same tick.
 
     Args:
         item_id (int): The ID of the item.
@@ -24,7 +36,7 @@ async def get_item_by_roblox_id(item_id: int) -> dict:
     Returns:
         dict: The item.
     """
-    return await Item.filter(item_id=item_id).first().values()
+    return await item_loader.load(item_id)
 
 
 async def create_item(
@@ -53,9 +65,57 @@ async def create_item(
         item_price=item_price,
         item_category=item_category,
     )
+    catalog_index.upsert(
+        {
+            "item_id": item_id,
+            "item_name": item_name,
+            "item_price": item_price,
+            "item_category": item_category,
+            "stock": 0,
+        }
+    )
     return
 
 
+async def create_items(items: list[dict]) -> None:
+    """
+    Function that creates several items in the database with a single insert.
+
+    Args:
+        items (list[dict]): The items, each with an item_id, item_name, item_description, item_price and item_category.
+
+    Returns:
+        None
+    """
+    await Item.bulk_create([Item(**item) for item in items])
+
+    for item in items:
+        catalog_index.upsert(
+            {
+                "item_id": item["item_id"],
+                "item_name": item["item_name"],
+                "item_price": item["item_price"],
+                "item_category": item["item_category"],
+                "stock": 0,
+            }
+        )
+
+
+async def get_registered_item_ids(item_ids: list[int]) -> set[int]:
+    """
+    Function that retrieves which of the given items are already registered.
+
+    Args:
+        item_ids (list[int]): The IDs of the items.
+
+    Returns:
+        set[int]: The IDs of the registered items.
+    """
+    return set(
+        await Item.filter(item_id__in=item_ids).values_list("item_id", flat=True)
+    )
+
+
 async def delete_item(item_id: int) -> None:
     """
     Function that deletes an item from the database.
@@ -67,26 +127,50 @@ async def delete_item(item_id: int) -> None:
         None
     """
     await Item.filter(item_id=item_id).delete()
+    catalog_index.remove(item_id)
     return
 
 
-async def add_item_code(item_id: int, codes: list[str]) -> None:
+async def add_item_code(item_id: int, codes: list[str]) -> Optional[int]:
     """
-    Function that adds a code to an item.
+    Function that adds codes to an item, skipping the ones it already has.
 
     Args:
         item_id (int): The ID of the item.
-        code (list[str]): The code.
+        codes (list[str]): The codes.
 
     Returns:
-        None
+        Optional[int]: The amount of codes added, or None if the item does not exist.
     """
-    item = await Item.filter(item_id=item_id).first()
+    item_table = Item._meta.db_table
+    codes_table = Codes._meta.db_table
+    connection = connections.get("default")
 
-    if item:
-        code_objects = [Codes(item=item, code=code) for code in codes]
-        await Codes.bulk_create(code_objects)
-    return
+    # Codes already in stock, e.g. restocked twice or pasted again by an admin, are skipped
+    # instead of failing the whole batch on the unique constraint.
+    rows = await connection.execute_query_dict(
+        f"""WITH added AS (
+            INSERT INTO "{codes_table}" (item_id, code)
+            SELECT i.item_id, c.code FROM "{item_table}" i, unnest($2::text[]) AS c(code)
+            WHERE i.item_id = $1
+            ON CONFLICT DO NOTHING RETURNING code
+        ), incremented AS (
+            UPDATE "{item_table}" SET stock = stock + (SELECT COUNT(*) FROM added)
+            WHERE item_id = $1 RETURNING item_id
+        )
+        SELECT (SELECT COUNT(*) FROM added) AS added, EXISTS (SELECT 1 FROM incremented) AS found""",
+        [item_id, codes],
+    )
+
+    if not rows[0]["found"]:
+        return None
+
+    added = rows[0]["added"]
+
+    if added:
+        on_commit(lambda: catalog_index.adjust_stock(item_id, added))
+
+    return added
 
 
 async def get_code_count(item_id: int) -> int:
@@ -99,7 +183,8 @@ async def get_code_count(item_id: int) -> int:
     Returns:
         int: The number of active codes.
     """
-    return await Codes.filter(item_id=item_id).count()
+    stock = await Item.filter(item_id=item_id).first().values_list("stock", flat=True)
+    return stock or 0
 
 async def update_item_price(item_id: int, new_price: int) -> None:
     """
@@ -113,32 +198,159 @@ async def update_item_price(item_id: int, new_price: int) -> None:
         None
     """
     await Item.filter(item_id=item_id).update(item_price=new_price)
+    catalog_index.update(item_id, item_price=new_price)
 
-async def get_code_from_item(item_id: int) -> str:
+async def get_code_from_item(item_id: int) -> Optional[str]:
     """
-    Function that retrieves a code from an item.
+    Function that claims a code from an item, removing it from the stock.
 
     Args:
         item_id (int): The ID of the item.
 
     Returns:
-        str: The code.
-    """
-    async with lock:
-        code_record = await Codes.filter(item_id=item_id).first().values()
-        
-        if code_record:
-            code = code_record['code']
-            await Codes.filter(item_id=item_id, code=code).delete()
-            return code
-        await Item.filter(item_id=item_id).delete()
-        return None
-    
-async def get_all_items_with_codes_and_quantity() -> list[Item]:
+        str: The code, or None if the item is sold out.
+    """
+    codes = await claim_codes(item_id, 1)
+    return codes[0] if codes else None
+
+
+async def claim_codes(item_id: int, quantity: int) -> list[str]:
+    """
+    Function that claims up to a quantity of codes from an item, removing them from the stock.
+
+    The codes are picked and deleted in a single statement that skips rows locked by
+    other buyers, so concurrent purchases never wait on each other or receive the
+    same code, even across bot processes.
+
+    Args:
+        item_id (int): The ID of the item.
+        quantity (int): The amount of codes to claim.
+
+    Returns:
+        list[str]: The claimed codes, fewer than requested if the item sold out.
     """
-    Function that retrieves all items with codes.
+    item_table = Item._meta.db_table
+    codes_table = Codes._meta.db_table
+    connection = connections.get("default")
+
+    rows = await connection.execute_query_dict(
+        f"""WITH claimed AS (
+            DELETE FROM "{codes_table}" WHERE id IN (
+                SELECT id FROM "{codes_table}" WHERE item_id = $1
+                LIMIT $2 FOR UPDATE SKIP LOCKED
+            ) RETURNING code
+        ), decremented AS (
+            UPDATE "{item_table}" SET stock = stock - (SELECT COUNT(*) FROM claimed)
+            WHERE item_id = $1 AND EXISTS (SELECT 1 FROM claimed)
+        )
+        SELECT code FROM claimed""",
+        [item_id, quantity],
+    )
+    codes = [row["code"] for row in rows]
+
+    # A sold-out item stays registered, codes can still be added or restocked by a refund.
+    if codes:
+        on_commit(lambda: catalog_index.adjust_stock(item_id, -len(codes)))
+
+    return codes
+
+
+async def get_catalog_items() -> list[dict]:
+    """
+    Function that retrieves every item along with its amount of codes in stock.
+
+    Returns:
+        list: The items, one row per item.
+    """
+    return await Item.all().values(
+        "item_id", "item_name", "item_price", "item_category", "stock"
+    )
+
+
+async def search_catalog(query: str, limit: int = 25) -> list[dict]:
+    """
+    Function that searches the in-stock items by name using the in-memory catalog index.
+
+    The index is loaded from the database on first use and kept up to date by the
+    item functions of this module afterwards.
+
+    Args:
+        query (str): The text to search for.
+        limit (int): The maximum amount of results.
 
     Returns:
-        list: The items with codes.
+        list: The matching items, best match first.
     """
-    return await Item.filter(codes__isnull=False).distinct().values("item_id", "item_name", "item_price", "item_category", "codes__code")
\ No newline at end of file
+    if not catalog_index.loaded:
+        await load_catalog()
+
+    return catalog_index.search(query, limit)
+
+
+async def load_catalog() -> int:
+    """
+    Function that loads the whole catalog into the in-memory catalog index with a single query,
+    unless it is already loaded.
+
+    Returns:
+        int: The amount of items in the index.
+    """
+    async with catalog_lock:
+        while not catalog_index.loaded:
+            mutations = catalog_index.mutations
+            items = await get_catalog_items()
+
+            # Reload if the catalog changed while it was being read.
+            if mutations == catalog_index.mutations:
+                catalog_index.load(items)
+
+    return len(catalog_index)
+
+
+async def verify_item_stock(repair: bool = False) -> dict[int, dict]:
+    """
+    Function that compares every item's stock counter with its actual amount of codes.
+
+    Args:
+        repair (bool): Whether to overwrite the mismatched counters with the actual count.
+
+    Returns:
+        dict: The mismatched items, mapping the item ID to its stored and actual stock.
+    """
+    item_table = Item._meta.db_table
+    codes_table = Codes._meta.db_table
+    counted = (
+        f'SELECT i.item_id, i.stock, COUNT(c.id) AS actual FROM "{item_table}" i '
+        f'LEFT JOIN "{codes_table}" c ON c.item_id = i.item_id GROUP BY i.item_id'
+    )
+    connection = connections.get("default")
+
+    if repair:
+        async with in_transaction() as connection:
+            # Every code insert and claim also updates its item, so with the items locked the
+            # codes can not change between the count and the write. An in-flight claim that
+            # already deleted codes waits on the lock and decrements the repaired counter after.
+            await connection.execute_query(
+                f'SELECT item_id FROM "{item_table}" ORDER BY item_id FOR UPDATE'
+            )
+            rows = await connection.execute_query_dict(
+                f'UPDATE "{item_table}" AS item SET stock = counted.actual '
+                f"FROM ({counted}) AS counted "
+                "WHERE item.item_id = counted.item_id AND item.stock <> counted.actual "
+                "RETURNING item.item_id, counted.stock, counted.actual"
+            )
+    else:
+        rows = await connection.execute_query_dict(
+            f"SELECT * FROM ({counted}) AS counted WHERE stock <> actual"
+        )
+
+    mismatches = {
+        row["item_id"]: {"stock": row["stock"], "actual": row["actual"]}
+        for row in rows
+    }
+
+    if repair:
+        for item_id, counts in mismatches.items():
+            catalog_index.update(item_id, stock=counts["actual"])
+
+    return mismatches
\ No newline at end of file
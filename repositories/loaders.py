@@ -0,0 +1,147 @@
+"""
+This module contains the batching loaders that coalesce concurrent lookups into single queries.
+"""
+import asyncio
+import contextvars
+from bisect import bisect_left
+from models import User, Item
+from repositories.balance_ledger import balance_ledger
+from tortoise import connections
+from typing import Any, Awaitable, Callable, Hashable
+
+__all__ = ("BatchLoader", "user_loader", "item_loader")
+
+BATCH_SIZE_BUCKETS = (1, 5, 20, 100, 500)  # The upper bounds of the batch size histogram
+
+
+class BatchLoader:
+    """
+    Loader that collects the lookups issued within one event loop tick and resolves
+    them with a single batched query, sharing the result between identical keys.
+    """
+
+    def __init__(
+        self, name: str, batch_fn: Callable[[list], Awaitable[dict[Hashable, Any]]]
+    ) -> None:
+        self.name = name
+        self.batch_fn = batch_fn
+        self.batches = 0
+        self.keys = 0
+        self.deduplicated = 0
+        self.max_batch_size = 0
+        self.batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._pending: dict[Hashable, asyncio.Future] = {}
+
+    async def load(self, key: Hashable) -> Any:
+        """
+        Load the value of a key, batched with every other load of the same tick.
+
+        Args:
+            key (Hashable): The key to look up.
+
+        Returns:
+            Any: The value, or None if the key does not exist.
+        """
+        future = self._pending.get(key)
+
+        if future:
+            self.deduplicated += 1
+        else:
+            loop = asyncio.get_running_loop()
+
+            if not self._pending:
+                # Dispatched in a fresh context so the batch never runs inside a caller's transaction.
+                loop.call_soon(self._dispatch, context=contextvars.Context())
+
+            future = loop.create_future()
+            self._pending[key] = future
+
+        # Shielded so a cancelled caller does not cancel the lookup of callers sharing the key.
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        """
+        Get the loader statistics.
+
+        Returns:
+            dict: The batch counters and the batch size histogram.
+        """
+        bucket_names = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [
+            f">{BATCH_SIZE_BUCKETS[-1]}"
+        ]
+        return {
+            "batches": self.batches,
+            "keys": self.keys,
+            "deduplicated": self.deduplicated,
+            "max_batch_size": self.max_batch_size,
+            "batch_sizes": dict(zip(bucket_names, self.batch_sizes)),
+        }
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+
+        self.batches += 1
+        self.keys += len(pending)
+        self.max_batch_size = max(self.max_batch_size, len(pending))
+        self.batch_sizes[bisect_left(BATCH_SIZE_BUCKETS, len(pending))] += 1
+
+        asyncio.create_task(self._resolve(pending))
+
+    async def _resolve(self, pending: dict[Hashable, asyncio.Future]) -> None:
+        try:
+            values = await self.batch_fn(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+async def load_users(ids: list[int]) -> dict[int, User]:
+    """
+    Fetch several users with a single query, counting their unflushed ledger deltas.
+
+    Args:
+        ids (list[int]): The user IDs.
+
+    Returns:
+        dict: The users, keyed by user ID.
+    """
+    connection = connections.get("default")
+    rows = await connection.execute_query_dict(
+        f'SELECT id, balance FROM "{User._meta.db_table}" WHERE id = ANY($1::bigint[])',
+        [ids],
+    )
+    return {
+        row["id"]: User._init_from_db(
+            id=row["id"],
+            balance=row["balance"] + balance_ledger.pending_delta(row["id"]),
+        )
+        for row in rows
+    }
+
+
+async def load_items(item_ids: list[int]) -> dict[int, dict]:
+    """
+    Fetch several items with a single query.
+
+    Args:
+        item_ids (list[int]): The IDs of the items.
+
+    Returns:
+        dict: The items, keyed by item ID.
+    """
+    connection = connections.get("default")
+    rows = await connection.execute_query_dict(
+        f'SELECT * FROM "{Item._meta.db_table}" WHERE item_id = ANY($1::bigint[])',
+        [item_ids],
+    )
+    return {row["item_id"]: row for row in rows}
+
+
+user_loader = BatchLoader("users", load_users)
+item_loader = BatchLoader("items", load_items)
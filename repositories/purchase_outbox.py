@@ -0,0 +1,167 @@
+from models import PurchaseOutbox
+from repositories.user_repository import adjust_balance
+from repositories.item_repository import add_item_code
+from repositories.commit_hooks import after_commit
+from tortoise.transactions import in_transaction
+from core.tools.logs import log_warning
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+__all__ = (
+    "enqueue_purchase",
+    "get_due_purchases",
+    "mark_purchase_delivered",
+    "reschedule_purchase",
+    "refund_purchase",
+    "fail_purchase",
+)
+
+
+async def enqueue_purchase(
+    user_id: int,
+    amount: int,
+    codes: dict[int, list[str]],
+    title: str,
+    description: str,
+    footer_text: str = "",
+) -> PurchaseOutbox:
+    """
+    Queue the DM of a purchase, meant to run in the transaction that charged for it.
+
+    Args:
+        user_id (int): The ID of the buyer.
+        amount (int): The amount charged, refunded if the DM can never be delivered.
+        codes (dict[int, list[str]]): The claimed codes, keyed by item ID.
+        title (str): The title of the DM.
+        description (str): The description of the DM.
+        footer_text (str): The footer of the DM.
+
+    Returns:
+        PurchaseOutbox: The queued DM.
+    """
+    return await PurchaseOutbox.create(
+        user_id=user_id,
+        amount=amount,
+        codes={str(item_id): item_codes for item_id, item_codes in codes.items()},
+        title=title,
+        description=description,
+        footer_text=footer_text,
+        next_attempt_at=datetime.now(timezone.utc),
+    )
+
+
+async def get_due_purchases(limit: int, lease: float) -> list[PurchaseOutbox]:
+    """
+    Claim the queued DMs whose next delivery attempt is due.
+
+    The claimed DMs are leased by pushing their next attempt back, so other bot processes
+    skip them until the delivery is marked or the lease runs out.
+
+    Args:
+        limit (int): The maximum amount of DMs.
+        lease (float): How long the DMs are kept from other dispatchers (in seconds).
+
+    Returns:
+        list[PurchaseOutbox]: The DMs, oldest first.
+    """
+    now = datetime.now(timezone.utc)
+
+    async with in_transaction():
+        purchases = (
+            await PurchaseOutbox.filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at")
+            .limit(limit)
+            .select_for_update(skip_locked=True)
+        )
+
+        if purchases:
+            await PurchaseOutbox.filter(id__in=[purchase.id for purchase in purchases]).update(
+                next_attempt_at=now + timedelta(seconds=lease)
+            )
+
+    return purchases
+
+
+async def mark_purchase_delivered(purchase_id: int) -> None:
+    """
+    Remove a DM from the queue once it was delivered.
+
+    Args:
+        purchase_id (int): The ID of the queued DM.
+    """
+    await PurchaseOutbox.filter(id=purchase_id).delete()
+
+
+async def reschedule_purchase(purchase_id: int, delay: float, error: str) -> None:
+    """
+    Schedule another delivery attempt of a DM.
+
+    Args:
+        purchase_id (int): The ID of the queued DM.
+        delay (float): How long to wait before the next attempt (in seconds).
+        error (str): Why the last attempt failed.
+    """
+    purchase = await PurchaseOutbox.get(id=purchase_id)
+    purchase.attempts += 1
+    purchase.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    purchase.last_error = error
+    await purchase.save(update_fields=["attempts", "next_attempt_at", "last_error"])
+
+
+async def refund_purchase(
+    purchase_id: int, error: str, restock: bool = True
+) -> Optional[PurchaseOutbox]:
+    """
+    Give up on a DM: refund the buyer and put the codes back in stock.
+
+    When the DM may have been delivered after all, e.g. Discord timed out while sending it,
+    the codes are not restocked. The purchase is held for review instead, so they are never
+    sold twice.
+
+    Args:
+        purchase_id (int): The ID of the queued DM.
+        error (str): Why the DM could not be delivered.
+        restock (bool): Whether the DM definitely never reached the buyer.
+
+    Returns:
+        Optional[PurchaseOutbox]: The refunded purchase, or None if it was no longer pending.
+    """
+    async with after_commit(), in_transaction():
+        purchase = (
+            await PurchaseOutbox.filter(id=purchase_id, status="pending")
+            .select_for_update()
+            .first()
+        )
+
+        if not purchase:
+            return None
+
+        await adjust_balance(purchase.user_id, purchase.amount, reason="refund")
+
+        if restock:
+            for item_id, item_codes in purchase.codes.items():
+                # Only an item deleted by an admin is missing, its codes stay in the refunded row.
+                if await add_item_code(int(item_id), item_codes) is None:
+                    log_warning(
+                        f"Could not restock {len(item_codes)} codes of deleted item {item_id} "
+                        f"refunded from purchase {purchase_id}"
+                    )
+
+        purchase.status = "refunded" if restock else "held"
+        purchase.last_error = error
+        await purchase.save(update_fields=["status", "last_error"])
+
+    return purchase
+
+
+async def fail_purchase(purchase_id: int, error: str) -> None:
+    """
+    Take a DM that could not be refunded off the queue, so it is not retried forever.
+
+    Args:
+        purchase_id (int): The ID of the queued DM.
+        error (str): Why the refund failed.
+    """
+    await PurchaseOutbox.filter(id=purchase_id, status="pending").update(
+        status="failed", last_error=error
+    )
@@ -0,0 +1,154 @@
+"""
+This module contains the append-only log of balance changes, written to the database in batches.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from models import Transaction
+from repositories.commit_hooks import on_commit
+from tortoise import connections
+from core.tools.logs import log_error, log_warning
+
+__all__ = ("TransactionLog", "transaction_log")
+
+TRANSACTION_COLUMNS = ("user_id", "delta", "reason", "created_at")
+
+
+class TransactionLog:
+    """
+    Buffer of balance changes flushed to the transactions table with COPY.
+
+    Recording a change only appends to an in-memory buffer, a background task
+    copies the buffer into the database every interval or as soon as it fills up.
+    """
+
+    def __init__(self) -> None:
+        self.recorded = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.flush_failures = 0
+        self.dropped = 0
+        self.max_buffer_size = 100_000
+        self._buffer: list[tuple[int, int, str, datetime]] = []
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(
+        self, flush_interval: float, flush_max_rows: int, max_buffer_size: int
+    ) -> None:
+        """
+        Start the flush task.
+
+        Args:
+            flush_interval (float): The maximum time a row waits before being flushed (in seconds).
+            flush_max_rows (int): The amount of buffered rows that triggers a flush right away.
+            max_buffer_size (int): The amount of rows kept while the database is unreachable.
+        """
+        self.flush_interval = flush_interval
+        self.flush_max_rows = flush_max_rows
+        self.max_buffer_size = max_buffer_size
+        self._stopping = False
+        self._full.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the flush task and flush everything still buffered.
+        """
+        if not self._task:
+            return
+
+        # Woken up rather than cancelled, wait_for swallows a cancellation that lands
+        # together with the wakeup.
+        self._stopping = True
+        self._full.set()
+        await self._task
+        self._task = None
+        await self._flush()
+
+    def record(self, user_id: int, delta: int, reason: str) -> None:
+        """
+        Record a balance change.
+
+        Inside after_commit(), the change is only buffered once the transaction commits.
+
+        Args:
+            user_id (int): The user ID.
+            delta (int): The amount added to the balance, negative for a debit.
+            reason (str): What changed the balance, e.g. slots or purchase.
+        """
+        row = (user_id, delta, reason, datetime.now(timezone.utc))
+        on_commit(lambda: self._append([row]))
+
+    def stats(self) -> dict:
+        """
+        Get the transaction log statistics.
+
+        Returns:
+            dict: The log counters.
+        """
+        return {
+            "recorded": self.recorded,
+            "buffered": len(self._buffer),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "flush_failures": self.flush_failures,
+            "dropped": self.dropped,
+        }
+
+    def _append(self, rows: list[tuple[int, int, str, datetime]]) -> None:
+        self._buffer.extend(rows)
+        self.recorded += len(rows)
+        overflow = len(self._buffer) - self.max_buffer_size
+
+        # Bounds the memory used while the database cannot be written to.
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            log_warning(f"Dropped {overflow} unflushed transactions")
+
+        if self._task and len(self._buffer) >= self.flush_max_rows:
+            self._full.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            if self._stopping:
+                return
+
+            self._full.clear()
+
+            try:
+                await self._flush()
+            except Exception as e:
+                # The rows stay buffered and are retried with the next flush.
+                self.flush_failures += 1
+                log_error("Failed to flush the transaction log", e)
+
+    async def _flush(self) -> None:
+        if not self._buffer:
+            return
+
+        rows, self._buffer = self._buffer, []
+
+        try:
+            async with connections.get("default").acquire_connection() as connection:
+                await connection.copy_records_to_table(
+                    Transaction._meta.db_table,
+                    records=rows,
+                    columns=TRANSACTION_COLUMNS,
+                )
+        except BaseException:
+            self._buffer[:0] = rows
+            raise
+
+        self.flushes += 1
+        self.flushed_rows += len(rows)
+
+
+transaction_log = TransactionLog()
@@ -1,11 +1,19 @@
 from models import User, CommandsTimestamp
+from repositories.loaders import user_loader
+from repositories.balance_ledger import balance_ledger
+from repositories.transaction_log import transaction_log
+from tortoise import connections
 from typing import Optional
 from datetime import datetime
 
 __all__ = (
     "get_user",
     "create_user",
+    "ensure_user",
+    "ensure_users",
     "update_user",
+    "adjust_balance",
+    "settle_game_outcome",
     "get_user_balance",
     "get_command_timestamp",
     "create_command_timestamp",
@@ -15,7 +23,7 @@ __all__ = (
 
 async def get_user(id: int) -> Optional[User]:
     """
-    Get user data from the database.
+    Get user data from the database, batched with the other lookups of the same tick.
 
     Args:
         id (int): The user ID.
@@ -23,7 +31,7 @@ async def get_user(id: int) -> Optional[User]:
     Returns:
         User: The user data.
     """
-    return await User.filter(id=id).first()
+    return await user_loader.load(id)
 
 
 async def create_user(id: int) -> User:
@@ -34,9 +42,62 @@ async def create_user(id: int) -> User:
         id (int): The user ID.
 
     Returns:
-        bool: Whether the user was created.
+        User: The created user.
     """
-    await User.create(id=id)
+    return await User.create(id=id)
+
+
+async def ensure_user(id: int) -> User:
+    """
+    Get a user from the database, creating it first if needed.
+
+    A new user costs a single round trip, an existing one a second read but never a write,
+    economy_handler only gets here when the batched lookup missed.
+
+    Args:
+        id (int): The user ID.
+
+    Returns:
+        User: The user data.
+    """
+    user_table = User._meta.db_table
+    connection = connections.get("default")
+    rows = await connection.execute_query_dict(
+        f'INSERT INTO "{user_table}" (id, balance) VALUES ($1, 0) '
+        "ON CONFLICT (id) DO NOTHING RETURNING id, balance",
+        [id],
+    )
+
+    # The user already existed, read it in a statement of its own so a row inserted by a
+    # concurrent call after the insert's snapshot is visible too.
+    if not rows:
+        rows = await connection.execute_query_dict(
+            f'SELECT id, balance FROM "{user_table}" WHERE id = $1', [id]
+        )
+
+    return User._init_from_db(
+        id=rows[0]["id"],
+        balance=rows[0]["balance"] + balance_ledger.pending_delta(id),
+    )
+
+
+async def ensure_users(ids: list[int]) -> int:
+    """
+    Create the users missing from the database with a single multi-row insert.
+
+    Args:
+        ids (list[int]): The user IDs.
+
+    Returns:
+        int: The amount of users created.
+    """
+    connection = connections.get("default")
+    created, _ = await connection.execute_query(
+        f'INSERT INTO "{User._meta.db_table}" (id, balance) '
+        "SELECT unnest($1::bigint[]), 0 ON CONFLICT (id) DO NOTHING",
+        [list(ids)],
+    )
+    return created
 
 
 async def update_user(id: int, **kwargs) -> bool:
@@ -53,6 +114,71 @@ async def update_user(id: int, **kwargs) -> bool:
     return await User.filter(id=id).update(**kwargs)
 
 
+async def adjust_balance(
+    user_id: int, delta: int, min_balance: int = 0, *, reason: str
+) -> Optional[int]:
+    """
+    Atomically add a delta to the balance of a user in a single statement.
+
+    The update only goes through when the resulting balance stays at or above the
+    minimum, so concurrent bets from the same user can never overdraw or lose updates.
+    Applied changes are recorded in the transaction log.
+
+    Args:
+        user_id (int): The user ID.
+        delta (int): The amount to add to the balance, negative to debit.
+        min_balance (int): The lowest balance the update may leave the user with.
+        reason (str): What changed the balance, e.g. purchase or donate.
+
+    Returns:
+        int: The new balance, or None if the user does not exist or has insufficient funds.
+    """
+    connection = connections.get("default")
+
+    # Deltas still waiting in the write-behind ledger count towards the balance.
+    with balance_ledger.external_write(user_id) as pending_delta:
+        rows = await connection.execute_query_dict(
+            f'UPDATE "{User._meta.db_table}" SET balance = balance + $1 '
+            "WHERE id = $2 AND balance + $1 >= $3 RETURNING balance",
+            [delta, user_id, min_balance - pending_delta],
+        )
+
+    if not rows:
+        return None
+
+    transaction_log.record(user_id, delta, reason)
+    return rows[0]["balance"] + pending_delta
+
+
+async def settle_game_outcome(
+    user_id: int, delta: int, min_balance: int = 0, *, reason: str
+) -> Optional[int]:
+    """
+    Apply the outcome of a game to the balance of a user.
+
+    Goes through the write-behind ledger when it is enabled, so the database write
+    is not on the response path, and through adjust_balance otherwise.
+
+    Args:
+        user_id (int): The user ID.
+        delta (int): The amount to add to the balance, negative to debit.
+        min_balance (int): The lowest balance the outcome may leave the user with.
+        reason (str): The game that was played.
+
+    Returns:
+        int: The new balance, or None if the user does not exist or has insufficient funds.
+    """
+    if not balance_ledger.enabled:
+        return await adjust_balance(user_id, delta, min_balance, reason=reason)
+
+    balance = await balance_ledger.apply(user_id, delta, min_balance)
+
+    if balance is not None:
+        transaction_log.record(user_id, delta, reason)
+
+    return balance
+
+
 async def get_user_balance(id: int) -> Optional[int]:
     """
     Get the balance of a user.
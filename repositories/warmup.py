@@ -0,0 +1,45 @@
+"""
+This module contains the cache warmup ran at startup, before the bot handles any command.
+"""
+import asyncio
+from repositories.guild_repository import load_guild_configs
+from repositories.item_repository import load_catalog
+from repositories.cooldown_repository import load_active_cooldowns
+from time import perf_counter
+from typing import Awaitable
+
+__all__ = ("warm_up_caches",)
+
+
+async def timed_load(load: Awaitable[int]) -> dict:
+    """
+    Run a cache load and time it.
+
+    Args:
+        load (Awaitable[int]): The load, returning the amount of rows loaded.
+
+    Returns:
+        dict: The amount of rows loaded and how long it took (in milliseconds).
+    """
+    started_at = perf_counter()
+    rows = await load
+    return {"rows": rows, "ms": round((perf_counter() - started_at) * 1000, 2)}
+
+
+async def warm_up_caches(claim_cooldown: int) -> dict[str, dict]:
+    """
+    Fill the guild cache, the catalog index and the cooldown index, one query each and all at once,
+    so the first commands after a deploy are served from memory.
+
+    Args:
+        claim_cooldown (int): The cooldown of the rewards (in seconds).
+
+    Returns:
+        dict: The rows loaded and the duration of each load, keyed by cache.
+    """
+    guilds, catalog, cooldowns = await asyncio.gather(
+        timed_load(load_guild_configs()),
+        timed_load(load_catalog()),
+        timed_load(load_active_cooldowns(claim_cooldown)),
+    )
+    return {"guilds": guilds, "catalog": catalog, "cooldowns": cooldowns}